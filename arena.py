@@ -0,0 +1,163 @@
+# arena.py
+#
+# Arena sem janela: joga N partidas entre dois motores num pool de processos, alternando
+# as cores, e mostra cada resultado assim que a partida termina. No fim dá o placar
+# (vitórias/empates/derrotas do primeiro motor), a diferença de Elo com intervalo de
+# 95% e a vazão (partidas/s e lances/s).
+#
+# Motores: "aleatoria" é a IA original (fazer_movimento_ia com nivel_ia=None);
+# "motor" é a busca alfa-beta de motor.py. Opções vão depois de ":", por exemplo
+# motor:nos=5000, motor:tempo=0.05, motor:profundidade=3,tt=8 (tt em MB). Sem
+# tempo/nós/profundidade próprios, o motor usa --tempo/--nos da linha de comando.
+# Limite de nós dá partidas reproduzíveis (com a mesma --semente); limite de tempo, não.
+#
+# Dois motores determinísticos repetiriam sempre a mesma partida; por isso cada par de
+# partidas (uma com cada cor) começa com os mesmos --aberturas meios-lances sorteados.
+#
+# Uso:
+#   python arena.py motor aleatoria -n 200 --nos 2000
+#   python arena.py motor:profundidade=3 motor:profundidade=2 -n 100 -j 8
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from motor import Motor
+from regras import Jogo
+from transposicao import TabelaTransposicao
+
+MOTORES = ('aleatoria', 'motor')
+OPCOES = {'tempo': float, 'nos': int, 'profundidade': int, 'tt': int}
+MAXIMO_LANCES = 300 # Meios-lances; passou disso, a partida é declarada empate (não há regra dos 50 lances)
+
+
+def interpretar_motor(texto):
+    # "motor:nos=2000,tt=4" -> ('motor', {'nos': 2000, 'tt': 4})
+    nome, _, resto = texto.partition(':')
+    if nome not in MOTORES: raise ValueError(f"Motor desconhecido: {nome!r} (use {', '.join(MOTORES)})")
+    opcoes = {}
+    for item in filter(None, resto.split(',')):
+        chave, _, valor = item.partition('=')
+        if chave not in OPCOES or nome != 'motor': raise ValueError(f"Opção inválida para {nome}: {item!r}")
+        opcoes[chave] = OPCOES[chave](valor)
+    return nome, opcoes
+
+
+def descrever_motor(motor):
+    nome, opcoes = motor
+    return nome + (':' + ','.join(f"{chave}={valor}" for chave, valor in opcoes.items()) if opcoes else '')
+
+
+class Jogador:
+    def __init__(self, nome, opcoes):
+        self.motor = None
+        if nome == 'motor':
+            self.motor = Motor(tempo_limite=opcoes.get('tempo'), nos_limite=opcoes.get('nos'),
+                               profundidade_maxima=opcoes.get('profundidade', 64),
+                               tabela=TabelaTransposicao(opcoes.get('tt', 4)))
+
+    def escolher(self, jogo):
+        if self.motor is None:
+            jogo.cor_ia = jogo.turno
+            return jogo.escolher_lance_ia()
+        return self.motor.buscar(jogo, jogo.turno)
+
+
+def jogar_partida(branco, preto, maximo_lances=MAXIMO_LANCES, abertura=0, gerador=None):
+    # Devolve (resultado do ponto de vista das brancas: 1, 0.5 ou 0, motivo, meios-lances).
+    # Os primeiros `abertura` meios-lances são sorteados com `gerador` (random.Random)
+    jogo = Jogo(modo_ia=False, nivel_ia=None)
+    jogadores = {'w': branco, 'b': preto}
+    while not jogo.game_over and len(jogo.historico) < maximo_lances:
+        if len(jogo.historico) < abertura: lance = gerador.choice(jogo.lances_da_posicao())
+        else: lance = jogadores[jogo.turno].escolher(jogo)
+        if lance is None: break # Sem lances: verificar_fim_de_jogo já marcou o fim
+        jogo.aplicar_lance(lance)
+        if not jogo.game_over: jogo.trocar_turno()
+    if not jogo.game_over: return 0.5, "limite de meios-lances", len(jogo.historico)
+    if jogo.status_texto.startswith("Xeque-mate"): return (1 if jogo.turno == 'b' else 0), "xeque-mate", len(jogo.historico)
+    return 0.5, jogo.status_texto.rstrip('!').lower(), len(jogo.historico)
+
+def _partida(tarefa):
+    # Roda num processo do pool. A partida par tem o motor A de brancas, a ímpar, de pretas
+    indice, motor_a, motor_b, maximo_lances, abertura, semente = tarefa
+    random.seed(semente + indice)
+    a, b = Jogador(*motor_a), Jogador(*motor_b)
+    a_brancas, gerador = indice % 2 == 0, random.Random(semente * 1000003 + indice // 2) # Mesma abertura no par
+    inicio = time.perf_counter()
+    brancas, pretas = (a, b) if a_brancas else (b, a)
+    resultado, motivo, lances = jogar_partida(brancas, pretas, maximo_lances, abertura, gerador)
+    pontos_a = resultado if a_brancas else 1 - resultado
+    return indice, a_brancas, pontos_a, motivo, lances, time.perf_counter() - inicio
+
+
+def elo(vitorias, empates, derrotas):
+    # Diferença de Elo e meia largura do intervalo de 95%, a partir do placar. Os pontos
+    # ficam entre 0,5/n e (n - 0,5)/n, como nas calculadoras usuais; com 0% ou 100% a
+    # diferença é só um limite e não há intervalo (erro None)
+    partidas = vitorias + empates + derrotas
+    if partidas == 0: return 0.0, None
+    pontos = (vitorias + empates / 2) / partidas
+
+    def para_elo(p):
+        p = min(max(p, 0.5 / partidas), 1 - 0.5 / partidas)
+        return -400 * math.log10(1 / p - 1)
+
+    if pontos in (0, 1): return para_elo(pontos), None
+    variancia = (vitorias * (1 - pontos) ** 2 + empates * (0.5 - pontos) ** 2 + derrotas * pontos ** 2) / partidas
+    erro = 1.96 * math.sqrt(variancia / partidas)
+    return para_elo(pontos), (para_elo(pontos + erro) - para_elo(pontos - erro)) / 2
+
+def rodar_arena(motor_a, motor_b, partidas, trabalhadores=None, maximo_lances=MAXIMO_LANCES, abertura=4, semente=0):
+    nome_a, nome_b = descrever_motor(motor_a), descrever_motor(motor_b)
+    placar, total_lances = {1: 0, 0.5: 0, 0: 0}, 0
+    tarefas = [(i, motor_a, motor_b, maximo_lances, abertura, semente) for i in range(partidas)]
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(trabalhadores or os.cpu_count() or 1) as pool:
+        for feitas, (indice, a_brancas, pontos_a, motivo, lances, tempo) in enumerate(pool.imap_unordered(_partida, tarefas), start=1):
+            placar[pontos_a] += 1
+            total_lances += lances
+            brancas, pretas = (nome_a, nome_b) if a_brancas else (nome_b, nome_a)
+            resultado = {1: '1-0', 0.5: '½-½', 0: '0-1'}[pontos_a if a_brancas else 1 - pontos_a]
+            print(f"[{feitas:>4}/{partidas}] partida {indice + 1}: {brancas} x {pretas} {resultado} ({motivo}, "
+                  f"{lances} meios-lances, {tempo:.1f}s)  placar +{placar[1]} ={placar[0.5]} -{placar[0]}", flush=True)
+    tempo_total = time.perf_counter() - inicio
+
+    diferenca, erro = elo(placar[1], placar[0.5], placar[0])
+    print(f"\n{nome_a} x {nome_b}: +{placar[1]} ={placar[0.5]} -{placar[0]} "
+          f"({(placar[1] + placar[0.5] / 2) / max(partidas, 1):.1%} dos pontos)")
+    if erro is not None: print(f"Diferença de Elo: {diferenca:+.0f} ± {erro:.0f} (95%)")
+    elif partidas:
+        ganhou_tudo = placar[1] == partidas
+        print(f"Diferença de Elo: {'>' if ganhou_tudo else '<'} {diferenca:+.0f} (placar de {100 if ganhou_tudo else 0}%, sem intervalo)")
+    print(f"Vazão: {partidas / tempo_total:.2f} partidas/s, {total_lances / tempo_total:.0f} lances/s "
+          f"({tempo_total:.1f}s no total)")
+    return placar
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partidas sem janela entre dois motores")
+    parser.add_argument('motor_a', help="ex.: motor, motor:nos=5000, aleatoria")
+    parser.add_argument('motor_b')
+    parser.add_argument('-n', '--partidas', type=int, default=100)
+    parser.add_argument('-j', '--trabalhadores', type=int, help="processos (padrão: um por núcleo)")
+    parser.add_argument('--tempo', type=float, default=0.05, help="segundos por lance dos motores alfa-beta")
+    parser.add_argument('--nos', type=int, help="nós por lance dos motores alfa-beta (no lugar do tempo)")
+    parser.add_argument('--maximo-lances', type=int, default=MAXIMO_LANCES, help="meios-lances até declarar empate")
+    parser.add_argument('--aberturas', type=int, default=4, help="meios-lances sorteados no começo de cada par de partidas")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    motores = []
+    for texto in (args.motor_a, args.motor_b):
+        try:
+            nome, opcoes = interpretar_motor(texto)
+        except ValueError as erro:
+            parser.error(str(erro))
+        if nome == 'motor' and not {'tempo', 'nos', 'profundidade'} & opcoes.keys():
+            opcoes.update({'nos': args.nos} if args.nos else {'tempo': args.tempo})
+        motores.append((nome, opcoes))
+    rodar_arena(motores[0], motores[1], args.partidas, args.trabalhadores, args.maximo_lances, args.aberturas, args.semente)
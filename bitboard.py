@@ -0,0 +1,229 @@
+# bitboard.py
+#
+# Backend alternativo de geração de lances: um inteiro de 64 bits por tipo de peça
+# e cor, com tabelas de ataque pré-calculadas. Gera exatamente os mesmos lances
+# legais que o pipeline de regras.Jogo (get_movimentos_validos + _get_movimentos_roque
+# + _filtrar_movimentos_ilegais), inclusive as particularidades dele: não há en
+# passant e o peão sempre é promovido a dama.
+#
+# Casa = linha * 8 + coluna, com a linha 0 no topo (lado das pretas), como no tabuleiro.
+
+PEAO, CAVALO, BISPO, TORRE, RAINHA, REI = range(6)
+BRANCAS, PRETAS = 0, 1
+INDICE_COR = {'w': BRANCAS, 'b': PRETAS}
+LETRA_COR = ('w', 'b')
+TIPO_POR_NOME = {'pawn': PEAO, 'knight': CAVALO, 'bishop': BISPO, 'rook': TORRE, 'queen': RAINHA, 'king': REI}
+
+
+# --- TABELAS PRÉ-CALCULADAS ---
+def _tabela_saltos(deslocamentos):
+    tabela = []
+    for casa in range(64):
+        linha, coluna = divmod(casa, 8)
+        bb = 0
+        for d_linha, d_coluna in deslocamentos:
+            if 0 <= linha + d_linha < 8 and 0 <= coluna + d_coluna < 8:
+                bb |= 1 << ((linha + d_linha) * 8 + coluna + d_coluna)
+        tabela.append(bb)
+    return tabela
+
+def _raios(d_linha, d_coluna):
+    # Para cada casa, todas as casas na direção dada até a borda (sem a própria casa)
+    tabela = []
+    for casa in range(64):
+        linha, coluna = divmod(casa, 8)
+        bb = 0
+        for i in range(1, 8):
+            l, c = linha + d_linha * i, coluna + d_coluna * i
+            if not (0 <= l < 8 and 0 <= c < 8): break
+            bb |= 1 << (l * 8 + c)
+        tabela.append(bb)
+    return tabela
+
+ATAQUES_CAVALO = _tabela_saltos([(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)])
+ATAQUES_REI = _tabela_saltos([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+ATAQUES_PEAO = (_tabela_saltos([(-1, -1), (-1, 1)]), _tabela_saltos([(1, -1), (1, 1)])) # Brancas sobem, pretas descem
+
+# (raios, crescente): em direções "crescentes" o primeiro bloqueio é o bit mais baixo
+DIRECOES_TORRE = tuple((_raios(dl, dc), dl * 8 + dc > 0) for dl, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)])
+DIRECOES_BISPO = tuple((_raios(dl, dc), dl * 8 + dc > 0) for dl, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)])
+
+
+def ataques_deslizantes(casa, ocupadas, direcoes):
+    ataques = 0
+    for raios, crescente in direcoes:
+        raio = raios[casa]
+        bloqueio = raio & ocupadas
+        if bloqueio:
+            primeira = (bloqueio & -bloqueio).bit_length() - 1 if crescente else bloqueio.bit_length() - 1
+            raio ^= raios[primeira] # Corta tudo o que está depois da primeira peça
+        ataques |= raio
+    return ataques
+
+def casas_de(bb):
+    casas = []
+    while bb:
+        menor = bb & -bb
+        casas.append(menor.bit_length() - 1)
+        bb ^= menor
+    return casas
+
+
+# --- POSIÇÃO EM BITBOARDS ---
+class PosicaoBitboard:
+    def __init__(self):
+        self.pecas = [[0] * 6, [0] * 6] # pecas[cor][tipo]
+        self.ocupadas_cor = [0, 0]
+        self.nao_movidas = 0 # Peças com ja_moveu == False (roque e avanço duplo do peão)
+        self.casas = [None] * 64 # (cor, tipo) por casa, para saber o que foi capturado
+        self.historico = []
+
+    @classmethod
+    def do_tabuleiro(cls, tabuleiro):
+        posicao = cls()
+        for linha in range(8):
+            for coluna in range(8):
+                peca = tabuleiro[linha][coluna]
+                if peca is not None:
+                    posicao.colocar(linha * 8 + coluna, INDICE_COR[peca.cor], TIPO_POR_NOME[peca.nome], peca.ja_moveu)
+        return posicao
+
+    def colocar(self, casa, cor, tipo, ja_moveu=True):
+        bit = 1 << casa
+        self.pecas[cor][tipo] |= bit
+        self.ocupadas_cor[cor] |= bit
+        self.casas[casa] = (cor, tipo)
+        if not ja_moveu: self.nao_movidas |= bit
+
+    def casa_do_rei(self, cor):
+        return self.pecas[cor][REI].bit_length() - 1
+
+    def atacada(self, casa, cor_atacante, ocupadas=None, mascara=-1):
+        # `mascara` tira do atacante as peças que um lance em teste acabou de capturar
+        p = self.pecas[cor_atacante]
+        if ocupadas is None: ocupadas = self.ocupadas_cor[0] | self.ocupadas_cor[1]
+        if ATAQUES_CAVALO[casa] & p[CAVALO] & mascara: return True
+        if ATAQUES_PEAO[1 - cor_atacante][casa] & p[PEAO] & mascara: return True
+        if ATAQUES_REI[casa] & p[REI]: return True
+        diagonais = (p[BISPO] | p[RAINHA]) & mascara
+        if diagonais and ataques_deslizantes(casa, ocupadas, DIRECOES_BISPO) & diagonais: return True
+        retas = (p[TORRE] | p[RAINHA]) & mascara
+        if retas and ataques_deslizantes(casa, ocupadas, DIRECOES_TORRE) & retas: return True
+        return False
+
+    def em_xeque(self, cor):
+        return self.atacada(self.casa_do_rei(cor), 1 - cor)
+
+    def lances_pseudo_legais(self, cor, origens=-1, apenas_capturas=False):
+        p, proprias, inimigas = self.pecas[cor], self.ocupadas_cor[cor], self.ocupadas_cor[1 - cor]
+        ocupadas = proprias | inimigas
+        lances = []
+        for tipo in (PEAO, CAVALO, BISPO, TORRE, RAINHA, REI):
+            for origem in casas_de(p[tipo] & origens):
+                if tipo == PEAO:
+                    destinos = self._avancos_peao(origem, cor, ocupadas) | (ATAQUES_PEAO[cor][origem] & inimigas)
+                elif tipo == CAVALO: destinos = ATAQUES_CAVALO[origem] & ~proprias
+                elif tipo == BISPO: destinos = ataques_deslizantes(origem, ocupadas, DIRECOES_BISPO) & ~proprias
+                elif tipo == TORRE: destinos = ataques_deslizantes(origem, ocupadas, DIRECOES_TORRE) & ~proprias
+                elif tipo == RAINHA:
+                    destinos = (ataques_deslizantes(origem, ocupadas, DIRECOES_TORRE) |
+                                ataques_deslizantes(origem, ocupadas, DIRECOES_BISPO)) & ~proprias
+                else:
+                    destinos = ATAQUES_REI[origem] & ~proprias
+                    if not apenas_capturas: destinos |= self._roques(origem, cor, ocupadas)
+                if apenas_capturas: destinos &= inimigas
+                for destino in casas_de(destinos):
+                    lances.append((origem, destino))
+        return lances
+
+    def _avancos_peao(self, origem, cor, ocupadas):
+        passo = -8 if cor == BRANCAS else 8
+        um = origem + passo
+        if not 0 <= um < 64 or ocupadas >> um & 1: return 0
+        destinos = 1 << um
+        dois = um + passo
+        if self.nao_movidas >> origem & 1 and 0 <= dois < 64 and not ocupadas >> dois & 1:
+            destinos |= 1 << dois
+        return destinos
+
+    def _roques(self, origem, cor, ocupadas):
+        # Mesmas condições de Jogo._get_movimentos_roque: rei e peça do canto sem ter movido,
+        # casas entre eles vazias, rei fora de xeque e sem passar por casa atacada
+        if not self.nao_movidas >> origem & 1 or self.atacada(origem, 1 - cor, ocupadas): return 0
+        linha, destinos = origem - origem % 8, 0
+        if self.nao_movidas >> (linha + 7) & 1 and not ocupadas & (0b01100000 << linha):
+            if not self.atacada(linha + 5, 1 - cor, ocupadas) and not self.atacada(linha + 6, 1 - cor, ocupadas):
+                destinos |= 1 << (linha + 6)
+        if self.nao_movidas >> linha & 1 and not ocupadas & (0b00001110 << linha):
+            if not self.atacada(linha + 2, 1 - cor, ocupadas) and not self.atacada(linha + 3, 1 - cor, ocupadas):
+                destinos |= 1 << (linha + 2)
+        return destinos
+
+    def lances_legais(self, cor, origens=-1, apenas_capturas=False):
+        rei = self.casa_do_rei(cor)
+        ocupadas = self.ocupadas_cor[0] | self.ocupadas_cor[1]
+        # Fora de xeque, só o rei e as peças na linha de visão dele (possíveis cravadas)
+        # podem expor o rei: os lances das outras são legais sem teste (não há en passant)
+        suspeitas = -1 if self.atacada(rei, 1 - cor, ocupadas) else \
+            ataques_deslizantes(rei, ocupadas, DIRECOES_TORRE) | ataques_deslizantes(rei, ocupadas, DIRECOES_BISPO) | 1 << rei
+        legais = []
+        for origem, destino in self.lances_pseudo_legais(cor, origens, apenas_capturas):
+            if not suspeitas >> origem & 1:
+                legais.append((origem, destino))
+                continue
+            # Não precisa fazer o lance: basta testar o rei com a ocupação resultante
+            # e sem a peça capturada
+            bit_destino = 1 << destino
+            depois = (ocupadas & ~(1 << origem)) | bit_destino
+            casa_rei = rei
+            if origem == rei:
+                casa_rei = destino
+                if abs(destino - origem) == 2: # Roque: a torre também muda de lugar
+                    linha = origem - origem % 8
+                    torre_orig, torre_final = (linha + 7, linha + 5) if destino > origem else (linha, linha + 3)
+                    depois = (depois & ~(1 << torre_orig)) | (1 << torre_final)
+            if not self.atacada(casa_rei, 1 - cor, depois, ~bit_destino):
+                legais.append((origem, destino))
+        return legais
+
+    def movimentos_legais(self, cor, origem=None, apenas_capturas=False):
+        # Mesmo formato de regras.Jogo: pares ((linha, coluna), (linha, coluna))
+        origens = -1 if origem is None else 1 << (origem[0] * 8 + origem[1])
+        return [(divmod(o, 8), divmod(d, 8)) for o, d in self.lances_legais(INDICE_COR[cor], origens, apenas_capturas)]
+
+    # --- FAZER / DESFAZER LANCE ---
+    def _tirar(self, casa):
+        cor, tipo = self.casas[casa]
+        bit = 1 << casa
+        self.pecas[cor][tipo] ^= bit
+        self.ocupadas_cor[cor] ^= bit
+        self.casas[casa] = None
+
+    def fazer_lance(self, origem, destino):
+        cor, tipo = self.casas[origem]
+        capturada = self.casas[destino]
+        self.historico.append((origem, destino, tipo, capturada, self.nao_movidas))
+        if capturada is not None: self._tirar(destino)
+        self._tirar(origem)
+        if tipo == REI and abs(destino - origem) == 2:
+            linha = origem - origem % 8
+            torre_orig, torre_final = (linha + 7, linha + 5) if destino > origem else (linha, linha + 3)
+            self._tirar(torre_orig)
+            self.colocar(torre_final, cor, TORRE)
+            self.nao_movidas &= ~(1 << torre_orig)
+        promove = tipo == PEAO and destino < 8 or tipo == PEAO and destino >= 56
+        self.colocar(destino, cor, RAINHA if promove else tipo)
+        self.nao_movidas &= ~((1 << origem) | (1 << destino))
+
+    def desfazer_lance(self):
+        origem, destino, tipo, capturada, nao_movidas = self.historico.pop()
+        cor = self.casas[destino][0]
+        self._tirar(destino)
+        self.colocar(origem, cor, tipo)
+        if capturada is not None: self.colocar(destino, *capturada)
+        if tipo == REI and abs(destino - origem) == 2:
+            linha = origem - origem % 8
+            torre_orig, torre_final = (linha + 7, linha + 5) if destino > origem else (linha, linha + 3)
+            self._tirar(torre_final)
+            self.colocar(torre_orig, cor, TORRE)
+        self.nao_movidas = nao_movidas
@@ -0,0 +1,139 @@
+# carga.py
+#
+# Teste de carga do servidor.py: abre --conexoes conexões e joga --sessoes partidas
+# ao mesmo tempo, repartidas entre elas. Em cada partida o cliente joga de brancas
+# lances legais sorteados e a IA do servidor responde de pretas, até o fim ou até
+# --lances lances. Os pedidos de uma conexão vão sem esperar as respostas (o "id"
+# casa cada resposta com o seu pedido).
+#
+# No fim mostra a vazão (pedidos/s, lances/s), as latências vistas pelo cliente e
+# as métricas do próprio servidor. Por padrão a IA é a aleatória (nivel null), que
+# mede o servidor e não a busca; --nos N põe o motor com N nós por lance.
+#
+# Uso:
+#   python carga.py --sessoes 1000 --conexoes 20 --lances 10
+#   python carga.py --sessoes 200 --nos 500 --servidor   # sobe o servidor neste processo
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from instrumentacao import Histograma
+from servidor import PORTA, Servidor
+
+
+class Cliente:
+    # Uma conexão com o servidor; pedir() pode ser chamado por várias tarefas ao mesmo tempo
+    def __init__(self, leitor, escritor, latencias=None):
+        self._leitor, self._escritor = leitor, escritor
+        self._pendentes, self._proximo_id = {}, 0
+        self.latencias = latencias if latencias is not None else {} # comando -> Histograma (microssegundos); pode ser de várias conexões
+        self._leitura = asyncio.create_task(self._ler())
+
+    @classmethod
+    async def conectar(cls, host='127.0.0.1', porta=PORTA, latencias=None):
+        leitor, escritor = await asyncio.open_connection(host, porta, limit=2 ** 20)
+        return cls(leitor, escritor, latencias)
+
+    async def pedir(self, comando, **campos):
+        self._proximo_id += 1
+        identificador, futuro = self._proximo_id, asyncio.get_running_loop().create_future()
+        self._pendentes[identificador] = futuro
+        inicio = time.perf_counter()
+        self._escritor.write(json.dumps({'comando': comando, 'id': identificador, **campos}).encode() + b'\n')
+        await self._escritor.drain()
+        resposta = await futuro
+        self.latencias.setdefault(comando, Histograma('us')).adicionar((time.perf_counter() - inicio) * 1e6)
+        if not resposta.get('ok'): raise RuntimeError(f"{comando}: {resposta.get('erro')}")
+        return resposta
+
+    async def _ler(self):
+        while True:
+            linha = await self._leitor.readline()
+            if not linha: break
+            resposta = json.loads(linha)
+            futuro = self._pendentes.pop(resposta.get('id'), None)
+            if futuro is not None and not futuro.done(): futuro.set_result(resposta)
+        for futuro in self._pendentes.values(): # Conexão caiu: acorda quem estava esperando
+            if not futuro.done(): futuro.set_exception(ConnectionError("conexão fechada pelo servidor"))
+
+    async def fechar(self):
+        self._escritor.close()
+        await self._escritor.wait_closed()
+        self._leitura.cancel()
+
+
+async def jogar_partida(cliente, maximo_lances, nivel, nos, gerador):
+    # Devolve quantos lances o cliente jogou
+    estado = await cliente.pedir('novo', ia='b', nivel=nivel, **({'nos': nos} if nos else {}))
+    sessao, jogados = estado['sessao'], 0
+    while not estado['fim'] and jogados < maximo_lances:
+        legais = (await cliente.pedir('legais', sessao=sessao))['legais']
+        if not legais: break
+        estado = await cliente.pedir('lance', sessao=sessao, lance=gerador.choice(legais))
+        jogados += 1
+    await cliente.pedir('fechar', sessao=sessao)
+    return jogados
+
+async def rodar_carga(host, porta, sessoes, conexoes, maximo_lances, nivel=None, nos=None, semente=0):
+    latencias = {}
+    clientes = [await Cliente.conectar(host, porta, latencias) for _ in range(conexoes)]
+    inicio = time.perf_counter()
+    partidas = [jogar_partida(clientes[i % conexoes], maximo_lances, nivel, nos, random.Random(semente + i)) for i in range(sessoes)]
+    resultados = await asyncio.gather(*partidas, return_exceptions=True)
+    tempo = time.perf_counter() - inicio
+    metricas = await clientes[0].pedir('metricas')
+    for cliente in clientes: await cliente.fechar()
+
+    erros = [resultado for resultado in resultados if isinstance(resultado, BaseException)]
+    lances = sum(resultado for resultado in resultados if not isinstance(resultado, BaseException))
+    pedidos = sum(histograma.quantidade for histograma in latencias.values())
+
+    print(f"{sessoes} partidas em {conexoes} conexões: {lances} lances do cliente, {pedidos} pedidos em {tempo:.2f}s "
+          f"({pedidos / tempo:.0f} pedidos/s, {lances / tempo:.0f} lances/s), {len(erros)} partida(s) com erro")
+    for erro in erros[:5]: print(f"  erro: {erro!r}")
+    print("Latência no cliente (p50/p95 com precisão de um fator 2):")
+    for comando, histograma in sorted(latencias.items()):
+        print(f"  {comando:10} {histograma.quantidade:>8}x  média {histograma.media() / 1e3:8.2f} ms  p50 {histograma.percentil(0.5) / 1e3:8.2f} ms  "
+              f"p95 {histograma.percentil(0.95) / 1e3:8.2f} ms  máx {histograma.maximo / 1e3:8.2f} ms")
+    print("No servidor:")
+    for comando, dados in sorted(metricas['latencias'].items()):
+        print(f"  {comando:16} {dados['quantidade']:>8}x  média {dados['media'] / 1e3:8.2f} ms  p95 {dados['p95'] / 1e3:8.2f} ms  "
+              f"máx {dados['maximo'] / 1e3:8.2f} ms")
+    return lances, pedidos, tempo, erros
+
+async def _com_servidor(args):
+    # --servidor: sobe o servidor neste mesmo loop, numa porta livre
+    servidor = Servidor(args.processos)
+    servidor_tcp = await servidor.iniciar(args.host, 0)
+    porta = servidor_tcp.sockets[0].getsockname()[1]
+    try:
+        async with servidor_tcp:
+            resultado = await rodar_carga(args.host, porta, args.sessoes, args.conexoes, args.lances, args.nivel, args.nos, args.semente)
+            for _ in range(100): # Espera o servidor ver as conexões fechadas antes de desligá-lo
+                if not servidor.conexoes: break
+                await asyncio.sleep(0.01)
+            return resultado
+    finally:
+        servidor.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de partidas")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--sessoes', type=int, default=1000, help="partidas simultâneas")
+    parser.add_argument('--conexoes', type=int, default=20)
+    parser.add_argument('--lances', type=int, default=10, help="lances do cliente por partida, no máximo")
+    parser.add_argument('--nivel', type=int, help="nível da IA do servidor (padrão: a aleatória)")
+    parser.add_argument('--nos', type=int, help="nós por lance da IA (no lugar do nível)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--servidor', action='store_true', help="sobe o servidor neste processo (numa porta livre)")
+    parser.add_argument('--processos', type=int, help="processos da IA do servidor, com --servidor")
+    args = parser.parse_args()
+    if args.servidor:
+        asyncio.run(_com_servidor(args))
+    else:
+        asyncio.run(rodar_carga(args.host, args.porta, args.sessoes, args.conexoes, args.lances, args.nivel, args.nos, args.semente))
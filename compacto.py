@@ -0,0 +1,116 @@
+# compacto.py
+#
+# Formato compacto de posição, para guardar muitas delas (árvores de busca, conjuntos
+# de dados, caches): 64 bytes com o código da peça de cada casa e um inteiro com o
+# estado (lado a jogar, direitos de roque e casas dos reis). bytes(posicao) dá 67
+# bytes, contra alguns kilobytes do tabuleiro de listas de peças de regras.py.
+#
+# Código da peça: tipo + 1 (1 = peão ... 6 = rei, na ordem de bitboard.py), mais 8 se
+# for preta; 0 = casa vazia. Casa = linha * 8 + coluna, como no tabuleiro.
+# Estado: bit 0 = pretas jogam | bits 1-4 = direitos de roque (máscara de zobrist.py)
+#         | bits 5-10 = casa do rei branco | bits 11-16 = casa do rei preto
+#
+# O ja_moveu das peças não é guardado: para as regras só importa nos peões (que estão
+# na casa inicial se e só se nunca andaram) e no roque (que está nos direitos).
+#
+# Uso:
+#   python compacto.py        # memória por posição: tabuleiro de peças x formato compacto
+
+import copy
+import time
+import tracemalloc
+
+from bitboard import TIPO_POR_NOME
+from regras import Bispo, Cavalo, Jogo, Peao, Rainha, Rei, Torre
+from zobrist import CANTOS_ROQUE, direitos_roque
+
+CLASSES_POR_TIPO = (Peao, Cavalo, Bispo, Torre, Rainha, Rei)
+PRETA = 8
+TAMANHO = 67 # 64 casas + 3 bytes de estado
+
+
+class PosicaoCompacta:
+    __slots__ = ('casas', 'estado')
+
+    def __init__(self, casas=None, estado=0):
+        self.casas = bytearray(64) if casas is None else bytearray(casas)
+        self.estado = estado
+
+    @classmethod
+    def do_tabuleiro(cls, tabuleiro, turno):
+        casas, reis = bytearray(64), {'w': 0, 'b': 0}
+        for linha in range(8):
+            for coluna in range(8):
+                peca = tabuleiro[linha][coluna]
+                if peca is None: continue
+                casas[linha * 8 + coluna] = TIPO_POR_NOME[peca.nome] + 1 | (PRETA if peca.cor == 'b' else 0)
+                if peca.nome == 'king': reis[peca.cor] = linha * 8 + coluna
+        return cls(casas, (turno == 'b') | direitos_roque(tabuleiro) << 1 | reis['w'] << 5 | reis['b'] << 11)
+
+    @classmethod
+    def do_jogo(cls, jogo):
+        return cls.do_tabuleiro(jogo.tabuleiro, jogo.turno)
+
+    @classmethod
+    def de_bytes(cls, dados):
+        if len(dados) != TAMANHO: raise ValueError(f"Posição compacta precisa de {TAMANHO} bytes, não {len(dados)}")
+        return cls(dados[:64], int.from_bytes(dados[64:], 'little'))
+
+    def __bytes__(self):
+        return bytes(self.casas) + self.estado.to_bytes(3, 'little')
+
+    def __eq__(self, outra):
+        return isinstance(outra, PosicaoCompacta) and self.casas == outra.casas and self.estado == outra.estado
+
+    __hash__ = None # É mutável; para usar como chave, use bytes(posicao)
+
+    @property
+    def turno(self):
+        return 'b' if self.estado & 1 else 'w'
+
+    @property
+    def direitos_roque(self):
+        return self.estado >> 1 & 15
+
+    def casa_rei(self, cor):
+        return divmod(self.estado >> (5 if cor == 'w' else 11) & 63, 8)
+
+    def para_tabuleiro(self):
+        # Tabuleiro de listas de peças, com os flags ja_moveu reconstruídos
+        tabuleiro = [[None] * 8 for _ in range(8)]
+        for casa, codigo in enumerate(self.casas):
+            if not codigo: continue
+            linha, coluna = divmod(casa, 8)
+            cor = 'b' if codigo & PRETA else 'w'
+            peca = CLASSES_POR_TIPO[(codigo & 7) - 1](linha, coluna, cor)
+            peca.ja_moveu = not (isinstance(peca, Peao) and linha == (6 if cor == 'w' else 1))
+            tabuleiro[linha][coluna] = peca
+        for bit, linha, coluna in CANTOS_ROQUE:
+            if self.direitos_roque & bit: tabuleiro[linha][4].ja_moveu = tabuleiro[linha][coluna].ja_moveu = False
+        return tabuleiro
+
+    def carregar_em(self, jogo):
+        # Começa uma partida nova no `jogo` a partir desta posição
+        jogo.carregar_tabuleiro(self.para_tabuleiro(), self.turno)
+
+
+def _memoria_por_posicao(criar, quantidade):
+    tracemalloc.start()
+    inicio, guardadas = time.perf_counter(), [criar() for _ in range(quantidade)]
+    tempo = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del guardadas
+    return memoria / quantidade, tempo / quantidade
+
+
+if __name__ == "__main__":
+    jogo, quantidade = Jogo(modo_ia=False), 10000
+    medicoes = [
+        ("tabuleiro de peças (cópia)", lambda: [[copy.copy(p) if p else None for p in linha] for linha in jogo.tabuleiro]),
+        ("PosicaoCompacta", lambda: PosicaoCompacta.do_jogo(jogo)),
+        ("bytes(PosicaoCompacta)", lambda: bytes(PosicaoCompacta.do_jogo(jogo))),
+    ]
+    for nome, criar in medicoes:
+        memoria, tempo = _memoria_por_posicao(criar, quantidade)
+        print(f"{nome:<28} {memoria:8.0f} bytes/posição {tempo * 1e6:8.1f} µs para criar")
@@ -0,0 +1,484 @@
+# finais.py
+#
+# Tabelas de finais de até 4 peças (reis incluídos), geradas por análise retrógrada e
+# consultadas pela IA com um acesso direto num mmap. Com elas a IA converte finais ganhos
+# (KQK, KRK, KQKR, ...) pelo caminho mais curto até o mate, em vez de vagar pelo tabuleiro.
+#
+# Um arquivo por material, <brancas>v<pretas>.bin (ex.: KQvKR.bin), com um byte por posição:
+# primeiro todas com as brancas a jogar, depois todas com as pretas.
+#   0 = empate, 255 = posição impossível (ou repetida por simetria), senão dtm + 1, sendo dtm a
+#   distância até o mate em meios-lances: par = quem joga perde (0 = já levou mate), ímpar = ganha.
+# Só existe a tabela com o lado mais forte de brancas; o material invertido é consultado
+# trocando as cores (e espelhando as fileiras).
+#
+# Índice: casa do rei branco numa região reduzida por simetria (10 casas sem peões, pelas 8
+# simetrias do tabuleiro; 32 com peões, que só admitem o espelho das colunas), depois o rei
+# preto e as outras peças com 64 casas cada. Cada posição tem um único índice: entre as
+# simetrias que levam o rei à região (e as trocas de peças iguais) vale a menor sequência de casas.
+#
+# Os raios e saltos de cada peça saem de get_movimentos_validos das classes de regras.py
+# (cada peça sozinha num tabuleiro vazio), então as tabelas seguem as regras deste jogo:
+# promoção só a dama, sem en passant. As posições das tabelas não têm roque; com direito a
+# roque no tabuleiro a consulta devolve None. Capturas e promoções levam a outras tabelas,
+# que são geradas antes (dependências).
+#
+# Uso:
+#   python finais.py gerar                        # todas as de 3 peças, em finais/
+#   python finais.py gerar KQvKR KRvKB            # essas e as tabelas de que dependem
+#   python finais.py verificar KQvKR -n 2000      # confere posições sorteadas contra os lances do Jogo
+#   python finais.py sondar "8/8/8/4k3/8/8/8/4KQ2 w - - 0 1"
+
+import argparse
+import mmap
+import os
+import random
+import time
+from array import array
+
+from regras import Bispo, Cavalo, Jogo, Peao, Rainha, Rei, Torre
+from zobrist import direitos_roque
+
+DIRETORIO_FINAIS = 'finais'
+MAXIMO_PECAS = 4
+EMPATE, INVALIDA = 0, 255
+NOMES_LETRAS = {'Q': 'queen', 'R': 'rook', 'B': 'bishop', 'N': 'knight', 'P': 'pawn'}
+LETRAS_NOMES = {nome: letra for letra, nome in NOMES_LETRAS.items()}
+VALOR_LETRA = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+ORDEM_LETRAS = 'QRBNP'
+DESLIZANTES = ('queen', 'rook', 'bishop')
+_SEM_CONVERSAO = -32768
+
+
+# --- GEOMETRIA DAS PEÇAS (tirada das classes de regras.py) ---
+def _geometria():
+    raios = {}
+    for classe in (Rainha, Torre, Bispo, Cavalo, Rei):
+        raios[classe.nome] = []
+        for casa in range(64):
+            linha, coluna = divmod(casa, 8)
+            tabuleiro = [[None] * 8 for _ in range(8)]
+            tabuleiro[linha][coluna] = peca = classe(linha, coluna, 'w')
+            grupos = {} # direção -> [(distância, casa)]; cavalo e rei têm um "raio" por destino
+            for l, c in peca.get_movimentos_validos(tabuleiro):
+                passo = max(abs(l - linha), abs(c - coluna))
+                direcao = ((l - linha) // passo, (c - coluna) // passo) if classe.nome in DESLIZANTES else (l, c)
+                grupos.setdefault(direcao, []).append((passo, l * 8 + c))
+            raios[classe.nome].append(tuple(tuple(destino for _, destino in sorted(grupo)) for grupo in grupos.values()))
+    avancos, capturas = {}, {}
+    for cor, inimiga, inicial in (('w', 'b', 6), ('b', 'w', 1)):
+        avancos[cor], capturas[cor] = [], []
+        for casa in range(64):
+            linha, coluna = divmod(casa, 8)
+            if linha in (0, 7): # Peão nunca fica na primeira nem na última fileira
+                avancos[cor].append(())
+                capturas[cor].append(frozenset())
+                continue
+            peao = Peao(linha, coluna, cor)
+            peao.ja_moveu = linha != inicial
+            tabuleiro = [[None] * 8 for _ in range(8)]
+            tabuleiro[linha][coluna] = peao
+            avancos[cor].append(tuple(l * 8 + c for l, c in sorted(peao.get_movimentos_validos(tabuleiro), key=lambda d: abs(d[0] - linha))))
+            tabuleiro = [[Peao(l, c, inimiga) for c in range(8)] for l in range(8)] # Inimigos em volta: só sobram as capturas
+            tabuleiro[linha][coluna] = peao
+            capturas[cor].append(frozenset(l * 8 + c for l, c in peao.get_movimentos_validos(tabuleiro)))
+    return raios, avancos, capturas
+
+RAIOS, AVANCOS_PEAO, CAPTURAS_PEAO = _geometria()
+ALCANCE = {nome: [frozenset(casa for raio in raios_casa for casa in raio) for raios_casa in lista] for nome, lista in RAIOS.items()}
+# Casas entre duas casas alinhadas (para saber se um ataque de longe está bloqueado): ENTRE[a * 64 + b]
+ENTRE = {origem * 64 + destino: raio[:k] for origem in range(64) for raio in RAIOS['queen'][origem] for k, destino in enumerate(raio)}
+# De onde um peão pode ter vindo para chegar em cada casa sem capturar: [(origem, casas do caminho)]
+ORIGENS_PEAO = {cor: [[] for _ in range(64)] for cor in 'wb'}
+for _cor in 'wb':
+    for _origem in range(64):
+        for _k, _destino in enumerate(AVANCOS_PEAO[_cor][_origem]):
+            ORIGENS_PEAO[_cor][_destino].append((_origem, AVANCOS_PEAO[_cor][_origem][:_k]))
+
+# Simetrias do tabuleiro como mapas de casa para casa
+_SIMETRIAS = [[f(l, c) for l, c in (divmod(casa, 8) for casa in range(64))] for f in (
+    lambda l, c: l * 8 + c, lambda l, c: l * 8 + 7 - c, lambda l, c: (7 - l) * 8 + c, lambda l, c: (7 - l) * 8 + 7 - c,
+    lambda l, c: c * 8 + l, lambda l, c: c * 8 + 7 - l, lambda l, c: (7 - c) * 8 + l, lambda l, c: (7 - c) * 8 + 7 - l)]
+REGIAO_SEM_PEOES = [l * 8 + c for l in range(4) for c in range(l, 4)] # Triângulo a8-d8-d5
+REGIAO_COM_PEOES = [l * 8 + c for l in range(8) for c in range(4)]   # Colunas a-d
+
+
+def _outra(cor):
+    return 'b' if cor == 'w' else 'w'
+
+def _ordenar_letras(letras):
+    return ''.join(sorted(letras, key=ORDEM_LETRAS.index))
+
+def _lado_forte_de_brancas(brancas, pretas):
+    return (sum(VALOR_LETRA[l] for l in brancas), brancas) >= (sum(VALOR_LETRA[l] for l in pretas), pretas)
+
+def nome_material(brancas, pretas):
+    # Nome da tabela para as peças (sem reis) de cada lado, e se as cores foram trocadas
+    brancas, pretas = _ordenar_letras(brancas), _ordenar_letras(pretas)
+    if _lado_forte_de_brancas(brancas, pretas): return f"K{brancas}vK{pretas}", False
+    return f"K{pretas}vK{brancas}", True
+
+
+class Material:
+    # Peças de uma tabela, na ordem do índice: rei branco, rei preto, peças brancas, peças pretas
+    def __init__(self, nome):
+        brancas, _, pretas = nome.partition('v')
+        if (not brancas.startswith('K') or not pretas.startswith('K') or any(l not in NOMES_LETRAS for l in brancas[1:] + pretas[1:])
+                or nome_material(brancas[1:], pretas[1:]) != (nome, False) or len(nome) - 1 > MAXIMO_PECAS):
+            raise ValueError(f"Material inválido: {nome!r} (ex.: KQvK, KRvKB; lado mais forte de brancas, até {MAXIMO_PECAS} peças)")
+        self.nome, self.brancas, self.pretas = nome, brancas[1:], pretas[1:]
+        self.nomes = ['king', 'king'] + [NOMES_LETRAS[l] for l in self.brancas + self.pretas]
+        self.cores = ['w', 'b'] + ['w'] * len(self.brancas) + ['b'] * len(self.pretas)
+        self.n = len(self.nomes)
+        self.indices_cor = {cor: [i for i in range(self.n) if self.cores[i] == cor] for cor in 'wb'}
+        self.peoes = [i for i in range(self.n) if self.nomes[i] == 'pawn']
+        self.regiao = REGIAO_COM_PEOES if self.peoes else REGIAO_SEM_PEOES
+        self._posicao_regiao = {casa: i for i, casa in enumerate(self.regiao)}
+        simetrias = _SIMETRIAS[:2] if self.peoes else _SIMETRIAS
+        self._simetrias_rei = [[s for s in simetrias if s[casa] in self._posicao_regiao] for casa in range(64)]
+        # Peças iguais (mesmo tipo e cor) em sequência: a ordem entre elas não muda a posição
+        self._grupos, inicio = [], 2
+        while inicio < self.n:
+            fim = inicio
+            while fim < self.n and (self.nomes[fim], self.cores[fim]) == (self.nomes[inicio], self.cores[inicio]): fim += 1
+            if fim - inicio > 1: self._grupos.append((inicio, fim))
+            inicio = fim
+        self.por_lado = len(self.regiao) * 64 ** (self.n - 1)
+
+    def dependencias(self):
+        # Materiais a que uma captura, uma promoção ou uma captura com promoção levam
+        resultado = set()
+        for lado, outro, trocar in ((self.brancas, self.pretas, False), (self.pretas, self.brancas, True)):
+            capturas = {outro.replace(l, '', 1) for l in outro} | {outro}
+            promocoes = {lado.replace('P', 'Q', 1)} if 'P' in lado else set()
+            for meu, seu in [(lado, c) for c in capturas if c != outro] + [(p, c) for p in promocoes for c in capturas]:
+                brancas, pretas = (seu, meu) if trocar else (meu, seu)
+                if brancas or pretas: resultado.add(nome_material(brancas, pretas)[0])
+        return sorted(resultado)
+
+    def casas_de(self, pecas):
+        # [(nome, cor, casa)] -> casas na ordem do índice
+        casas, livres = [None] * self.n, list(range(self.n))
+        for nome, cor, casa in pecas:
+            for k, i in enumerate(livres):
+                if self.nomes[i] == nome and self.cores[i] == cor:
+                    casas[i] = casa
+                    del livres[k]
+                    break
+        return casas
+
+    def indice(self, casas):
+        melhor = None
+        for simetria in self._simetrias_rei[casas[0]]:
+            nova = [simetria[casa] for casa in casas]
+            for inicio, fim in self._grupos: nova[inicio:fim] = sorted(nova[inicio:fim])
+            if melhor is None or nova < melhor: melhor = nova
+        indice = self._posicao_regiao[melhor[0]]
+        for casa in melhor[1:]: indice = indice * 64 + casa
+        return indice
+
+    def repetida(self, casas, indice):
+        # A posição do índice é uma cópia simétrica de outra (que tem o índice de verdade)?
+        if len(self._simetrias_rei[casas[0]]) == 1 and not self._grupos: return False # Caso comum: só a identidade
+        return self.indice(casas) != indice
+
+    def decodificar(self, indice):
+        casas = []
+        for _ in range(self.n - 1):
+            indice, casa = divmod(indice, 64)
+            casas.append(casa)
+        casas.append(self.regiao[indice])
+        casas.reverse()
+        return casas
+
+    def atacada(self, alvo, cor, casas, ocupadas):
+        # Alguma peça de `cor` ataca `alvo`? Peças capturadas têm casa -1
+        for i in self.indices_cor[cor]:
+            casa = casas[i]
+            if casa < 0: continue
+            nome = self.nomes[i]
+            if nome == 'pawn':
+                if alvo in CAPTURAS_PEAO[cor][casa]: return True
+            elif alvo in ALCANCE[nome][casa]:
+                if nome not in DESLIZANTES or not any(c in ocupadas for c in ENTRE[casa * 64 + alvo]): return True
+        return False
+
+    def valida(self, casas, cor):
+        # Posição possível com `cor` a jogar: casas distintas, reis separados, peões fora das
+        # pontas e o lado que não joga fora de xeque
+        if len(set(casas)) < self.n or casas[1] in ALCANCE['king'][casas[0]]: return False
+        if any(casas[i] // 8 in (0, 7) for i in self.peoes): return False
+        oponente = _outra(cor)
+        return not self.atacada(casas[0 if oponente == 'w' else 1], cor, casas, set(casas))
+
+    def lances(self, casas, cor):
+        # Lances de `cor` segundo as regras das peças: (peça, destino, peça capturada ou -1)
+        ocupadas = {casa: i for i, casa in enumerate(casas) if casa >= 0}
+        for i in self.indices_cor[cor]:
+            origem = casas[i]
+            if origem < 0: continue
+            nome = self.nomes[i]
+            if nome == 'pawn':
+                for destino in AVANCOS_PEAO[cor][origem]:
+                    if destino in ocupadas: break
+                    yield i, destino, -1
+                for destino in CAPTURAS_PEAO[cor][origem]:
+                    j = ocupadas.get(destino)
+                    if j is not None and self.cores[j] != cor: yield i, destino, j
+                continue
+            for raio in RAIOS[nome][origem]:
+                for destino in raio:
+                    j = ocupadas.get(destino)
+                    if j is None:
+                        yield i, destino, -1
+                        continue
+                    if self.cores[j] != cor: yield i, destino, j
+                    break
+
+    def predecessores(self, casas, cor):
+        # Índices das posições (com `cor` a jogar) de onde um lance de `cor` sem captura nem
+        # promoção leva a `casas`
+        ocupadas, resultado = set(casas), set()
+        for i in self.indices_cor[cor]:
+            destino = casas[i]
+            if self.nomes[i] == 'pawn':
+                for origem, caminho in ORIGENS_PEAO[cor][destino]:
+                    if origem not in ocupadas and not any(c in ocupadas for c in caminho):
+                        anterior = casas[:]
+                        anterior[i] = origem
+                        resultado.add(self.indice(anterior))
+                continue
+            for raio in RAIOS[self.nomes[i]][destino]:
+                for origem in raio:
+                    if origem in ocupadas: break
+                    anterior = casas[:]
+                    anterior[i] = origem
+                    resultado.add(self.indice(anterior))
+        return resultado
+
+
+def resultado(valor):
+    # Byte da tabela -> (1 ganha / 0 empate / -1 perde, do ponto de vista de quem joga; dtm em meios-lances)
+    if valor == EMPATE: return 0, None
+    if valor == INVALIDA: raise ValueError("Posição impossível")
+    return (1 if valor % 2 == 0 else -1), valor - 1
+
+def _pontuacao_filho(valor):
+    # Byte do ponto de vista do oponente (depois do lance) -> pontuação para quem fez o lance:
+    # ganhar é melhor quanto mais cedo, perder é melhor quanto mais tarde. O dtm do lance é o próprio byte
+    if valor == EMPATE: return 0
+    return 1000 - valor if valor % 2 else valor - 1000
+
+
+# --- CONSULTA ---
+class TabelasFinais:
+    def __init__(self, diretorio=DIRETORIO_FINAIS):
+        self.diretorio = diretorio
+        self._tabelas = {} # nome -> (Material, mmap)
+        self._arquivos = []
+
+    def fechar(self):
+        for material, dados in self._tabelas.values(): dados.close()
+        for arquivo in self._arquivos: arquivo.close()
+        self._tabelas, self._arquivos = {}, []
+
+    def caminho(self, nome):
+        return os.path.join(self.diretorio, nome + '.bin')
+
+    def tabela(self, nome):
+        # Abre a tabela na primeira consulta; FileNotFoundError se ela ainda não foi gerada
+        if nome not in self._tabelas:
+            material = Material(nome)
+            arquivo = open(self.caminho(nome), 'rb')
+            if os.fstat(arquivo.fileno()).st_size != 2 * material.por_lado:
+                arquivo.close()
+                raise ValueError(f"{self.caminho(nome)}: tamanho errado (esperado {2 * material.por_lado} bytes)")
+            self._arquivos.append(arquivo)
+            self._tabelas[nome] = (material, mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._tabelas[nome]
+
+    def valor(self, pecas, turno):
+        # Byte da tabela para as peças [(nome, cor, casa)] com `turno` a jogar; sem peças além dos reis é empate
+        letras = {'w': '', 'b': ''}
+        for nome, cor, _ in pecas:
+            if nome != 'king': letras[cor] += LETRAS_NOMES[nome]
+        if not letras['w'] and not letras['b']: return EMPATE
+        nome, trocar = nome_material(letras['w'], letras['b'])
+        if trocar:
+            pecas = [(peca, _outra(cor), (7 - casa // 8) * 8 + casa % 8) for peca, cor, casa in pecas]
+            turno = _outra(turno)
+        material, dados = self.tabela(nome)
+        return dados[material.indice(material.casas_de(pecas)) + (material.por_lado if turno == 'b' else 0)]
+
+    def sondar(self, jogo):
+        # (resultado, dtm) da posição do jogo para quem joga (ver resultado()), ou None se não há tabela
+        pecas = _pecas_do_jogo(jogo)
+        if pecas is None: return None
+        try:
+            return resultado(self.valor(pecas, jogo.turno))
+        except FileNotFoundError:
+            return None
+
+    def melhor_lance(self, jogo):
+        # Lance que ganha mais rápido (ou perde mais devagar, ou empata), ou None fora das tabelas
+        if _pecas_do_jogo(jogo) is None: return None
+        oponente, melhor, melhor_pontuacao = _outra(jogo.turno), None, None
+        for lance in jogo.lances_da_posicao():
+            jogo.fazer_lance(*lance)
+            try:
+                pontuacao = _pontuacao_filho(self.valor(_pecas_do_jogo(jogo), oponente))
+            except FileNotFoundError:
+                return None
+            finally:
+                jogo.desfazer_lance()
+            if melhor_pontuacao is None or pontuacao > melhor_pontuacao: melhor, melhor_pontuacao = lance, pontuacao
+        return melhor
+
+    # --- GERAÇÃO ---
+    def gerar(self, nome, mensagens=print):
+        # Gera a tabela (e antes as de que ela depende, se faltarem) e a grava no diretório
+        material = Material(nome)
+        for dependencia in material.dependencias():
+            if not os.path.exists(self.caminho(dependencia)): self.gerar(dependencia, mensagens)
+        inicio, por_lado = time.perf_counter(), material.por_lado
+        valores = bytearray(2 * por_lado)
+        faltam = bytearray(2 * por_lado) # Lances sem captura/promoção cujo resultado ainda não se sabe
+        conversao = array('h', [_SEM_CONVERSAO]) * (2 * por_lado) # Melhor pontuação entre capturas e promoções
+        baldes = {} # dtm -> posições (índice global) a fixar com esse dtm
+
+        for lado, cor in enumerate('wb'):
+            base, oponente, rei = lado * por_lado, _outra(cor), lado
+            for indice in range(por_lado):
+                casas = material.decodificar(indice)
+                if not material.valida(casas, cor) or material.repetida(casas, indice):
+                    valores[base + indice] = INVALIDA
+                    continue
+                filhos, melhor = set(), _SEM_CONVERSAO
+                for i, destino, capturada in material.lances(casas, cor):
+                    depois = casas[:]
+                    depois[i] = destino
+                    if capturada >= 0: depois[capturada] = -1
+                    if material.atacada(depois[rei], oponente, depois, set(depois)): continue # Deixaria o rei em xeque
+                    if capturada >= 0 or (material.nomes[i] == 'pawn' and destino // 8 in (0, 7)):
+                        pecas = [('queen' if j == i and material.nomes[j] == 'pawn' else material.nomes[j], material.cores[j], casa)
+                                 for j, casa in enumerate(depois) if casa >= 0]
+                        melhor = max(melhor, _pontuacao_filho(self.valor(pecas, oponente)))
+                    else:
+                        filhos.add(material.indice(depois))
+                global_ = base + indice
+                faltam[global_], conversao[global_] = len(filhos), melhor
+                if melhor > 0: baldes.setdefault(1000 - melhor, []).append(global_) # Captura/promoção que ganha
+                if filhos: continue
+                if melhor == _SEM_CONVERSAO: # Sem lances: mate ou afogamento
+                    if material.atacada(casas[rei], oponente, casas, set(casas)): baldes.setdefault(0, []).append(global_)
+                elif melhor < 0: baldes.setdefault(melhor + 1000, []).append(global_) # Só capturas, todas perdendo
+
+        dtm = 0
+        while baldes:
+            for global_ in baldes.pop(dtm, ()):
+                if valores[global_]: continue # Já fixada com dtm menor
+                if dtm + 1 >= INVALIDA: raise OverflowError(f"{nome}: dtm {dtm} não cabe em um byte")
+                valores[global_] = dtm + 1
+                lado, indice = divmod(global_, por_lado)
+                oponente = 'wb'[1 - lado]
+                base_anterior = (1 - lado) * por_lado
+                for anterior in material.predecessores(material.decodificar(indice), oponente):
+                    anterior += base_anterior
+                    if valores[anterior]: continue
+                    if dtm % 2 == 0: # Quem joga aqui perde: quem chegou aqui ganha
+                        baldes.setdefault(dtm + 1, []).append(anterior)
+                        continue
+                    faltam[anterior] -= 1
+                    if faltam[anterior] == 0 and conversao[anterior] < 0: # Todos os lances perdem
+                        perda = dtm + 1 if conversao[anterior] == _SEM_CONVERSAO else max(dtm + 1, conversao[anterior] + 1000)
+                        baldes.setdefault(perda, []).append(anterior)
+            dtm += 1
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self.caminho(nome) + '.tmp', 'wb') as saida: saida.write(valores)
+        os.replace(self.caminho(nome) + '.tmp', self.caminho(nome)) # Nunca fica uma tabela pela metade
+        validas = len(valores) - valores.count(INVALIDA)
+        ganhas = sum(1 for v in valores if v != INVALIDA and v and v % 2 == 0)
+        maior = max((v for v in valores if v != INVALIDA), default=0)
+        mensagens(f"{nome}: {validas} posições ({ganhas} ganhas, {validas - ganhas - valores.count(EMPATE)} perdidas, "
+                  f"{valores.count(EMPATE)} empates), maior dtm {max(maior - 1, 0)} meios-lances, "
+                  f"{time.perf_counter() - inicio:.1f}s")
+        return valores
+
+
+def _pecas_do_jogo(jogo):
+    # [(nome, cor, casa)] se a posição cabe nas tabelas (até MAXIMO_PECAS peças, sem roque), senão None
+    pecas = [(peca.nome, peca.cor, peca.linha * 8 + peca.coluna) for fileira in jogo.tabuleiro for peca in fileira if peca is not None]
+    if len(pecas) > MAXIMO_PECAS or direitos_roque(jogo.tabuleiro): return None
+    return pecas
+
+
+def verificar(tabelas, nome, amostras, gerador=random):
+    # Sorteia posições válidas e confere cada uma contra os lances legais do Jogo: o valor
+    # guardado tem de ser o melhor entre os dos filhos (ou mate/afogamento se não há lances)
+    material, dados = tabelas.tabela(nome)
+    jogo, erros, conferidas = Jogo(modo_ia=False, nivel_ia=None), 0, 0
+    classes = {'king': Rei, 'queen': Rainha, 'rook': Torre, 'bishop': Bispo, 'knight': Cavalo, 'pawn': Peao}
+    while conferidas < amostras:
+        global_ = gerador.randrange(2 * material.por_lado)
+        if dados[global_] == INVALIDA: continue
+        lado, indice = divmod(global_, material.por_lado)
+        tabuleiro = [[None] * 8 for _ in range(8)]
+        for i, casa in enumerate(material.decodificar(indice)):
+            linha, coluna = divmod(casa, 8)
+            peca = classes[material.nomes[i]](linha, coluna, material.cores[i])
+            peca.ja_moveu = not (peca.nome == 'pawn' and linha == (6 if peca.cor == 'w' else 1))
+            tabuleiro[linha][coluna] = peca
+        jogo.carregar_tabuleiro(tabuleiro, 'wb'[lado])
+        conferidas += 1
+        lances = jogo.gerar_lances_legais(jogo.turno)
+        if not lances:
+            esperado = 1 if jogo.is_in_check(jogo.turno) else EMPATE
+        else:
+            melhor = None
+            for lance in lances:
+                jogo.fazer_lance(*lance)
+                pontuacao = _pontuacao_filho(tabelas.valor(_pecas_do_jogo(jogo), _outra(jogo.turno)))
+                jogo.desfazer_lance()
+                melhor = pontuacao if melhor is None else max(melhor, pontuacao)
+            esperado = EMPATE if melhor == 0 else (1000 - melhor if melhor > 0 else melhor + 1000) + 1
+        if dados[global_] != esperado:
+            erros += 1
+            print(f"{jogo.gerar_fen()}: tabela {dados[global_]}, esperado {esperado}")
+    return erros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabelas de finais (análise retrógrada)")
+    parser.add_argument('-d', '--diretorio', default=DIRETORIO_FINAIS)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    gerar = comandos.add_parser('gerar', help="gera tabelas (padrão: todas as de 3 peças)")
+    gerar.add_argument('materiais', nargs='*', default=['KQvK', 'KRvK', 'KBvK', 'KNvK', 'KPvK'])
+    gerar.add_argument('-f', '--forcar', action='store_true', help="gera de novo mesmo se o arquivo existir")
+    conferir = comandos.add_parser('verificar', help="confere posições sorteadas contra os lances do Jogo")
+    conferir.add_argument('materiais', nargs='+')
+    conferir.add_argument('-n', '--amostras', type=int, default=1000)
+    sonda = comandos.add_parser('sondar', help="valor e melhor lance de uma posição")
+    sonda.add_argument('fen')
+    args = parser.parse_args()
+
+    tabelas = TabelasFinais(args.diretorio)
+    if args.comando == 'gerar':
+        for nome in args.materiais:
+            if args.forcar or not os.path.exists(tabelas.caminho(nome)): tabelas.gerar(nome)
+            else: print(f"{nome}: já existe ({tabelas.caminho(nome)})")
+    elif args.comando == 'verificar':
+        for nome in args.materiais:
+            inicio = time.perf_counter()
+            erros = verificar(tabelas, nome, args.amostras)
+            print(f"{nome}: {args.amostras} posições, {erros} divergência(s), {time.perf_counter() - inicio:.1f}s")
+    else:
+        jogo = Jogo(modo_ia=False, nivel_ia=None)
+        jogo.carregar_fen(args.fen)
+        sondagem = tabelas.sondar(jogo)
+        if sondagem is None:
+            print("Posição fora das tabelas (mais de 4 peças, roque possível ou tabela não gerada)")
+        else:
+            valor, dtm = sondagem
+            texto = {1: f"ganha, mate em {dtm} meios-lances", 0: "empate", -1: f"perde, mate em {dtm} meios-lances"}[valor]
+            print(f"{'Brancas' if jogo.turno == 'w' else 'Pretas'} jogam: {texto}; melhor lance {tabelas.melhor_lance(jogo)}")
+    tabelas.fechar()
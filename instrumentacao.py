@@ -0,0 +1,246 @@
+# instrumentacao.py
+#
+# Contadores e cronômetros opcionais nos caminhos quentes: quantas vezes cada função
+# roda e quanto tempo leva, por lance e por quadro. Desligada, não custa nada: as
+# funções originais só são trocadas por versões medidas em ativar(), e desativar()
+# as devolve.
+#
+# Métricas: Jogo.is_square_under_attack, get_movimentos_validos (todas as peças),
+# copy.deepcopy (o jogo não usa; fica medido para pegar uma regressão), Jogo.copiar,
+# Jogo.verificar_fim_de_jogo, Jogo.escolher_lance_ia e, com a janela aberta,
+# JogoGrafico.desenhar_tudo. Os tempos são inclusivos (o de verificar_fim_de_jogo
+# contém os ataques que ele testa). Uma chamada de dentro da mesma métrica (a Rainha
+# chamando Torre.get_movimentos_validos) não é contada de novo.
+#
+# "Janelas" fecham a cada lance jogado (Jogo._mover) e a cada quadro desenhado e
+# guardam histogramas (faixas em potências de 2) do quanto cada métrica andou entre
+# um fechamento e o outro. As buscas em outros processos (paralelo.py) não entram;
+# a da thread da interface, sim. Com duas threads, alguma contagem pode se perder.
+#
+# Na interface: XADREZ_INSTRUMENTACAO=medidas.json python xadrez.py (ou .csv) liga a
+# instrumentação, F3 mostra/esconde o painel e o arquivo é gravado na saída.
+#
+# Uso:
+#   python instrumentacao.py -n 40 --tempo 0.05 -o medidas.json   # partida sem janela, motor x motor
+
+import argparse
+import atexit
+import copy
+import csv
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+
+INSTRUMENTACAO = None # A instância ativa (ativar/desativar), ou None
+RECENTES = 120 # Amostras guardadas em cada histograma para o painel (último valor, média recente)
+
+
+class Metrica:
+    __slots__ = ('nome', 'chamadas', 'tempo_ns', 'maximo_ns')
+
+    def __init__(self, nome):
+        self.nome, self.chamadas, self.tempo_ns, self.maximo_ns = nome, 0, 0, 0
+
+    def para_dict(self):
+        return {'chamadas': self.chamadas, 'tempo_ms': self.tempo_ns / 1e6,
+                'medio_us': self.tempo_ns / 1e3 / self.chamadas if self.chamadas else 0.0, 'maximo_us': self.maximo_ns / 1e3}
+
+
+class Histograma:
+    # Faixa i conta os valores em [2^(i-1), 2^i); a faixa 0, os menores que 1
+    def __init__(self, unidade):
+        self.unidade, self.faixas, self.quantidade, self.soma, self.maximo = unidade, [], 0, 0.0, 0.0
+        self.recentes = deque(maxlen=RECENTES)
+
+    def adicionar(self, valor):
+        faixa = max(math.frexp(valor)[1], 0) if valor >= 1 else 0
+        if faixa >= len(self.faixas): self.faixas.extend([0] * (faixa + 1 - len(self.faixas)))
+        self.faixas[faixa] += 1
+        self.quantidade, self.soma, self.maximo = self.quantidade + 1, self.soma + valor, max(self.maximo, valor)
+        self.recentes.append(valor)
+
+    def media(self):
+        return self.soma / self.quantidade if self.quantidade else 0.0
+
+    def percentil(self, fracao):
+        # Limite superior da faixa onde cai o percentil (precisão de um fator 2)
+        alvo, acumulado = fracao * self.quantidade, 0
+        for faixa, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo: return min(float(2 ** faixa), self.maximo)
+        return self.maximo
+
+    def para_dict(self):
+        return {'unidade': self.unidade, 'quantidade': self.quantidade, 'media': self.media(), 'maximo': self.maximo,
+                'p50': self.percentil(0.5), 'p95': self.percentil(0.95), 'p99': self.percentil(0.99),
+                'faixas': {f"<{2 ** faixa:g}": quantidade for faixa, quantidade in enumerate(self.faixas) if quantidade}}
+
+
+class Janela:
+    # Intervalo que se repete (um lance, um quadro): a cada fechamento, quanto cada
+    # métrica andou desde o anterior vai para os histogramas
+    def __init__(self, nome, metricas):
+        self.nome, self.metricas = nome, metricas
+        self.duracao = Histograma('ms') # Tempo entre dois fechamentos
+        self.chamadas, self.tempos = {}, {} # nome da métrica -> Histograma (chamadas / microssegundos)
+        self._marcas, self._ultimo_ns = {}, time.perf_counter_ns()
+        self.ultimo = {} # Nome da métrica -> (chamadas, tempo em ms) na última janela fechada
+
+    def fechar(self):
+        agora = time.perf_counter_ns()
+        self.duracao.adicionar((agora - self._ultimo_ns) / 1e6)
+        self._ultimo_ns, ultimo = agora, {}
+        for nome, metrica in self.metricas.items():
+            chamadas_antes, tempo_antes = self._marcas.get(nome, (0, 0))
+            chamadas, tempo = metrica.chamadas - chamadas_antes, metrica.tempo_ns - tempo_antes
+            self._marcas[nome] = (metrica.chamadas, metrica.tempo_ns)
+            self.chamadas.setdefault(nome, Histograma('chamadas')).adicionar(chamadas)
+            self.tempos.setdefault(nome, Histograma('us')).adicionar(tempo / 1e3)
+            ultimo[nome] = (chamadas, tempo / 1e6)
+        self.ultimo = ultimo
+
+    def para_dict(self):
+        return {'duracao': self.duracao.para_dict(),
+                'chamadas': {nome: histograma.para_dict() for nome, histograma in self.chamadas.items()},
+                'tempos': {nome: histograma.para_dict() for nome, histograma in self.tempos.items()}}
+
+
+class Instrumentacao:
+    def __init__(self):
+        self.metricas = {} # nome -> Metrica
+        self.lances, self.quadros = Janela('lance', self.metricas), Janela('quadro', self.metricas)
+        self._originais = [] # (dono, atributo, função original) para desativar()
+        self._local = threading.local() # Métricas em andamento nesta thread (chamadas aninhadas)
+        self.inicio = time.time()
+
+    def medir(self, dono, atributo, nome=None, ao_terminar=None):
+        # Troca dono.atributo (método de classe ou função de módulo) por uma versão medida.
+        # `ao_terminar(resultado)` roda depois de cada chamada de fora (fecha uma janela)
+        original = getattr(dono, atributo)
+        nome = nome or atributo
+        metrica = self.metricas.setdefault(nome, Metrica(nome))
+        local = self._local
+
+        @functools.wraps(original)
+        def medida(*args, **kwargs):
+            if getattr(local, nome, False): return original(*args, **kwargs) # Aninhada: já está sendo medida
+            setattr(local, nome, True)
+            inicio = time.perf_counter_ns()
+            try:
+                resultado = original(*args, **kwargs)
+            finally:
+                tempo = time.perf_counter_ns() - inicio
+                setattr(local, nome, False)
+                metrica.chamadas += 1
+                metrica.tempo_ns += tempo
+                if tempo > metrica.maximo_ns: metrica.maximo_ns = tempo
+            if ao_terminar is not None: ao_terminar(resultado)
+            return resultado
+
+        self._originais.append((dono, atributo, original))
+        setattr(dono, atributo, medida)
+
+    def restaurar(self):
+        for dono, atributo, original in reversed(self._originais): setattr(dono, atributo, original)
+        self._originais = []
+
+    def fim_do_lance(self, jogado):
+        if jogado: self.lances.fechar()
+
+    def fim_do_quadro(self, _=None):
+        self.quadros.fechar()
+
+    def para_dict(self):
+        return {'inicio': self.inicio, 'duracao_s': time.time() - self.inicio,
+                'metricas': {nome: metrica.para_dict() for nome, metrica in self.metricas.items()},
+                'por_lance': self.lances.para_dict(), 'por_quadro': self.quadros.para_dict()}
+
+    def linhas_painel(self):
+        # Texto do painel da interface: quadros, último lance e o total de cada métrica
+        quadro, linhas = self.quadros.duracao, []
+        desenho = self.quadros.tempos.get('desenhar_tudo')
+        if desenho is not None:
+            # Mediana e máximo dos quadros recentes; o intervalo inclui a espera por eventos com a tela parada
+            recentes, intervalos = sorted(desenho.recentes), sorted(quadro.recentes)
+            linhas.append(f"desenho {recentes[len(recentes) // 2] / 1e3:.2f} ms (máx {recentes[-1] / 1e3:.2f}), "
+                          f"intervalo entre quadros {intervalos[len(intervalos) // 2]:.1f} ms")
+        linhas.append(f"lances: {self.lances.duracao.quantidade}")
+        for nome, metrica in self.metricas.items():
+            chamadas, tempo = self.lances.ultimo.get(nome, (0, 0.0))
+            linhas.append(f"{nome}: {chamadas}x {tempo:.1f} ms no lance, {metrica.chamadas}x {metrica.tempo_ns / 1e6:.0f} ms total")
+        return linhas
+
+    def salvar(self, caminho):
+        # .csv: uma linha por valor (tipo, nome, campo, valor); qualquer outra extensão: JSON
+        dados = self.para_dict()
+        if not caminho.lower().endswith('.csv'):
+            with open(caminho, 'w', encoding='utf-8') as arquivo: json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+            return
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(('tipo', 'nome', 'campo', 'valor'))
+            for nome, valores in dados['metricas'].items():
+                for campo, valor in valores.items(): escritor.writerow(('metrica', nome, campo, valor))
+            for janela in ('por_lance', 'por_quadro'):
+                linhas = [('duracao', dados[janela]['duracao'])]
+                linhas += [(f"chamadas.{nome}", histograma) for nome, histograma in dados[janela]['chamadas'].items()]
+                linhas += [(f"tempos.{nome}", histograma) for nome, histograma in dados[janela]['tempos'].items()]
+                for nome, histograma in linhas:
+                    for campo, valor in histograma.items():
+                        if campo == 'faixas':
+                            for faixa, quantidade in valor.items(): escritor.writerow((janela, nome, faixa, quantidade))
+                        else:
+                            escritor.writerow((janela, nome, campo, valor))
+
+
+def ativar(arquivo=None):
+    # Liga a instrumentação das regras (idempotente). Com `arquivo`, grava as medidas na saída do programa
+    global INSTRUMENTACAO
+    if INSTRUMENTACAO is not None: return INSTRUMENTACAO
+    import regras # Import local: regras.py não depende deste módulo
+    instrumentacao = Instrumentacao()
+    instrumentacao.medir(regras.Jogo, 'is_square_under_attack')
+    for classe in (regras.Peao, regras.Torre, regras.Cavalo, regras.Bispo, regras.Rainha, regras.Rei):
+        instrumentacao.medir(classe, 'get_movimentos_validos')
+    instrumentacao.medir(copy, 'deepcopy', 'copy.deepcopy')
+    instrumentacao.medir(regras.Jogo, 'copiar')
+    instrumentacao.medir(regras.Jogo, 'verificar_fim_de_jogo')
+    instrumentacao.medir(regras.Jogo, 'escolher_lance_ia')
+    instrumentacao.medir(regras.Jogo, '_mover', ao_terminar=instrumentacao.fim_do_lance)
+    if arquivo: atexit.register(instrumentacao.salvar, arquivo)
+    INSTRUMENTACAO = instrumentacao
+    return instrumentacao
+
+def desativar():
+    global INSTRUMENTACAO
+    if INSTRUMENTACAO is not None: INSTRUMENTACAO.restaurar()
+    INSTRUMENTACAO = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partida sem janela com a instrumentação ligada")
+    parser.add_argument('-n', '--lances', type=int, default=40, help="meios-lances")
+    parser.add_argument('--tempo', type=float, default=0.05, help="segundos por lance do motor")
+    parser.add_argument('-o', '--saida', help="arquivo .json ou .csv com as medidas")
+    args = parser.parse_args()
+
+    instrumentacao = ativar(args.saida)
+    from motor import Motor
+    from regras import Jogo
+    jogo, motor = Jogo(modo_ia=False), Motor(tempo_limite=args.tempo)
+    while not jogo.game_over and len(jogo.lances_partida) < args.lances:
+        jogo.cor_ia = jogo.turno
+        lance = jogo.escolher_lance_ia(motor)
+        if lance is None: break
+        jogo.aplicar_lance(lance)
+        if not jogo.game_over: jogo.trocar_turno()
+
+    print(f"{'métrica':24} {'chamadas':>10} {'total ms':>10} {'médio us':>9} {'por lance (p50/p95)':>22}")
+    for nome, metrica in instrumentacao.metricas.items():
+        dados, por_lance = metrica.para_dict(), instrumentacao.lances.chamadas.get(nome)
+        faixa = f"{por_lance.percentil(0.5):g}/{por_lance.percentil(0.95):g}" if por_lance is not None else '-'
+        print(f"{nome:24} {dados['chamadas']:>10} {dados['tempo_ms']:>10.1f} {dados['medio_us']:>9.1f} {faixa:>22}")
+    if args.saida: print(f"Medidas gravadas em {args.saida} na saída")
@@ -0,0 +1,164 @@
+# livro.py
+#
+# Livro de aberturas: arquivo binário com registros de 16 bytes no formato do Polyglot
+# (chave de 64 bits, lance de 16, peso de 16, "learn" de 32; big-endian), ordenados pela
+# chave. O arquivo é aberto com mmap e consultado por busca binária: nada é carregado na
+# memória, e abrir um livro de centenas de MB é instantâneo.
+#
+# A chave é a de zobrist.py (a mesma de Jogo.chave_zobrist), e não a Random64 do
+# Polyglot: o layout e a codificação dos lances são os do Polyglot, mas livros gerados
+# por outros programas não acham as posições daqui. Use este módulo para gerar o livro.
+#
+# Lances: bits 0-5 destino, 6-11 origem (coluna + 8 * fileira, fileira 0 = 1ª), 12-14
+# promoção (4 = dama); o roque é codificado como o rei "capturando" a própria torre.
+# Peso dos lances gerados: 2 por vitória e 1 por empate de quem jogou o lance.
+#
+# Uso:
+#   python livro.py construir partidas.pgn [mais.pgn ...] -o livro.bin --profundidade 24
+#   python livro.py consultar livro.bin [--fen "<FEN>"]
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+
+from regras import FEN_INICIAL, Jogo
+
+_REGISTRO = struct.Struct('>QHHI')
+_CHAVE = struct.Struct('>Q')
+TAMANHO_REGISTRO = _REGISTRO.size # 16
+PESO_MAXIMO = 0xFFFF
+PONTOS_RESULTADO = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)} # (brancas, pretas)
+
+
+# --- CODIFICAÇÃO DOS LANCES ---
+def codificar_lance(jogo, lance):
+    # Lance (origem, destino) da posição atual -> 16 bits do Polyglot
+    (l_orig, c_orig), (l_dest, c_dest) = lance
+    peca = jogo.tabuleiro[l_orig][c_orig]
+    if peca.nome == 'king' and abs(c_dest - c_orig) == 2: c_dest = 7 if c_dest > c_orig else 0 # Rei na casa da torre
+    promocao = 4 if peca.nome == 'pawn' and l_dest in (0, 7) else 0
+    return promocao << 12 | ((7 - l_orig) * 8 + c_orig) << 6 | (7 - l_dest) * 8 + c_dest
+
+def decodificar_lance(jogo, codigo):
+    # 16 bits do Polyglot -> lance (origem, destino) na posição atual (sem checar a legalidade)
+    fileira_orig, c_orig = divmod(codigo >> 6 & 63, 8)
+    fileira_dest, c_dest = divmod(codigo & 63, 8)
+    l_orig, l_dest = 7 - fileira_orig, 7 - fileira_dest
+    peca, alvo = jogo.tabuleiro[l_orig][c_orig], jogo.tabuleiro[l_dest][c_dest]
+    if (peca is not None and peca.nome == 'king' and alvo is not None and alvo.nome == 'rook'
+            and alvo.cor == peca.cor and l_orig == l_dest):
+        c_dest = c_orig + 2 if c_dest > c_orig else c_orig - 2
+    return (l_orig, c_orig), (l_dest, c_dest)
+
+
+# --- CONSULTA ---
+class LivroAberturas:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'rb')
+        tamanho = os.fstat(self._arquivo.fileno()).st_size
+        if tamanho % TAMANHO_REGISTRO: raise ValueError(f"{caminho}: tamanho não é múltiplo de {TAMANHO_REGISTRO} bytes")
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b'' # mmap não aceita arquivo vazio
+        self.registros = tamanho // TAMANHO_REGISTRO
+
+    def __len__(self):
+        return self.registros
+
+    def fechar(self):
+        if isinstance(self._mapa, mmap.mmap): self._mapa.close()
+        self._arquivo.close()
+
+    def entradas(self, chave):
+        # [(código do lance, peso)] da posição, na ordem do arquivo; primeiro registro com a chave por busca binária
+        inicio, fim = 0, self.registros
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if _CHAVE.unpack_from(self._mapa, meio * TAMANHO_REGISTRO)[0] < chave: inicio = meio + 1
+            else: fim = meio
+        encontradas = []
+        for indice in range(inicio, self.registros):
+            chave_registro, codigo, peso, _ = _REGISTRO.unpack_from(self._mapa, indice * TAMANHO_REGISTRO)
+            if chave_registro != chave: break
+            encontradas.append((codigo, peso))
+        return encontradas
+
+    def lances(self, jogo):
+        # [(lance, peso)] do livro para a posição do jogo, só os legais aqui (o livro pode ter colisões)
+        encontrados = []
+        for codigo, peso in self.entradas(jogo.chave_zobrist):
+            origem, destino = decodificar_lance(jogo, codigo)
+            if peso and destino in jogo.movimentos_da_casa(*origem): encontrados.append(((origem, destino), peso))
+        return encontrados
+
+    def escolher(self, jogo, gerador=random):
+        # Lance sorteado com probabilidade proporcional ao peso, ou None fora do livro
+        encontrados = self.lances(jogo)
+        if not encontrados: return None
+        return gerador.choices([lance for lance, _ in encontrados], weights=[peso for _, peso in encontrados])[0]
+
+
+# --- CONSTRUÇÃO ---
+def construir_livro(arquivos_pgn, caminho, profundidade=24, minimo_partidas=1):
+    # Lê as partidas (pgn.ler_pgn, uma de cada vez) e grava o livro com os primeiros
+    # `profundidade` meios-lances de cada uma. Devolve (partidas, registros gravados)
+    from pgn import ErroPGN, ler_pgn, san_para_lance # Import local: pgn.py só é preciso para construir
+    contagem = {} # (chave, código) -> [peso, partidas]
+    jogo, partidas = Jogo(modo_ia=False, nivel_ia=None), 0
+    for arquivo in arquivos_pgn:
+        for partida in ler_pgn(arquivo):
+            partidas += 1
+            pontos = PONTOS_RESULTADO.get(partida.resultado, (1, 1))
+            try:
+                jogo.carregar_fen(partida.cabecalhos.get('FEN', FEN_INICIAL))
+                for san in partida.lances[:profundidade]:
+                    lance = san_para_lance(jogo, san)
+                    entrada = contagem.setdefault((jogo.chave_zobrist, codificar_lance(jogo, lance)), [0, 0])
+                    entrada[0] += pontos[0] if jogo.turno == 'w' else pontos[1]
+                    entrada[1] += 1
+                    jogo.aplicar_lance(lance)
+                    jogo.trocar_turno()
+            except (ErroPGN, ValueError):
+                continue # Fica com os lances até o erro
+
+    registros = sorted(((chave, codigo, peso) for (chave, codigo), (peso, vezes) in contagem.items()
+                        if peso and vezes >= minimo_partidas), key=lambda registro: (registro[0], -registro[2]))
+    escala = min(1.0, PESO_MAXIMO / max((peso for _, _, peso in registros), default=1))
+    with open(caminho, 'wb') as saida:
+        for chave, codigo, peso in registros:
+            saida.write(_REGISTRO.pack(chave, codigo, max(1, int(peso * escala)), 0))
+    return partidas, len(registros)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Livro de aberturas (formato Polyglot, chaves de zobrist.py)")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    construir = comandos.add_parser('construir', help="gera o livro a partir de arquivos PGN")
+    construir.add_argument('pgn', nargs='+')
+    construir.add_argument('-o', '--saida', default='livro.bin')
+    construir.add_argument('--profundidade', type=int, default=24, help="meios-lances de cada partida que entram no livro")
+    construir.add_argument('--minimo-partidas', type=int, default=1, help="descarta lances vistos em menos partidas")
+    consultar = comandos.add_parser('consultar', help="mostra os lances do livro para uma posição")
+    consultar.add_argument('livro')
+    consultar.add_argument('--fen', help="posição (padrão: a inicial)")
+    args = parser.parse_args()
+
+    if args.comando == 'construir':
+        inicio = time.perf_counter()
+        partidas, registros = construir_livro(args.pgn, args.saida, args.profundidade, args.minimo_partidas)
+        print(f"{partidas} partidas -> {registros} registros ({registros * TAMANHO_REGISTRO / 1024:.0f} KB) "
+              f"em {args.saida}, {time.perf_counter() - inicio:.1f}s")
+    else:
+        from pgn import lance_para_san
+        livro, jogo = LivroAberturas(args.livro), Jogo(modo_ia=False, nivel_ia=None)
+        if args.fen: jogo.carregar_fen(args.fen)
+        inicio = time.perf_counter()
+        lances = livro.lances(jogo)
+        tempo = time.perf_counter() - inicio
+        total = sum(peso for _, peso in lances) or 1
+        for lance, peso in sorted(lances, key=lambda item: -item[1]):
+            print(f"{lance_para_san(jogo, lance):8} peso {peso:>6} ({peso / total:.1%})")
+        print(f"{len(lances)} lance(s) em {len(livro)} registros; consulta em {tempo * 1000:.3f} ms")
+        livro.fechar()
@@ -0,0 +1,230 @@
+# lote.py
+#
+# Avaliação de muitas posições de uma vez com NumPy. As posições viram uma matriz (N, 64)
+# int8 com os códigos de peça de compacto.py (0 = vazia, tipo + 1, mais 8 se preta) e cada
+# termo é calculado para o lote inteiro com operações vetoriais, sem laços Python por casa:
+#   material + tabelas de posição: os mesmos números de motor.avaliar (o resultado é igual);
+#   mobilidade: casas alcançadas por cavalos, bispos, torres e damas (lances pseudo-legais);
+#   estrutura de peões: dobrados, isolados e passados (bônus cresce com o avanço).
+# A pontuação é em centipeões do ponto de vista das brancas, como em motor.avaliar.
+#
+# avaliar_filhos() monta todas as posições filhas de um nó numa matriz só e as avalia numa
+# chamada; carregar_posicoes() mapeia um arquivo de posições compactas (67 bytes cada,
+# bytes(PosicaoCompacta)) sem carregá-lo, para análises com milhões de posições.
+#
+# NumPy é dependência opcional: só este módulo o usa (pip install numpy).
+#
+# Uso:
+#   python lote.py -n 100000              # confere com motor.avaliar e compara a vazão
+#   python lote.py --arquivo posicoes.bin # avalia um arquivo de posições compactas
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from bitboard import TIPO_POR_NOME
+from compacto import PRETA, TAMANHO, PosicaoCompacta
+from motor import MATERIAL_FINAL, PONTOS, REI_FINAL, VALOR_PECA, avaliar
+from regras import Jogo
+
+CODIGO = {nome: tipo + 1 for nome, tipo in TIPO_POR_NOME.items()} # Códigos das brancas; pretas: | PRETA
+CODIGOS_PLANOS = [CODIGO[nome] | cor for cor in (0, PRETA) for nome in sorted(CODIGO, key=CODIGO.get)]
+PESO_MOBILIDADE = 4 # Centipeões por casa alcançada
+PESO_DOBRADO, PESO_ISOLADO = -15, -12 # Por peão
+BONUS_PASSADO = np.array([0, 5, 10, 20, 35, 60, 100, 0]) # Pelo número de casas que o peão já andou
+TAMANHO_LOTE = 1 << 16
+
+SALTOS_CAVALO = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
+DIRECOES_RETAS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIRECOES_DIAGONAIS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+def _tabelas():
+    # Pontos por (código, casa): o rei tem uma tabela no meio-jogo e outra no final
+    meio, final = np.zeros((16, 64), np.int32), np.zeros((16, 64), np.int32)
+    material = np.zeros(16, np.int32) # Peças sem peões e reis, para decidir se é final
+    for nome, codigo in CODIGO.items():
+        meio[codigo], meio[codigo | PRETA] = PONTOS['w'][nome], [-v for v in PONTOS['b'][nome]]
+        final[codigo], final[codigo | PRETA] = meio[codigo], meio[codigo | PRETA]
+        if nome == 'king': final[codigo], final[codigo | PRETA] = REI_FINAL['w'], [-v for v in REI_FINAL['b']]
+        elif nome != 'pawn': material[codigo] = material[codigo | PRETA] = VALOR_PECA[nome]
+    return meio, final, material
+
+PONTOS_MEIO, PONTOS_FINAL, MATERIAL = _tabelas()
+CASAS = np.arange(64)
+
+
+# --- CODIFICAÇÃO ---
+def codificar(posicoes):
+    # Jogos, PosicaoCompacta ou bytes (64 ou 67) -> matriz (N, 64) int8
+    linhas = []
+    for posicao in posicoes:
+        if isinstance(posicao, PosicaoCompacta): linhas.append(bytes(posicao.casas))
+        elif isinstance(posicao, (bytes, bytearray, memoryview)): linhas.append(bytes(posicao[:64]))
+        else: linhas.append(bytes(PosicaoCompacta.do_jogo(posicao).casas))
+    return np.frombuffer(b''.join(linhas), dtype=np.int8).reshape(-1, 64)
+
+def planos(codigos):
+    # (N, 64) -> (N, 12, 64): um plano 0/1 por tipo de peça e cor (peões brancos primeiro, rei preto por último)
+    return (codigos[:, None, :] == np.array(CODIGOS_PLANOS, np.int8)[None, :, None]).astype(np.int8)
+
+def carregar_posicoes(caminho):
+    # Arquivo com bytes(PosicaoCompacta) em sequência -> matriz (N, 64) mapeada do disco
+    dados = np.memmap(caminho, dtype=np.int8, mode='r')
+    return dados.reshape(-1, TAMANHO)[:, :64]
+
+
+# --- TERMOS (bitboards: um uint64 por posição, bit = casa) ---
+def _bitboards(codigos, codigo):
+    return np.packbits(codigos == codigo, axis=1, bitorder='little').view('<u8').ravel()
+
+_COLUNAS = [np.uint64(sum(1 << (linha * 8 + coluna) for linha in range(8))) for coluna in range(8)]
+_LINHAS = [np.uint64(0xFF << (linha * 8)) for linha in range(8)]
+_BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], np.uint8)
+
+def _contar_bits(bits):
+    if hasattr(np, 'bitwise_count'): return np.bitwise_count(bits).astype(np.int32) # NumPy 2
+    return _BITS_POR_BYTE[bits.view(np.uint8).reshape(len(bits), 8)].sum(axis=1, dtype=np.int32)
+
+def _mascara_deslocamento(d_coluna):
+    # Casas que não podem receber uma peça vinda de d_coluna colunas ao lado (dariam a volta no tabuleiro)
+    proibidas = np.uint64(0)
+    for coluna in (range(d_coluna) if d_coluna > 0 else range(8 + d_coluna, 8)): proibidas |= _COLUNAS[coluna]
+    return ~proibidas
+
+def _deslocar(bits, d_linha, d_coluna):
+    passo = d_linha * 8 + d_coluna
+    bits = bits << np.uint64(passo) if passo > 0 else bits >> np.uint64(-passo)
+    return bits & _MASCARAS[d_coluna] if d_coluna else bits
+
+_MASCARAS = {d: _mascara_deslocamento(d) for d in (-2, -1, 1, 2)}
+
+def _mobilidade(codigos, preta):
+    # Casas alcançadas (vazias ou com peça inimiga) pelas peças de um lado, por posição
+    cor = PRETA if preta else 0
+    proprias = _bitboards((codigos != 0) & ((codigos & PRETA) == cor), True)
+    vazias = _bitboards(codigos, 0)
+    total = np.zeros(len(codigos), np.int32)
+    cavalos = _bitboards(codigos, CODIGO['knight'] | cor)
+    for d_linha, d_coluna in SALTOS_CAVALO: # Dois cavalos não chegam na mesma casa pelo mesmo salto
+        total += _contar_bits(_deslocar(cavalos, d_linha, d_coluna) & ~proprias)
+    damas = _bitboards(codigos, CODIGO['queen'] | cor)
+    for direcoes, pecas in ((DIRECOES_RETAS, _bitboards(codigos, CODIGO['rook'] | cor) | damas),
+                            (DIRECOES_DIAGONAIS, _bitboards(codigos, CODIGO['bishop'] | cor) | damas)):
+        for d_linha, d_coluna in direcoes:
+            frente = pecas
+            for _ in range(7): # Anda pelo raio até a primeira peça (que conta se for inimiga)
+                frente = _deslocar(frente, d_linha, d_coluna)
+                total += _contar_bits(frente & ~proprias)
+                frente = frente & vazias
+                if not frente.any(): break
+    return total
+
+def _estrutura_peoes(codigos):
+    # Dobrados, isolados e passados, brancas menos pretas
+    brancos, pretos = _bitboards(codigos, CODIGO['pawn']), _bitboards(codigos, CODIGO['pawn'] | PRETA)
+    pontos = np.zeros(len(codigos), np.int32)
+    for peoes, inimigos, sinal, frente, andadas in ((brancos, pretos, 1, 1, lambda linha: 6 - linha),
+                                                    (pretos, brancos, -1, -1, lambda linha: linha - 1)):
+        por_coluna = np.stack([_contar_bits(peoes & coluna) for coluna in _COLUNAS], axis=1) # (N, 8)
+        tem = por_coluna > 0
+        vizinhas = np.zeros_like(tem)
+        vizinhas[:, 1:] |= tem[:, :-1]
+        vizinhas[:, :-1] |= tem[:, 1:]
+        dobrados = np.clip(por_coluna - 1, 0, None).sum(axis=1)
+        isolados = (por_coluna * ~vizinhas).sum(axis=1)
+        # Passado: nenhum peão inimigo à frente na mesma coluna nem nas vizinhas. Para cada
+        # peão inimigo, marca as casas à frente dele (do ponto de vista dele, rumo ao nosso
+        # lado) nas três colunas: um peão nosso numa delas tem esse inimigo pela frente
+        barrados, sombra = np.zeros_like(peoes), inimigos | _deslocar(inimigos, 0, 1) | _deslocar(inimigos, 0, -1)
+        for _ in range(7):
+            sombra = _deslocar(sombra, frente, 0)
+            barrados |= sombra
+        passados = peoes & ~barrados
+        bonus = sum(int(BONUS_PASSADO[andadas(linha)]) * _contar_bits(passados & _LINHAS[linha]) for linha in range(1, 7))
+        pontos += sinal * (PESO_DOBRADO * dobrados + PESO_ISOLADO * isolados + bonus)
+    return pontos
+
+
+# --- AVALIAÇÃO ---
+def avaliar_lote(codigos, termos=False):
+    # Pontuação (N,) int32 das brancas; com termos=True, um dicionário com cada termo e o total
+    codigos = np.asarray(codigos)
+    final = MATERIAL[codigos].sum(axis=1) <= MATERIAL_FINAL
+    posicao = np.where(final, PONTOS_FINAL[codigos, CASAS].sum(axis=1), PONTOS_MEIO[codigos, CASAS].sum(axis=1))
+    mobilidade = PESO_MOBILIDADE * (_mobilidade(codigos, False) - _mobilidade(codigos, True))
+    peoes = _estrutura_peoes(codigos)
+    total = posicao + mobilidade + peoes
+    if termos: return {'material_posicao': posicao, 'mobilidade': mobilidade, 'peoes': peoes, 'total': total}
+    return total
+
+def avaliar_em_lotes(codigos, tamanho_lote=TAMANHO_LOTE):
+    # Para matrizes grandes (ou mapeadas do disco): avalia por partes, com memória limitada
+    return np.concatenate([avaliar_lote(np.asarray(codigos[i:i + tamanho_lote]))
+                           for i in range(0, len(codigos), tamanho_lote)] or [np.zeros(0, np.int32)])
+
+def avaliar_filhos(jogo, cor=None):
+    # [(lance, pontuação das brancas)] de todos os lances legais, avaliados numa chamada só
+    lances = jogo.lances_da_posicao(cor)
+    if not lances: return []
+    filhos = np.repeat(codificar([jogo]), len(lances), axis=0)
+    linhas = np.arange(len(lances))
+    origens = np.array([l * 8 + c for (l, c), _ in lances])
+    destinos = np.array([l * 8 + c for _, (l, c) in lances])
+    pecas = filhos[linhas, origens]
+    promove = ((pecas & 7) == CODIGO['pawn']) & ((destinos < 8) | (destinos >= 56))
+    filhos[linhas, destinos] = np.where(promove, (pecas & PRETA) | CODIGO['queen'], pecas)
+    filhos[linhas, origens] = 0
+    # Roque: a torre também anda
+    roques = np.nonzero(((pecas & 7) == CODIGO['king']) & (np.abs(destinos - origens) == 2))[0]
+    for i in roques:
+        base = origens[i] - origens[i] % 8
+        torre, nova = (base + 7, base + 5) if destinos[i] > origens[i] else (base, base + 3)
+        filhos[i, nova], filhos[i, torre] = filhos[i, torre], 0
+    return list(zip(lances, avaliar_lote(filhos).tolist()))
+
+
+def _posicoes_aleatorias(quantidade, gerador):
+    # Posições de partidas com lances sorteados (só para medir e conferir)
+    posicoes, jogo = [], Jogo(modo_ia=False, nivel_ia=None, backend='bitboard')
+    while len(posicoes) < quantidade:
+        if jogo.game_over or len(jogo.historico) > 150: jogo = Jogo(modo_ia=False, nivel_ia=None, backend='bitboard')
+        jogo.aplicar_lance(gerador.choice(jogo.lances_da_posicao()))
+        if not jogo.game_over: jogo.trocar_turno()
+        posicoes.append(PosicaoCompacta.do_jogo(jogo))
+    return posicoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação de posições em lote (NumPy)")
+    parser.add_argument('-n', '--posicoes', type=int, default=20000, help="posições sorteadas para conferir e medir")
+    parser.add_argument('--arquivo', help="arquivo de posições compactas (67 bytes cada) para avaliar")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.arquivo:
+        codigos = carregar_posicoes(args.arquivo)
+        inicio = time.perf_counter()
+        pontuacoes = avaliar_em_lotes(codigos)
+        tempo = time.perf_counter() - inicio
+        print(f"{len(pontuacoes)} posições em {tempo:.2f}s ({len(pontuacoes) / max(tempo, 1e-9):.0f} posições/s); "
+              f"média {pontuacoes.mean() if len(pontuacoes) else 0:.1f}, desvio {pontuacoes.std() if len(pontuacoes) else 0:.1f}")
+    else:
+        posicoes = _posicoes_aleatorias(args.posicoes, random.Random(args.semente))
+        codigos = codificar(posicoes)
+        inicio = time.perf_counter()
+        termos = avaliar_lote(codigos, termos=True)
+        tempo_lote = time.perf_counter() - inicio
+        jogo, amostra = Jogo(modo_ia=False, nivel_ia=None), posicoes[:min(len(posicoes), 5000)]
+        inicio = time.perf_counter()
+        referencia = []
+        for posicao in amostra:
+            jogo.tabuleiro = posicao.para_tabuleiro()
+            referencia.append(avaliar(jogo))
+        tempo_motor = (time.perf_counter() - inicio) / len(amostra) * len(posicoes)
+        diferentes = int((np.array(referencia) != termos['material_posicao'][:len(amostra)]).sum())
+        print(f"Material + posição igual a motor.avaliar em {len(amostra) - diferentes}/{len(amostra)} posições")
+        print(f"Lote: {len(posicoes)} posições em {tempo_lote:.3f}s ({len(posicoes) / tempo_lote:.0f} posições/s, "
+              f"com mobilidade e peões); motor.avaliar: {len(posicoes) / tempo_motor:.0f} posições/s")
@@ -0,0 +1,315 @@
+# motor.py
+#
+# Motor de busca da IA: avaliação por material + tabelas de posição das peças,
+# negamax com poda alfa-beta, ordenação MVV-LVA, quiescência nas capturas e
+# aprofundamento iterativo com limite de tempo e/ou de nós.
+#
+# A busca trabalha direto no Jogo recebido (fazer_lance/desfazer_lance) e sempre o
+# devolve na mesma posição, inclusive quando é interrompida no meio.
+
+import time
+
+from transposicao import TabelaTransposicao, EXATO, LIMITE_INFERIOR, LIMITE_SUPERIOR
+
+VALOR_PECA = {'pawn': 100, 'knight': 320, 'bishop': 330, 'rook': 500, 'queen': 900, 'king': 0}
+MATE = 100000
+MATE_MINIMO = MATE - 1000 # Pontuações acima disso (em módulo) são mate em N lances
+INFINITO = 10 ** 6
+MEMORIA_TT_MB = 16 # Tamanho padrão da tabela de transposição
+
+# Tempo de reflexão por lance (segundos) de cada nível de força da IA
+TEMPO_POR_NIVEL = {1: 0.1, 2: 0.5, 3: 1.0, 4: 2.5, 5: 5.0}
+
+# Tabelas de posição do ponto de vista das brancas; índice = linha * 8 + coluna,
+# com a linha 0 sendo a oitava fileira (igual ao tabuleiro do jogo)
+TABELAS_POSICAO = {
+    'pawn': [
+          0,   0,   0,   0,   0,   0,   0,   0,
+         50,  50,  50,  50,  50,  50,  50,  50,
+         10,  10,  20,  30,  30,  20,  10,  10,
+          5,   5,  10,  25,  25,  10,   5,   5,
+          0,   0,   0,  20,  20,   0,   0,   0,
+          5,  -5, -10,   0,   0, -10,  -5,   5,
+          5,  10,  10, -20, -20,  10,  10,   5,
+          0,   0,   0,   0,   0,   0,   0,   0],
+    'knight': [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50],
+    'bishop': [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20],
+    'rook': [
+          0,   0,   0,   0,   0,   0,   0,   0,
+          5,  10,  10,  10,  10,  10,  10,   5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+          0,   0,   0,   5,   5,   0,   0,   0],
+    'queen': [
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+         -5,   0,   5,   5,   5,   5,   0,  -5,
+          0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20],
+    'king': [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+         20,  20,   0,   0,   0,   0,  20,  20,
+         20,  30,  10,   0,   0,  10,  30,  20],
+}
+# No final o rei deixa de se esconder e vai para o centro
+TABELA_REI_FINAL = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+MATERIAL_FINAL = 1600 # Abaixo disso (peças sem contar peões e reis) usa TABELA_REI_FINAL
+
+def _espelhar(tabela):
+    return [tabela[(7 - casa // 8) * 8 + casa % 8] for casa in range(64)]
+
+# Valor da peça + posição, já espelhado para as pretas: PONTOS[cor][nome][casa]
+PONTOS = {
+    'w': {nome: [VALOR_PECA[nome] + v for v in tabela] for nome, tabela in TABELAS_POSICAO.items()},
+    'b': {nome: [VALOR_PECA[nome] + v for v in _espelhar(tabela)] for nome, tabela in TABELAS_POSICAO.items()},
+}
+REI_FINAL = {'w': TABELA_REI_FINAL, 'b': _espelhar(TABELA_REI_FINAL)}
+
+
+def avaliar(jogo):
+    # Pontuação em centipeões do ponto de vista das brancas
+    total, material, reis = 0, 0, []
+    for linha, fileira in enumerate(jogo.tabuleiro):
+        for coluna, peca in enumerate(fileira):
+            if peca is None: continue
+            nome = peca.nome
+            if nome == 'king':
+                reis.append((peca.cor, linha * 8 + coluna))
+                continue
+            if nome != 'pawn': material += VALOR_PECA[nome]
+            if peca.cor == 'w': total += PONTOS['w'][nome][linha * 8 + coluna]
+            else: total -= PONTOS['b'][nome][linha * 8 + coluna]
+    for cor, casa in reis:
+        valor = REI_FINAL[cor][casa] if material <= MATERIAL_FINAL else PONTOS[cor]['king'][casa]
+        total += valor if cor == 'w' else -valor
+    return total
+
+def _para_tabela(pontuacao, ply):
+    # Mates são guardados relativos ao nó, não à raiz, para valerem em qualquer caminho
+    if pontuacao >= MATE_MINIMO: return pontuacao + ply
+    if pontuacao <= -MATE_MINIMO: return pontuacao - ply
+    return pontuacao
+
+def _da_tabela(pontuacao, ply):
+    if pontuacao >= MATE_MINIMO: return pontuacao - ply
+    if pontuacao <= -MATE_MINIMO: return pontuacao + ply
+    return pontuacao
+
+def valor_mvv_lva(jogo, lance):
+    # Vítima mais valiosa primeiro; entre capturas da mesma vítima, o atacante mais barato
+    (l_orig, c_orig), (l_dest, c_dest) = lance
+    vitima = jogo.tabuleiro[l_dest][c_dest]
+    if vitima is None: return 0
+    return 10 * VALOR_PECA[vitima.nome] - VALOR_PECA[jogo.tabuleiro[l_orig][c_orig].nome] + 1000
+
+class BuscaInterrompida(Exception):
+    pass
+
+
+class Motor:
+    def __init__(self, tempo_limite=1.0, nos_limite=None, profundidade_maxima=64, tabela=None, evento_parar=None):
+        self.tempo_limite = tempo_limite # segundos; None = sem limite de tempo
+        self.nos_limite = nos_limite
+        self.profundidade_maxima = profundidade_maxima
+        # Passe a mesma tabela entre buscas (Jogo faz isso) para aproveitar o que já foi visto
+        self.tabela = tabela if tabela is not None else TabelaTransposicao(MEMORIA_TT_MB)
+        self.melhor_lance = None # Sempre o melhor lance já encontrado, mesmo durante a busca
+        self.estatisticas = {}
+        self._parar = False
+        self._evento_parar = evento_parar # multiprocessing.Event: parada vinda de outro processo
+        self.ao_iterar = None # Função chamada com as estatísticas ao fim de cada iteração (o modo UCI manda "info")
+
+    def parar(self):
+        # Pode ser chamado de outra thread; a busca para no próximo ponto de verificação
+        self._parar = True
+
+    def _preparar(self):
+        self._parar, self.melhor_lance, self.nos = False, None, 0
+        self._inicio = time.perf_counter()
+        self._prazo = self._inicio + self.tempo_limite if self.tempo_limite is not None else None
+        self._limite_nos = self.nos_limite if self.nos_limite is not None else INFINITO ** 2
+        self.estatisticas = {'profundidade': 0, 'nos': 0, 'tempo': 0.0, 'nps': 0, 'pontuacao': None}
+        self._caminho = set() # Chaves das posições entre a raiz (inclusive) e o nó atual
+        self._repeticoes_vistas = 0 # Empates por repetição encontrados: o valor de quem os viu depende do caminho
+
+    def buscar(self, jogo, cor=None):
+        cor = cor or jogo.turno
+        self._preparar()
+        self.tabela.nova_busca()
+        tamanho_historico = len(jogo.historico)
+
+        lances = sorted(jogo.lances_da_posicao(cor), key=lambda lance: -valor_mvv_lva(jogo, lance))
+        if not lances: return None
+        self.melhor_lance = lances[0]
+        for profundidade in range(1, self.profundidade_maxima + 1):
+            try:
+                pontuacao = self._raiz(jogo, lances, profundidade, cor)
+            except BuscaInterrompida:
+                while len(jogo.historico) > tamanho_historico: jogo.desfazer_lance()
+                break
+            self._registrar(profundidade, pontuacao)
+            if self.ao_iterar is not None: self.ao_iterar(self.estatisticas)
+            # O melhor lance vai para a frente: é o primeiro a ser examinado na próxima iteração
+            lances.remove(self.melhor_lance)
+            lances.insert(0, self.melhor_lance)
+            if len(lances) == 1 or abs(pontuacao) >= MATE_MINIMO: break
+        self._registrar(self.estatisticas['profundidade'], self.estatisticas['pontuacao'])
+        return self.melhor_lance
+
+    def pontuar_lance(self, jogo, lance, profundidade, cor=None, alfa=-INFINITO, beta=INFINITO):
+        # Valor de um lance da raiz a essa profundidade, na janela (alfa, beta): exato se
+        # cair dentro dela, senão um limite; None se a busca for interrompida. Usado pela busca paralela
+        cor = cor or jogo.turno
+        self._preparar()
+        tamanho_historico = len(jogo.historico)
+        self._caminho.add(jogo.chave_zobrist)
+        jogo.fazer_lance(*lance)
+        try:
+            return -self._negamax(jogo, profundidade - 1, -beta, -alfa, 'b' if cor == 'w' else 'w', 1)
+        except BuscaInterrompida:
+            return None
+        finally:
+            while len(jogo.historico) > tamanho_historico: jogo.desfazer_lance()
+
+    def variante_principal(self, jogo, cor=None, maximo=32):
+        # Melhor sequência a partir da raiz: o melhor lance e depois os lances guardados na
+        # tabela de transposição, enquanto forem legais e não repetirem posição
+        cor, variante, vistas = cor or jogo.turno, [], set()
+        lance = self.melhor_lance
+        while lance is not None and len(variante) < maximo and jogo.chave_zobrist not in vistas:
+            peca = jogo.tabuleiro[lance[0][0]][lance[0][1]]
+            if peca is None or peca.cor != cor or lance[1] not in jogo.movimentos_da_casa(*lance[0]): break
+            vistas.add(jogo.chave_zobrist)
+            jogo.fazer_lance(*lance)
+            variante.append(lance)
+            cor = 'b' if cor == 'w' else 'w'
+            entrada = self.tabela.consultar(jogo.chave_zobrist)
+            lance = entrada[3] if entrada is not None else None
+        for _ in variante: jogo.desfazer_lance()
+        return variante
+
+    def _registrar(self, profundidade, pontuacao):
+        tempo = time.perf_counter() - self._inicio
+        self.estatisticas = {'profundidade': profundidade, 'nos': self.nos, 'tempo': tempo,
+                             'nps': int(self.nos / tempo) if tempo > 0 else 0, 'pontuacao': pontuacao}
+
+    def _contar_no(self):
+        self.nos += 1
+        if self.nos >= self._limite_nos: raise BuscaInterrompida()
+        if self.nos & 1023 == 0 and (self._parar or (self._prazo is not None and time.perf_counter() >= self._prazo)
+                                     or (self._evento_parar is not None and self._evento_parar.is_set())):
+            raise BuscaInterrompida()
+
+    def _raiz(self, jogo, lances, profundidade, cor):
+        alfa, oponente = -INFINITO, 'b' if cor == 'w' else 'w'
+        self._caminho.add(jogo.chave_zobrist)
+        for origem, destino in lances:
+            jogo.fazer_lance(origem, destino)
+            valor = -self._negamax(jogo, profundidade - 1, -INFINITO, -alfa, oponente, 1)
+            jogo.desfazer_lance()
+            if valor > alfa:
+                # O primeiro lance da lista é o melhor da iteração anterior, então qualquer
+                # lance que o supere já é uma escolha melhor, mesmo se a iteração não terminar
+                alfa, self.melhor_lance = valor, (origem, destino)
+        return alfa
+
+    def _negamax(self, jogo, profundidade, alfa, beta, cor, ply):
+        chave = jogo.chave_zobrist
+        # Empate: voltar a uma posição do caminho da busca, ou a uma que já apareceu duas
+        # vezes na partida (seria a terceira). Uma só vez antes, fora do caminho, não basta
+        if chave in self._caminho or jogo.repeticoes.get(chave, 0) >= 2:
+            self._repeticoes_vistas += 1
+            return 0
+        if profundidade <= 0: return self._quiescencia(jogo, alfa, beta, cor)
+        self._contar_no()
+
+        lance_tabela = None
+        entrada = self.tabela.consultar(chave)
+        if entrada is not None:
+            pontuacao, profundidade_tabela, tipo, lance_tabela = entrada
+            if profundidade_tabela >= profundidade:
+                pontuacao = _da_tabela(pontuacao, ply)
+                if tipo == EXATO: return pontuacao
+                if tipo == LIMITE_INFERIOR and pontuacao >= beta: return pontuacao
+                if tipo == LIMITE_SUPERIOR and pontuacao <= alfa: return pontuacao
+
+        lances = jogo.gerar_lances_legais(cor)
+        if not lances:
+            return -MATE + ply if jogo.is_in_check(cor) else 0 # Mate (quanto antes, melhor) ou afogamento
+        # Lance da tabela primeiro, depois capturas por MVV-LVA
+        lances.sort(key=lambda lance: -INFINITO if lance == lance_tabela else -valor_mvv_lva(jogo, lance))
+        alfa_original, melhor, melhor_lance = alfa, -INFINITO, None
+        oponente = 'b' if cor == 'w' else 'w'
+        self._caminho.add(chave)
+        repeticoes_antes = self._repeticoes_vistas
+        for origem, destino in lances:
+            jogo.fazer_lance(origem, destino)
+            valor = -self._negamax(jogo, profundidade - 1, -beta, -alfa, oponente, ply + 1)
+            jogo.desfazer_lance()
+            if valor > melhor:
+                melhor, melhor_lance = valor, (origem, destino)
+                if valor > alfa: alfa = valor
+                if alfa >= beta: break
+        self._caminho.discard(chave)
+        # Um valor que passou por empate de repetição vale só por este caminho: fora da tabela
+        if self._repeticoes_vistas != repeticoes_antes: return melhor
+
+        if melhor <= alfa_original: tipo = LIMITE_SUPERIOR
+        elif melhor >= beta: tipo = LIMITE_INFERIOR
+        else: tipo = EXATO
+        self.tabela.guardar(chave, _para_tabela(melhor, ply), profundidade, tipo, melhor_lance)
+        return melhor
+
+    def _quiescencia(self, jogo, alfa, beta, cor):
+        # Só capturas, até a posição ficar "quieta"; a avaliação estática serve de piso
+        self._contar_no()
+        parado = avaliar(jogo) if cor == 'w' else -avaliar(jogo)
+        if parado >= beta: return parado
+        if parado > alfa: alfa = parado
+        capturas = jogo.gerar_lances_legais(cor, apenas_capturas=True)
+        capturas.sort(key=lambda lance: -valor_mvv_lva(jogo, lance))
+        oponente = 'b' if cor == 'w' else 'w'
+        for origem, destino in capturas:
+            jogo.fazer_lance(origem, destino)
+            valor = -self._quiescencia(jogo, -beta, -alfa, oponente)
+            jogo.desfazer_lance()
+            if valor > parado:
+                parado = valor
+                if valor > alfa: alfa = valor
+                if alfa >= beta: break
+        return parado
@@ -0,0 +1,199 @@
+# paralelo.py
+#
+# Busca da IA em vários núcleos, com um pool de processos (threads não adiantam: o GIL
+# só deixa uma delas rodar código Python por vez). Divisão na raiz, em cada iteração
+# do aprofundamento iterativo:
+#   1. o primeiro lance (o melhor da iteração anterior) é avaliado sozinho, com janela inteira;
+#   2. os outros são testados em paralelo com janela nula: só interessa saber se superam o primeiro;
+#   3. os que superam são reavaliados em paralelo para ter o valor exato.
+# Todos os processos usam a mesma tabela de transposição, em memória compartilhada.
+# A posição vai uma vez por busca, num buffer compartilhado criado com o pool: as
+# tarefas levam só o número da busca, e cada processo remonta o Jogo uma vez.
+#
+# A ordem dos lances da raiz é a mesma do Motor (MVV-LVA, e o melhor da iteração
+# anterior na frente) e o escolhido é o primeiro com o maior valor, como no Motor;
+# numa busca de profundidade fixa o lance sai igual ao do Motor de um processo só.
+#
+# Uso:
+#   python paralelo.py -p 4 -t 1 2 4 8        # aceleração em relação a 1 processo
+#   python paralelo.py --fen "<FEN>" -p 5 -t 4
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import time
+import weakref
+
+from motor import BuscaInterrompida, Motor, INFINITO, MATE_MINIMO, MEMORIA_TT_MB, valor_mvv_lva
+from regras import Jogo
+from transposicao import TabelaTransposicao
+
+MEMORIA_POSICAO = 1 << 20 # Bytes do buffer da posição (com as repetições da partida toda)
+
+# Estado de cada processo do pool, preenchido por _iniciar_processo
+_tabela_processo = None
+_evento_processo = None
+_buffer_processo = None
+_jogo_processo = None # (número da busca, Jogo remontado do buffer)
+
+
+def _iniciar_processo(nome_tabela, memoria_mb, evento_parar, buffer_posicao):
+    global _tabela_processo, _evento_processo, _buffer_processo
+    _tabela_processo = TabelaTransposicao(memoria_mb, nome=nome_tabela)
+    _evento_processo = evento_parar
+    _buffer_processo = buffer_posicao
+
+def _instantaneo(jogo):
+    # Só os campos de regras de que a busca precisa, nunca o objeto inteiro: nada de
+    # estado da interface, caches, histórico ou tabela da IA. Rei e chave de Zobrist
+    # saem do tabuleiro quando ele é remontado (carregar_tabuleiro)
+    return {'tabuleiro': jogo.tabuleiro, 'turno': jogo.turno, 'repeticoes': jogo.repeticoes, 'backend': jogo.backend}
+
+def _jogo_do_instantaneo(estado):
+    jogo = Jogo(modo_ia=False, nivel_ia=None, backend=estado['backend'])
+    jogo.carregar_tabuleiro(estado['tabuleiro'], estado['turno'])
+    jogo.repeticoes = estado['repeticoes']
+    return jogo
+
+def _posicao_da_busca(busca):
+    # O Jogo da busca atual, lido do buffer só na primeira tarefa de cada busca
+    global _jogo_processo
+    if _jogo_processo is None or _jogo_processo[0] != busca:
+        _jogo_processo = (busca, _jogo_do_instantaneo(pickle.loads(memoryview(_buffer_processo))))
+    return _jogo_processo[1]
+
+def _pontuar_lance(tarefa):
+    # Roda num processo do pool; devolve (pontuação ou None se interrompido, nós)
+    busca, lance, profundidade, cor, alfa, beta, prazo, idade = tarefa
+    restante = None if prazo is None else prazo - time.monotonic()
+    if _evento_processo.is_set() or (restante is not None and restante <= 0): return None, 0
+    jogo = _posicao_da_busca(busca) # pontuar_lance devolve o jogo na mesma posição
+    _tabela_processo.idade = idade
+    motor = Motor(tempo_limite=restante, tabela=_tabela_processo, evento_parar=_evento_processo)
+    pontuacao = motor.pontuar_lance(jogo, lance, profundidade, cor, alfa, beta)
+    return pontuacao, motor.nos
+
+def _encerrar(pool, tabela):
+    pool.terminate()
+    pool.join()
+    tabela.fechar(apagar=True)
+
+
+class BuscaParalela:
+    # Mesma interface do Motor (buscar, parar, melhor_lance, estatisticas), então pode
+    # ser usada no lugar dele por Jogo.escolher_lance_ia e pela thread da interface
+    def __init__(self, trabalhadores=None, memoria_tt_mb=MEMORIA_TT_MB, tempo_limite=1.0, profundidade_maxima=64):
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.tempo_limite = tempo_limite # segundos; None = sem limite de tempo
+        self.profundidade_maxima = profundidade_maxima
+        self.melhor_lance = None
+        self.estatisticas = {}
+        contexto = multiprocessing.get_context()
+        self.tabela = TabelaTransposicao(memoria_tt_mb, compartilhada=True)
+        self._evento_parar = contexto.Event()
+        # Escrito só entre buscas, quando nenhuma tarefa está rodando: não precisa de trava
+        self._buffer_posicao, self._busca = contexto.RawArray('B', MEMORIA_POSICAO), 0
+        self._pool = contexto.Pool(self.trabalhadores, initializer=_iniciar_processo,
+                                   initargs=(self.tabela.nome, memoria_tt_mb, self._evento_parar, self._buffer_posicao))
+        # Encerra o pool e apaga a memória compartilhada mesmo se fechar() não for chamado
+        self._finalizador = weakref.finalize(self, _encerrar, self._pool, self.tabela)
+
+    def fechar(self):
+        self._finalizador()
+
+    def parar(self):
+        # Pode ser chamado de outra thread; os processos param no próximo ponto de verificação
+        self._evento_parar.set()
+
+    def buscar(self, jogo, cor=None):
+        cor = cor or jogo.turno
+        self._evento_parar.clear()
+        self.melhor_lance, self._nos = None, 0
+        inicio = time.monotonic()
+        prazo = inicio + self.tempo_limite if self.tempo_limite is not None else None
+        self.estatisticas = {'profundidade': 0, 'nos': 0, 'tempo': 0.0, 'nps': 0, 'pontuacao': None,
+                             'trabalhadores': self.trabalhadores}
+        self.tabela.nova_busca()
+
+        lances = sorted(jogo.lances_da_posicao(cor), key=lambda lance: -valor_mvv_lva(jogo, lance))
+        if not lances: return None
+        self.melhor_lance = lances[0]
+        self._publicar(jogo)
+        for profundidade in range(1, self.profundidade_maxima + 1):
+            try:
+                pontuacao = self._iteracao(lances, profundidade, cor, prazo)
+            except BuscaInterrompida:
+                break # Iteração incompleta: fica o lance da anterior
+            self._registrar(inicio, profundidade, pontuacao)
+            lances.remove(self.melhor_lance)
+            lances.insert(0, self.melhor_lance)
+            if len(lances) == 1 or abs(pontuacao) >= MATE_MINIMO: break
+        self._registrar(inicio, self.estatisticas['profundidade'], self.estatisticas['pontuacao'])
+        return self.melhor_lance
+
+    def _publicar(self, jogo):
+        # Escreve a posição no buffer compartilhado; as tarefas levam só o número da busca
+        dados = pickle.dumps(_instantaneo(jogo), pickle.HIGHEST_PROTOCOL)
+        if len(dados) > MEMORIA_POSICAO: raise ValueError(f"posição com {len(dados)} bytes não cabe no buffer da busca paralela")
+        self._buffer_posicao[:len(dados)] = dados
+        self._busca += 1
+
+    def _avaliar(self, lances, profundidade, cor, alfa, beta, prazo):
+        tarefas = [(self._busca, lance, profundidade, cor, alfa, beta, prazo, self.tabela.idade) for lance in lances]
+        resultados = self._pool.map(_pontuar_lance, tarefas, chunksize=1)
+        self._nos += sum(nos for _, nos in resultados)
+        pontuacoes = [pontuacao for pontuacao, _ in resultados]
+        if None in pontuacoes: raise BuscaInterrompida()
+        return pontuacoes
+
+    def _iteracao(self, lances, profundidade, cor, prazo):
+        # Devolve a pontuação e deixa o melhor lance em self.melhor_lance
+        primeiro = self._avaliar(lances[:1], profundidade, cor, -INFINITO, INFINITO, prazo)[0]
+        testes = self._avaliar(lances[1:], profundidade, cor, primeiro, primeiro + 1, prazo)
+        melhores = [lance for lance, valor in zip(lances[1:], testes) if valor > primeiro]
+        exatos = self._avaliar(melhores, profundidade, cor, primeiro, INFINITO, prazo) if melhores else []
+        # Como no Motor: só troca de lance quem supera estritamente, e vale o primeiro na ordem
+        melhor_lance, pontuacao = lances[0], primeiro
+        for lance, valor in zip(melhores, exatos):
+            if valor > pontuacao: melhor_lance, pontuacao = lance, valor
+        self.melhor_lance = melhor_lance
+        return pontuacao
+
+    def _registrar(self, inicio, profundidade, pontuacao):
+        tempo = time.monotonic() - inicio
+        self.estatisticas = {'profundidade': profundidade, 'nos': self._nos, 'tempo': tempo,
+                             'nps': int(self._nos / tempo) if tempo > 0 else 0, 'pontuacao': pontuacao,
+                             'trabalhadores': self.trabalhadores}
+
+
+def medir_aceleracao(fen, profundidade, lista_trabalhadores):
+    # Profundidade fixa, sem limite de tempo: compara cada quantidade de processos com 1
+    # processo e confere o lance com o do Motor comum
+    jogo = Jogo(modo_ia=False)
+    if fen: jogo.carregar_fen(fen)
+    motor = Motor(tempo_limite=None, profundidade_maxima=profundidade)
+    lance_motor = motor.buscar(jogo)
+    print(f"Motor (1 processo, sem divisão): {motor.estatisticas['tempo']:.2f}s {motor.estatisticas['nos']} nós "
+          f"lance={lance_motor} pontuação={motor.estatisticas['pontuacao']}")
+    tempo_um = None
+    for trabalhadores in sorted(set([1] + list(lista_trabalhadores))):
+        busca = BuscaParalela(trabalhadores, tempo_limite=None, profundidade_maxima=profundidade)
+        lance = busca.buscar(jogo)
+        busca.fechar()
+        e = busca.estatisticas
+        tempo_um = tempo_um or e['tempo']
+        print(f"{trabalhadores:>3} processo(s): {e['tempo']:7.2f}s {e['nos']:>9} nós {e['nps']:>7} nós/s "
+              f"aceleração={tempo_um / max(e['tempo'], 1e-9):5.2f}x lance={lance} "
+              f"{'igual' if lance == lance_motor else 'DIFERENTE'} do Motor")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aceleração da busca paralela")
+    parser.add_argument('--fen', help="posição (padrão: a inicial)")
+    parser.add_argument('-p', '--profundidade', type=int, default=4)
+    parser.add_argument('-t', '--trabalhadores', type=int, nargs='+', default=[os.cpu_count() or 1],
+                        help="quantidades de processos a medir (1 sempre entra, como referência)")
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} núcleo(s) disponível(is)")
+    medir_aceleracao(args.fen, args.profundidade, args.trabalhadores)
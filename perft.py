@@ -0,0 +1,105 @@
+# perft.py
+#
+# Perft: conta as folhas da árvore de lances legais até uma profundidade, usando o
+# mesmo pipeline do jogo (Jogo.gerar_lances_legais + fazer_lance/desfazer_lance).
+# Serve para medir a velocidade da geração de lances e para pegar regressões:
+# qualquer mudança em get_movimentos_validos/_filtrar_movimentos_ilegais tem que
+# continuar batendo com as contagens de referência abaixo.
+#
+# Uso:
+#   python perft.py                      # roda a suíte de referência (sai com 1 se divergir)
+#   python perft.py --fen "<FEN>" -p 3 --divide
+#   python perft.py --backend bitboard
+
+import argparse
+import sys
+import time
+
+from regras import FEN_INICIAL, Jogo
+
+# Contagens para as regras deste jogo: sem en passant e promoção só para dama. Por isso
+# só a posição inicial (até a profundidade 4) coincide com as tabelas publicadas; nas
+# outras, os números publicados incluem capturas en passant e subpromoções.
+POSICOES_REFERENCIA = [
+    ('inicial', FEN_INICIAL, [20, 400, 8902, 197281]),
+    ('kiwipete (roques)', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2038, 97766]),
+    ('final de torre e peões', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2810, 43087]),
+    ('promoções 1', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 228, 8083]),
+    ('promoções 2', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [41, 1373, 54007]),
+]
+
+
+def perft(jogo, profundidade, cor=None):
+    cor = cor or jogo.turno
+    lances = jogo.gerar_lances_legais(cor)
+    if profundidade <= 1:
+        return len(lances) if profundidade == 1 else 1
+    proxima, nos = 'b' if cor == 'w' else 'w', 0
+    for origem, destino in lances:
+        jogo.fazer_lance(origem, destino)
+        nos += perft(jogo, profundidade - 1, proxima)
+        jogo.desfazer_lance()
+    return nos
+
+def divide(jogo, profundidade):
+    # Contagem separada por lance da raiz, para achar onde duas implementações divergem
+    cor, proxima = jogo.turno, 'b' if jogo.turno == 'w' else 'w'
+    contagens = {}
+    for origem, destino in jogo.gerar_lances_legais(cor):
+        jogo.fazer_lance(origem, destino)
+        contagens[(origem, destino)] = perft(jogo, profundidade - 1, proxima)
+        jogo.desfazer_lance()
+    return contagens
+
+def nome_casa(casa):
+    linha, coluna = casa
+    return 'abcdefgh'[coluna] + str(8 - linha)
+
+def medir(fen, profundidade, backend='listas'):
+    # Devolve (nós, segundos, nós por segundo)
+    jogo = Jogo(modo_ia=False, backend=backend)
+    jogo.carregar_fen(fen)
+    inicio = time.perf_counter()
+    nos = perft(jogo, profundidade)
+    tempo = time.perf_counter() - inicio
+    return nos, tempo, nos / tempo if tempo > 0 else 0.0
+
+def rodar_suite(profundidade_maxima=None, backend='listas'):
+    falhas, total_nos, total_tempo = 0, 0, 0.0
+    for nome, fen, esperados in POSICOES_REFERENCIA:
+        for profundidade, esperado in enumerate(esperados, start=1):
+            if profundidade_maxima is not None and profundidade > profundidade_maxima: break
+            nos, tempo, nps = medir(fen, profundidade, backend)
+            total_nos, total_tempo = total_nos + nos, total_tempo + tempo
+            ok = nos == esperado
+            falhas += not ok
+            print(f"{'ok  ' if ok else 'ERRO'} {nome:<24} p={profundidade} nós={nos:>9} "
+                  f"esperado={esperado:>9} {tempo:8.3f}s {nps:>10.0f} nós/s")
+    print(f"Total: {total_nos} nós em {total_tempo:.2f}s ({total_nos / max(total_tempo, 1e-9):.0f} nós/s), {falhas} divergência(s)")
+    return falhas == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft do jogo de xadrez")
+    parser.add_argument('--fen', help="posição inicial (sem --fen roda a suíte de referência)")
+    parser.add_argument('-p', '--profundidade', type=int, help="profundidade (na suíte, a máxima)")
+    parser.add_argument('--divide', action='store_true', help="mostra a contagem de cada lance da raiz")
+    parser.add_argument('--backend', choices=['listas', 'bitboard'], default='listas')
+    args = parser.parse_args()
+
+    if args.fen is None:
+        sys.exit(0 if rodar_suite(args.profundidade, args.backend) else 1)
+
+    profundidade = args.profundidade or 3
+    jogo = Jogo(modo_ia=False, backend=args.backend)
+    jogo.carregar_fen(args.fen)
+    inicio = time.perf_counter()
+    if args.divide:
+        contagens = divide(jogo, profundidade)
+        for (origem, destino), nos in sorted(contagens.items(), key=lambda item: (nome_casa(item[0][0]), nome_casa(item[0][1]))):
+            print(f"{nome_casa(origem)}{nome_casa(destino)}: {nos}")
+        nos = sum(contagens.values())
+    else:
+        nos = perft(jogo, profundidade)
+    tempo = time.perf_counter() - inicio
+    print(f"Nós: {nos}  Tempo: {tempo:.3f}s  NPS: {nos / max(tempo, 1e-9):.0f}")
@@ -0,0 +1,233 @@
+# pgn.py
+#
+# Partidas em PGN: lances em SAN (notação algébrica) de e para os lances (origem, destino)
+# do Jogo, exportação de uma partida e um leitor que percorre arquivos PGN de qualquer
+# tamanho partida por partida (gerador, memória constante).
+#
+# A desambiguação do SAN usa os lances legais do próprio jogo (Jogo.movimentos_da_casa),
+# e a reprodução passa pelo mesmo caminho de um clique (aplicar_lance -> _mover).
+# Lances que as regras deste jogo não têm (en passant, promoção a outra peça que não a
+# dama) são rejeitados com ErroPGN, em vez de virarem outro lance.
+#
+# Uso:
+#   python pgn.py partidas.pgn          # reproduz todas as partidas e mostra erros e a vazão
+
+import argparse
+import re
+import sys
+import time
+from collections import namedtuple
+
+from regras import FEN_INICIAL, Jogo
+
+LETRAS_SAN = {'knight': 'N', 'bishop': 'B', 'rook': 'R', 'queen': 'Q', 'king': 'K'}
+NOMES_SAN = {letra: nome for nome, letra in LETRAS_SAN.items()}
+NOMES_SAN['P'] = 'pawn'
+COLUNAS_SAN = 'abcdefgh'
+RESULTADOS = ('1-0', '0-1', '1/2-1/2', '*')
+CABECALHOS_PADRAO = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+
+_SAN = re.compile(r'([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$')
+_CABECALHO = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_TOKEN = re.compile(r'[{}();]|[^\s{}();]+')
+_NUMERO_LANCE = re.compile(r'\d+\.*')
+
+PartidaPGN = namedtuple('PartidaPGN', 'cabecalhos lances resultado linha') # linha: onde a partida começa no arquivo
+
+class ErroPGN(ValueError):
+    pass
+
+
+def nome_casa(linha, coluna):
+    return COLUNAS_SAN[coluna] + str(8 - linha)
+
+def _casa(texto):
+    return 8 - int(texto[1]), COLUNAS_SAN.index(texto[0])
+
+def _casas_da_peca(jogo, nome, cor):
+    return [(peca.linha, peca.coluna) for fileira in jogo.tabuleiro for peca in fileira
+            if peca is not None and peca.nome == nome and peca.cor == cor]
+
+
+# --- SAN ---
+def lance_para_san(jogo, lance, sufixo=True):
+    # SAN do lance (origem, destino) na posição atual do jogo; com `sufixo`, inclui + ou #
+    (l_orig, c_orig), (linha, coluna) = lance
+    peca = jogo.tabuleiro[l_orig][c_orig]
+    if peca.nome == 'king' and abs(coluna - c_orig) == 2:
+        san = 'O-O' if coluna > c_orig else 'O-O-O'
+    elif peca.nome == 'pawn':
+        san = (COLUNAS_SAN[c_orig] + 'x' if c_orig != coluna else '') + nome_casa(linha, coluna)
+        if linha in (0, 7): san += '=Q'
+    else:
+        # Outras peças iguais que também chegam no destino: coluna, senão fileira, senão as duas
+        rivais = [origem for origem in _casas_da_peca(jogo, peca.nome, peca.cor)
+                  if origem != (l_orig, c_orig) and (linha, coluna) in jogo.movimentos_da_casa(*origem)]
+        desambiguacao = ''
+        if rivais:
+            if all(c != c_orig for _, c in rivais): desambiguacao = COLUNAS_SAN[c_orig]
+            elif all(l != l_orig for l, _ in rivais): desambiguacao = str(8 - l_orig)
+            else: desambiguacao = nome_casa(l_orig, c_orig)
+        captura = 'x' if jogo.tabuleiro[linha][coluna] is not None else ''
+        san = LETRAS_SAN[peca.nome] + desambiguacao + captura + nome_casa(linha, coluna)
+    if sufixo:
+        oponente = 'b' if peca.cor == 'w' else 'w'
+        jogo.fazer_lance((l_orig, c_orig), (linha, coluna))
+        if jogo.is_in_check(oponente): san += '+' if jogo.tem_lances_legais(oponente) else '#'
+        jogo.desfazer_lance()
+    return san
+
+def san_para_lance(jogo, san):
+    # Lance (origem, destino) do lado a jogar correspondente ao SAN; ErroPGN se não houver
+    texto = san.rstrip('+#!?')
+    if texto in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        linha = 7 if jogo.turno == 'w' else 0
+        origem, destino = (linha, 4), (linha, 6 if len(texto) == 3 else 2)
+        rei = jogo.tabuleiro[linha][4]
+        if rei is None or rei.nome != 'king' or destino not in jogo.movimentos_da_casa(*origem): raise ErroPGN(f"{san}: roque ilegal nesta posição")
+        return origem, destino
+    encontrado = _SAN.match(texto)
+    if encontrado is None: raise ErroPGN(f"{san}: lance SAN inválido")
+    letra, coluna, linha, captura, destino, promocao = encontrado.groups()
+    if promocao is not None and promocao != 'Q': raise ErroPGN(f"{san}: só existe promoção a dama neste jogo")
+    nome, destino = NOMES_SAN[letra or 'P'], _casa(destino)
+    if nome == 'pawn' and not captura: coluna = coluna or COLUNAS_SAN[destino[1]] # Avanço de peão: mesma coluna
+    # Só as peças do tipo certo são testadas; a posição inteira não precisa ser gerada
+    candidatos = [origem for origem in _casas_da_peca(jogo, nome, jogo.turno)
+                  if (coluna is None or origem[1] == COLUNAS_SAN.index(coluna)) and (linha is None or origem[0] == 8 - int(linha))
+                  and destino in jogo.movimentos_da_casa(*origem)]
+    if len(candidatos) == 1: return candidatos[0], destino
+    if candidatos: raise ErroPGN(f"{san}: lance ambíguo")
+    if nome == 'pawn' and captura and jogo.tabuleiro[destino[0]][destino[1]] is None:
+        raise ErroPGN(f"{san}: captura en passant não existe neste jogo")
+    raise ErroPGN(f"{san}: lance ilegal nesta posição")
+
+
+# --- EXPORTAÇÃO ---
+def resultado_pgn(jogo):
+    if not jogo.game_over: return '*'
+    if jogo.status_texto.startswith("Xeque-mate"): return '1-0' if jogo.turno == 'b' else '0-1'
+    return '1/2-1/2'
+
+def exportar_pgn(jogo, cabecalhos=None):
+    # Texto PGN da partida do jogo (de jogo.fen_inicial até agora); `cabecalhos` completa/substitui os padrões
+    resultado = resultado_pgn(jogo)
+    tags = dict.fromkeys(CABECALHOS_PADRAO, '?')
+    tags.update({'Date': '????.??.??', 'Result': resultado})
+    if jogo.fen_inicial != FEN_INICIAL: tags.update({'SetUp': '1', 'FEN': jogo.fen_inicial})
+    tags.update(cabecalhos or {})
+    linhas = [f'[{nome} "{_escapar(valor)}"]' for nome, valor in tags.items()]
+
+    reproducao = Jogo(modo_ia=False, nivel_ia=None)
+    reproducao.carregar_fen(jogo.fen_inicial)
+    tokens = []
+    for indice, lance in enumerate(jogo.lances_partida):
+        if reproducao.turno == 'w': tokens.append(f"{reproducao.numero_lance}.")
+        elif indice == 0: tokens.append(f"{reproducao.numero_lance}...")
+        san = lance_para_san(reproducao, lance, sufixo=False)
+        reproducao.aplicar_lance(lance)
+        reproducao.trocar_turno()
+        # O sufixo sai da posição nova, já com a vez do oponente
+        if reproducao.is_in_check(reproducao.turno): san += '+' if reproducao.tem_lances_legais() else '#'
+        tokens.append(san)
+    tokens.append(resultado)
+
+    texto, linha = [], ''
+    for token in tokens: # Lances quebrados em linhas de até 79 caracteres
+        if linha and len(linha) + 1 + len(token) > 79:
+            texto.append(linha)
+            linha = token
+        else:
+            linha = f"{linha} {token}" if linha else token
+    texto.append(linha)
+    return '\n'.join(linhas) + '\n\n' + '\n'.join(texto) + '\n'
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+
+# --- LEITURA ---
+def ler_pgn(arquivo):
+    # Gerador de PartidaPGN. `arquivo` é um caminho ou um arquivo de texto já aberto; só a
+    # partida atual fica na memória. Comentários, variantes e NAGs são descartados
+    if isinstance(arquivo, str):
+        with open(arquivo, encoding='utf-8', errors='replace') as aberto:
+            yield from ler_pgn(aberto)
+        return
+    cabecalhos, lances, inicio = {}, [], None
+    comentario, variante = False, 0 # Dentro de {...} / profundidade de (...)
+    for numero, linha in enumerate(arquivo, start=1):
+        if not comentario and linha.startswith('['):
+            if lances: # Partida anterior sem resultado no fim
+                yield PartidaPGN(cabecalhos, lances, '*', inicio)
+                cabecalhos, lances = {}, []
+            encontrado = _CABECALHO.match(linha)
+            if encontrado:
+                if not cabecalhos: inicio = numero
+                cabecalhos[encontrado.group(1)] = re.sub(r'\\(.)', r'\1', encontrado.group(2))
+            continue
+        if linha.startswith('%') and not comentario: continue # Linha de escape
+        for token in _TOKEN.findall(linha):
+            if comentario:
+                if token == '}': comentario = False
+                continue
+            if token == '{': comentario = True
+            elif token == ';': break # Comentário até o fim da linha
+            elif token == '(': variante += 1
+            elif token == ')': variante = max(variante - 1, 0)
+            elif variante or token[0] == '$': continue
+            elif token in RESULTADOS:
+                yield PartidaPGN(cabecalhos, lances, token, inicio)
+                cabecalhos, lances, inicio = {}, [], None
+            else:
+                san = _NUMERO_LANCE.sub('', token, count=1) if token[0].isdigit() else token
+                if san:
+                    if inicio is None: inicio = numero
+                    lances.append(san)
+    if lances or cabecalhos: yield PartidaPGN(cabecalhos, lances, '*', inicio)
+
+def reproduzir(partida, jogo=None):
+    # Joga os lances da partida num Jogo (novo, se não for passado) e o devolve.
+    # ErroPGN indica o número do meio-lance que falhou
+    jogo = jogo or Jogo(modo_ia=False, nivel_ia=None)
+    try:
+        jogo.carregar_fen(partida.cabecalhos.get('FEN', FEN_INICIAL))
+    except ValueError as erro:
+        raise ErroPGN(str(erro)) from None
+    for indice, san in enumerate(partida.lances, start=1):
+        try:
+            lance = san_para_lance(jogo, san)
+        except ErroPGN as erro:
+            raise ErroPGN(f"meio-lance {indice}: {erro}") from None
+        jogo.aplicar_lance(lance)
+        jogo.trocar_turno()
+    return jogo
+
+def importar_pgn(texto):
+    # Jogo com a primeira partida do texto PGN
+    for partida in ler_pgn(texto.splitlines(keepends=True)):
+        return reproduzir(partida)
+    raise ErroPGN("Nenhuma partida no texto")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz (e valida) as partidas de um arquivo PGN")
+    parser.add_argument('arquivo')
+    parser.add_argument('--limite', type=int, help="para depois de tantas partidas")
+    args = parser.parse_args()
+
+    partidas, lances, erros = 0, 0, 0
+    inicio = time.perf_counter()
+    jogo = Jogo(modo_ia=False, nivel_ia=None)
+    for partida in ler_pgn(args.arquivo):
+        partidas += 1
+        try:
+            reproduzir(partida, jogo)
+        except ErroPGN as erro:
+            erros += 1
+            print(f"Partida {partidas} (linha {partida.linha}): {erro}", file=sys.stderr)
+        lances += len(jogo.lances_partida)
+        if args.limite and partidas >= args.limite: break
+    tempo = time.perf_counter() - inicio
+    print(f"{partidas} partidas, {lances} meios-lances, {erros} com erro em {tempo:.2f}s "
+          f"({partidas / max(tempo, 1e-9):.1f} partidas/s, {lances / max(tempo, 1e-9):.0f} lances/s)")
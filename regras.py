@@ -0,0 +1,656 @@
+# regras.py
+#
+# Núcleo do jogo: peças, tabuleiro e regras de movimento.
+# Não importa o pygame, então pode ser usado sem janela (testes, IA, scripts).
+
+import copy
+from collections import OrderedDict
+
+from bitboard import PosicaoBitboard
+from zobrist import CHAVES_PECAS, CHAVE_PRETAS_JOGAM, CHAVES_ROQUE, calcular_chave, direitos_roque
+
+LINHAS, COLUNAS = 8, 8
+FEN_INICIAL = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+TAMANHO_CACHE_LANCES = 64 # Posições guardadas no cache de lances legais (as mais recentes)
+
+
+# --- CLASSES DAS PEÇAS ---
+class Peca:
+    __slots__ = ('linha', 'coluna', 'cor', 'ja_moveu') # Sem __dict__: peças bem menores e mais rápidas de copiar
+    nome = ''  # Usado pela interface para achar a imagem (ex.: 'w_pawn')
+    def __init__(self, linha, coluna, cor):
+        self.linha, self.coluna, self.cor = linha, coluna, cor
+        self.ja_moveu = False
+    def mover(self, linha, coluna):
+        self.linha, self.coluna, self.ja_moveu = linha, coluna, True
+    def get_movimentos_validos(self, tabuleiro): return [] # Assinatura voltou a ser simples
+
+# (As classes Peao, Torre, Cavalo, Bispo e Rainha são quase as mesmas, apenas a assinatura do método mudou)
+class Peao(Peca):
+    __slots__ = ()
+    nome = 'pawn'
+    def get_movimentos_validos(self, tabuleiro):
+        movimentos = []
+        direcao = -1 if self.cor == 'w' else 1
+        if 0 <= self.linha + direcao < 8 and tabuleiro[self.linha + direcao][self.coluna] is None:
+            movimentos.append((self.linha + direcao, self.coluna))
+            if not self.ja_moveu and tabuleiro[self.linha + 2 * direcao][self.coluna] is None:
+                movimentos.append((self.linha + 2 * direcao, self.coluna))
+        for d_coluna in [-1, 1]:
+            if 0 <= self.coluna + d_coluna < 8 and 0 <= self.linha + direcao < 8:
+                peca_diagonal = tabuleiro[self.linha + direcao][self.coluna + d_coluna]
+                if peca_diagonal is not None and peca_diagonal.cor != self.cor:
+                    movimentos.append((self.linha + direcao, self.coluna + d_coluna))
+        return movimentos
+
+class Torre(Peca):
+    __slots__ = ()
+    nome = 'rook'
+    def get_movimentos_validos(self, tabuleiro):
+        movimentos, direcoes = [], [(-1, 0), (1, 0), (0, -1), (0, 1)] 
+        for d_linha, d_coluna in direcoes:
+            for i in range(1, 8):
+                linha_final, coluna_final = self.linha + d_linha*i, self.coluna + d_coluna*i
+                if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
+                    peca_destino = tabuleiro[linha_final][coluna_final]
+                    if peca_destino is None: movimentos.append((linha_final, coluna_final))
+                    elif peca_destino.cor != self.cor: movimentos.append((linha_final, coluna_final)); break 
+                    else: break 
+                else: break
+        return movimentos
+
+class Cavalo(Peca):
+    __slots__ = ()
+    nome = 'knight'
+    def get_movimentos_validos(self, tabuleiro):
+        movimentos = []
+        movimentos_em_L = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
+        for d_linha, d_coluna in movimentos_em_L:
+            linha_final, coluna_final = self.linha + d_linha, self.coluna + d_coluna
+            if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
+                peca_destino = tabuleiro[linha_final][coluna_final]
+                if peca_destino is None or peca_destino.cor != self.cor:
+                    movimentos.append((linha_final, coluna_final))
+        return movimentos
+
+class Bispo(Peca):
+    __slots__ = ()
+    nome = 'bishop'
+    def get_movimentos_validos(self, tabuleiro):
+        movimentos, direcoes = [], [(-1, -1), (-1, 1), (1, -1), (1, 1)] 
+        for d_linha, d_coluna in direcoes:
+            for i in range(1, 8):
+                linha_final, coluna_final = self.linha + d_linha*i, self.coluna + d_coluna*i
+                if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
+                    peca_destino = tabuleiro[linha_final][coluna_final]
+                    if peca_destino is None: movimentos.append((linha_final, coluna_final))
+                    elif peca_destino.cor != self.cor: movimentos.append((linha_final, coluna_final)); break 
+                    else: break 
+                else: break
+        return movimentos
+
+class Rainha(Peca):
+    __slots__ = ()
+    nome = 'queen'
+    def get_movimentos_validos(self, tabuleiro):
+        # Reutiliza a lógica da Torre e do Bispo
+        movimentos = Torre.get_movimentos_validos(self, tabuleiro)
+        movimentos.extend(Bispo.get_movimentos_validos(self, tabuleiro))
+        return movimentos
+
+class Rei(Peca):
+    __slots__ = ()
+    nome = 'king'
+    def get_movimentos_validos(self, tabuleiro):
+        movimentos = []
+        direcoes = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+        for d_linha, d_coluna in direcoes:
+            linha_final, coluna_final = self.linha + d_linha, self.coluna + d_coluna
+            if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
+                peca_destino = tabuleiro[linha_final][coluna_final]
+                if peca_destino is None or peca_destino.cor != self.cor:
+                    movimentos.append((linha_final, coluna_final))
+        return movimentos
+
+
+PECAS_FEN = {'p': Peao, 'n': Cavalo, 'b': Bispo, 'r': Torre, 'q': Rainha, 'k': Rei}
+LETRAS_FEN = {classe.nome: letra for letra, classe in PECAS_FEN.items()}
+
+# Deslocamentos usados para achar atacantes a partir da casa alvo
+SALTOS_CAVALO = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
+VIZINHAS_REI = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+DIRECOES_RETAS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIRECOES_DIAGONAIS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+# --- CLASSE PRINCIPAL DO JOGO ---
+class Jogo:
+    def __init__(self, modo_ia=True, cor_ia='b', backend='listas', mapas_ataque=False, nivel_ia=2, memoria_tt_mb=16, trabalhadores_ia=1, livro_aberturas=None, tabelas_finais=None): # Adicionado modo_ia e cor_ia
+        self.tabuleiro, self.peca_selecionada, self.turno, self.movimentos_validos = [], None, 'w', []
+        self.pos_rei_w, self.pos_rei_b = (7, 4), (0, 4)
+        self.game_over, self.status_texto = False, ""
+        self.modo_ia = modo_ia
+        self.cor_ia = cor_ia
+        self.nivel_ia = nivel_ia # Chave de motor.TEMPO_POR_NIVEL; None = IA antiga (aleatória/capturas)
+        self.estatisticas_ia = {} # Da última busca: profundidade, nós, tempo, nps, pontuação ({'livro': True} / {'finais': True} se não houve busca)
+        self.memoria_tt_mb, self.tabela_ia = memoria_tt_mb, None # Tabela de transposição, criada na 1ª busca
+        self.trabalhadores_ia, self._busca_paralela = trabalhadores_ia, None # > 1: busca em vários processos (paralelo.py)
+        self.livro_aberturas = livro_aberturas # Caminho do livro (livro.py), aberto na 1ª consulta
+        self.tabelas_finais = tabelas_finais # Diretório das tabelas de finais (finais.py), idem
+        # Arquivos já abertos (livro, tabelas de finais). O dicionário é o mesmo nas cópias: o que a cópia da IA
+        # abre fica para o jogo original e para os próximos lances, sem reabrir a cada lance
+        self._abertos = {}
+        self.backend = backend # 'listas' (métodos das peças) ou 'bitboard' (bitboard.py)
+        self.numero_lance = 1 # Número do lance completo (sobe depois de cada lance das pretas), como na FEN
+        # Cache de lances legais por posição: (chave_zobrist, cor) -> {origem: [destinos]}.
+        # A posição atual fica também em _lances_atuais, que _mover() invalida
+        self._cache_lances, self._lances_atuais = OrderedDict(), None
+        self.criar_tabuleiro()
+        self._iniciar_historico()
+        # Mapas de ataque opcionais: quantas peças de cada cor atacam cada casa.
+        # Atualizados por _mover(); valem só para a posição real (não durante make/unmake)
+        self.mapas_ataque, self._ataques_peca, self._topo_mapa = None, {}, None
+        if mapas_ataque: self._reconstruir_mapas_ataque()
+
+    def criar_tabuleiro(self):
+        # (Não muda)
+        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
+        self.tabuleiro[0] = [Torre(0,0,'b'), Cavalo(0,1,'b'), Bispo(0,2,'b'), Rainha(0,3,'b'), Rei(0,4,'b'), Bispo(0,5,'b'), Cavalo(0,6,'b'), Torre(0,7,'b')]
+        self.tabuleiro[1] = [Peao(1, i, 'b') for i in range(8)]
+        self.tabuleiro[6] = [Peao(6, i, 'w') for i in range(8)]
+        self.tabuleiro[7] = [Torre(7,0,'w'), Cavalo(7,1,'w'), Bispo(7,2,'w'), Rainha(7,3,'w'), Rei(7,4,'w'), Bispo(7,5,'w'), Cavalo(7,6,'w'), Torre(7,7,'w')]
+
+    def carregar_fen(self, fen):
+        # Monta a posição a partir de uma FEN. O campo de en passant é ignorado (o jogo não tem
+        # en passant) e os direitos de roque viram os flags ja_moveu do rei e das torres.
+        campos = fen.split()
+        linhas = campos[0].split('/') if campos else []
+        if len(linhas) != 8: raise ValueError(f"FEN inválida: {fen!r}")
+        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
+        for linha, texto in enumerate(linhas):
+            coluna = 0
+            for char in texto:
+                if char.isdigit():
+                    coluna += int(char)
+                    continue
+                if char.lower() not in PECAS_FEN or coluna > 7: raise ValueError(f"FEN inválida: {fen!r}")
+                cor = 'w' if char.isupper() else 'b'
+                peca = PECAS_FEN[char.lower()](linha, coluna, cor)
+                # Só o peão na casa inicial pode avançar duas; o roque é decidido logo abaixo
+                peca.ja_moveu = not (isinstance(peca, Peao) and linha == (6 if cor == 'w' else 1))
+                self.tabuleiro[linha][coluna] = peca
+                coluna += 1
+        reis = [p for linha in self.tabuleiro for p in linha if isinstance(p, Rei)]
+        if sorted(p.cor for p in reis) != ['b', 'w']: raise ValueError(f"FEN inválida (precisa de um rei de cada cor): {fen!r}")
+        roques = campos[2] if len(campos) > 2 else '-'
+        for letra, linha, coluna in (('K', 7, 7), ('Q', 7, 0), ('k', 0, 7), ('q', 0, 0)):
+            rei, torre = self.tabuleiro[linha][4], self.tabuleiro[linha][coluna]
+            if letra in roques and isinstance(rei, Rei) and isinstance(torre, Torre):
+                rei.ja_moveu = torre.ja_moveu = False
+        numero_lance = int(campos[5]) if len(campos) > 5 and campos[5].isdigit() and int(campos[5]) > 0 else 1
+        self.carregar_tabuleiro(self.tabuleiro, campos[1] if len(campos) > 1 and campos[1] in ('w', 'b') else 'w', numero_lance)
+
+    def carregar_tabuleiro(self, tabuleiro, turno, numero_lance=1):
+        # Começa uma partida nova a partir de um tabuleiro já montado (8 listas de 8 peças
+        # ou None, com um rei de cada cor e os flags ja_moveu certos)
+        self.tabuleiro, self.turno, self.numero_lance = tabuleiro, turno, numero_lance
+        for linha in tabuleiro:
+            for peca in linha:
+                if isinstance(peca, Rei):
+                    if peca.cor == 'w': self.pos_rei_w = (peca.linha, peca.coluna)
+                    else: self.pos_rei_b = (peca.linha, peca.coluna)
+        self._iniciar_historico()
+        self.peca_selecionada, self.movimentos_validos = None, []
+        self.game_over, self.status_texto = False, ""
+        if self.mapas_ataque is not None: self._reconstruir_mapas_ataque()
+        self.verificar_fim_de_jogo()
+
+    def _iniciar_historico(self):
+        self.historico = [] # Pilha de lances feitos, usada por desfazer_lance()
+        self.chave_zobrist = calcular_chave(self.tabuleiro, self.turno) # Mantida por fazer_lance/desfazer_lance
+        self._cache_lances.clear() # Tabuleiro novo: nada do que estava no cache vale mais
+        self._lances_atuais = None
+        self._posicao_bb = None # Backend bitboard: montada na 1ª consulta (_posicao_bitboard)
+        self.repeticoes = {self.chave_zobrist: 1} # Quantas vezes cada posição já apareceu na partida
+        # Lances (origem, destino) jogados desde fen_inicial; é o que pgn.py exporta
+        self.fen_inicial, self.lances_partida = self.gerar_fen(), []
+
+    def gerar_fen(self):
+        # Inverso de carregar_fen. Como o jogo não tem en passant nem regra dos 50 lances,
+        # esses campos saem sempre "-" e "0"
+        fileiras = []
+        for linha in self.tabuleiro:
+            texto, vazias = '', 0
+            for peca in linha:
+                if peca is None:
+                    vazias += 1
+                    continue
+                letra = LETRAS_FEN[peca.nome]
+                texto += (str(vazias) if vazias else '') + (letra.upper() if peca.cor == 'w' else letra)
+                vazias = 0
+            fileiras.append(texto + (str(vazias) if vazias else ''))
+        direitos = direitos_roque(self.tabuleiro)
+        roques = ''.join(letra for bit, letra in ((1, 'K'), (2, 'Q'), (4, 'k'), (8, 'q')) if direitos & bit) or '-'
+        return f"{'/'.join(fileiras)} {self.turno} {roques} - 0 {self.numero_lance}"
+
+    def selecionar(self, linha, coluna):
+        if self.peca_selecionada:
+            if self._mover(linha, coluna): self.trocar_turno()
+            self.peca_selecionada, self.movimentos_validos = None, []
+        else:
+            peca = self.tabuleiro[linha][coluna]
+            if peca is not None and peca.cor == self.turno:
+                self.peca_selecionada = peca
+                self.movimentos_validos = self.movimentos_por_origem(self.turno).get((linha, coluna), [])
+                return True
+        return False
+        
+    def _mover(self, linha, coluna):
+        if self.peca_selecionada and (linha, coluna) in self.movimentos_validos:
+            peca_movida = self.peca_selecionada
+            mapas_em_dia = self._mapas_sincronizados()
+            self.lances_partida.append(((peca_movida.linha, peca_movida.coluna), (linha, coluna)))
+            if peca_movida.cor == 'b': self.numero_lance += 1
+            self.fazer_lance((peca_movida.linha, peca_movida.coluna), (linha, coluna))
+            self.repeticoes[self.chave_zobrist] = self.repeticoes.get(self.chave_zobrist, 0) + 1
+            self._lances_atuais = None # A posição mudou; a anterior continua no cache, se voltar
+            if mapas_em_dia: self._atualizar_mapas_ataque()
+            elif self.mapas_ataque is not None: self._reconstruir_mapas_ataque()
+            return True
+        return False
+
+    # --- FAZER / DESFAZER LANCE (no próprio tabuleiro, sem cópias) ---
+    def fazer_lance(self, origem, destino):
+        # Não valida nem troca self.turno: quem chama já sabe que o lance é pseudo-legal.
+        # Empilha em self.historico tudo o que desfazer_lance() precisa para voltar atrás.
+        # A chave de Zobrist já passa a ser a do outro lado a jogar.
+        (l_orig, c_orig), (linha, coluna) = origem, destino
+        peca_movida = self.tabuleiro[l_orig][c_orig]
+        capturada = self.tabuleiro[linha][coluna]
+        roque = isinstance(peca_movida, Rei) and abs(coluna - c_orig) == 2
+        torre = self.tabuleiro[linha][7 if coluna > c_orig else 0] if roque else None
+        self.historico.append((peca_movida, l_orig, c_orig, capturada, peca_movida.ja_moveu, torre, self.chave_zobrist))
+        if self._posicao_bb is not None: self._posicao_bb.fazer_lance(l_orig * 8 + c_orig, linha * 8 + coluna)
+
+        chaves = CHAVES_PECAS[peca_movida.cor]
+        chave = self.chave_zobrist ^ CHAVE_PRETAS_JOGAM ^ chaves[peca_movida.nome][l_orig * 8 + c_orig]
+        if capturada is not None: chave ^= CHAVES_PECAS[capturada.cor][capturada.nome][linha * 8 + coluna]
+        # Os direitos de roque só mudam quando sai (ou é capturada) uma peça que nunca se moveu
+        mexe_no_roque = not peca_movida.ja_moveu or (capturada is not None and not capturada.ja_moveu)
+        if mexe_no_roque: chave ^= CHAVES_ROQUE[direitos_roque(self.tabuleiro)]
+
+        if isinstance(peca_movida, Rei):
+            if roque: # A torre pula para o outro lado do rei
+                torre_col_orig = torre.coluna
+                torre_col_final = 5 if coluna > c_orig else 3
+                self.tabuleiro[linha][torre_col_final] = torre
+                self.tabuleiro[linha][torre_col_orig] = None
+                torre.linha, torre.coluna, torre.ja_moveu = linha, torre_col_final, True
+                chave ^= chaves[torre.nome][linha * 8 + torre_col_orig] ^ chaves[torre.nome][linha * 8 + torre_col_final]
+            if peca_movida.cor == 'w': self.pos_rei_w = (linha, coluna)
+            else: self.pos_rei_b = (linha, coluna)
+        self.tabuleiro[linha][coluna], self.tabuleiro[l_orig][c_orig] = peca_movida, None
+        peca_movida.linha, peca_movida.coluna, peca_movida.ja_moveu = linha, coluna, True
+        if isinstance(peca_movida, Peao) and linha in (0, 7):
+            promovida = Rainha(linha, coluna, peca_movida.cor)
+            promovida.ja_moveu = True # Senão uma dama promovida no canto habilitaria um roque
+            self.tabuleiro[linha][coluna] = promovida
+        chave ^= chaves[self.tabuleiro[linha][coluna].nome][linha * 8 + coluna]
+        if mexe_no_roque: chave ^= CHAVES_ROQUE[direitos_roque(self.tabuleiro)]
+        self.chave_zobrist = chave
+
+    def desfazer_lance(self):
+        peca_movida, l_orig, c_orig, capturada, ja_moveu, torre, self.chave_zobrist = self.historico.pop()
+        if self._posicao_bb is not None:
+            # Sem histórico: o lance desfeito é de antes de a posição em bitboards ser montada
+            if self._posicao_bb.historico: self._posicao_bb.desfazer_lance()
+            else: self._posicao_bb = None
+        linha, coluna = peca_movida.linha, peca_movida.coluna
+        self.tabuleiro[l_orig][c_orig], self.tabuleiro[linha][coluna] = peca_movida, capturada
+        peca_movida.linha, peca_movida.coluna, peca_movida.ja_moveu = l_orig, c_orig, ja_moveu
+        if isinstance(peca_movida, Rei):
+            if torre is not None:
+                torre_col_orig = 7 if torre.coluna == 5 else 0
+                self.tabuleiro[linha][torre_col_orig], self.tabuleiro[linha][torre.coluna] = torre, None
+                torre.coluna, torre.ja_moveu = torre_col_orig, False
+            if peca_movida.cor == 'w': self.pos_rei_w = (l_orig, c_orig)
+            else: self.pos_rei_b = (l_orig, c_orig)
+
+    def trocar_turno(self):
+        self.turno = 'b' if self.turno == 'w' else 'w'; self.verificar_fim_de_jogo()
+
+    def verificar_fim_de_jogo(self):
+        if not self.tem_lances_legais(self.turno):
+            self.game_over = True
+            if self.is_in_check(self.turno):
+                vencedor = "Brancas" if self.turno == 'b' else "Pretas"
+                self.status_texto = f"Xeque-mate! {vencedor} vencem."
+            else: self.status_texto = "Empate por Afogamento!"
+        elif self.repeticoes.get(self.chave_zobrist, 0) >= 3:
+            self.game_over, self.status_texto = True, "Empate por Repetição!"
+
+    def _get_todos_movimentos_legais(self, cor):
+        return [destino for destinos in self.movimentos_por_origem(cor).values() for destino in destinos]
+
+    # --- CACHE DE LANCES DA POSIÇÃO ATUAL ---
+    def movimentos_por_origem(self, cor=None):
+        # Lances legais da posição atual, {origem: [destinos]} (só origens com lances).
+        # Gerados uma vez por posição e compartilhados pela seleção, pelo fim de jogo e
+        # pela IA; não altere o dicionário nem as listas devolvidas
+        cor = cor or self.turno
+        chave = (self.chave_zobrist, cor)
+        if self._lances_atuais is not None and self._lances_atuais[0] == chave:
+            return self._lances_atuais[1]
+        lances = self._cache_lances.get(chave)
+        if lances is None:
+            lances = {}
+            for origem, destino in self.gerar_lances_legais(cor):
+                lances.setdefault(origem, []).append(destino)
+            self._cache_lances[chave] = lances
+            if len(self._cache_lances) > TAMANHO_CACHE_LANCES: self._cache_lances.popitem(last=False)
+        else:
+            self._cache_lances.move_to_end(chave)
+        self._lances_atuais = (chave, lances)
+        return lances
+
+    def lances_da_posicao(self, cor=None):
+        # Os mesmos lances de movimentos_por_origem, como lista nova de pares (origem, destino)
+        return [(origem, destino) for origem, destinos in self.movimentos_por_origem(cor).items() for destino in destinos]
+
+    def _lances_em_cache(self, cor):
+        # Lances da posição atual se já estiverem no cache, sem gerar nem reordenar nada
+        chave = (self.chave_zobrist, cor)
+        if self._lances_atuais is not None and self._lances_atuais[0] == chave: return self._lances_atuais[1]
+        return self._cache_lances.get(chave)
+
+    def movimentos_da_casa(self, linha, coluna):
+        # Destinos legais da peça em (linha, coluna): do cache, se a posição já foi gerada;
+        # senão só os dessa peça (quem precisa de poucas peças, como o SAN, não gera a posição toda)
+        peca = self.tabuleiro[linha][coluna]
+        if peca is None: return []
+        lances = self._lances_em_cache(peca.cor)
+        if lances is not None: return lances.get((linha, coluna), [])
+        return self._movimentos_legais_peca(peca)
+
+    def tem_lances_legais(self, cor=None):
+        # Para o fim de jogo basta achar um lance: sem cache, para na primeira peça que tiver
+        cor = cor or self.turno
+        lances = self._lances_em_cache(cor)
+        if lances is not None: return bool(lances)
+        return any(self._movimentos_legais_peca(peca) for fileira in self.tabuleiro for peca in fileira
+                   if peca is not None and peca.cor == cor)
+
+    def gerar_lances_legais(self, cor, apenas_capturas=False):
+        # Todos os lances legais de `cor` como pares (origem, destino)
+        if self.backend == 'bitboard':
+            return self._posicao_bitboard().movimentos_legais(cor, apenas_capturas=apenas_capturas)
+        lances = []
+        for r in range(LINHAS):
+            for c in range(COLUNAS):
+                peca = self.tabuleiro[r][c]
+                if peca is not None and peca.cor == cor:
+                    lances.extend(((r, c), destino) for destino in self._movimentos_legais_peca(peca, apenas_capturas))
+        return lances
+
+    def _movimentos_legais_peca(self, peca, apenas_capturas=False):
+        if self.backend == 'bitboard':
+            origem = (peca.linha, peca.coluna)
+            return [destino for _, destino in self._posicao_bitboard().movimentos_legais(peca.cor, origem, apenas_capturas)]
+        movimentos = peca.get_movimentos_validos(self.tabuleiro)
+        if apenas_capturas: # Usado pela busca de quiescência da IA
+            movimentos = [(l, c) for l, c in movimentos if self.tabuleiro[l][c] is not None]
+        elif isinstance(peca, Rei):
+            movimentos.extend(self._get_movimentos_roque(peca))
+        return self._filtrar_movimentos_ilegais(peca, movimentos)
+    
+    def _posicao_bitboard(self):
+        # A posição atual em bitboards: montada do tabuleiro uma vez e depois mantida
+        # por fazer_lance/desfazer_lance, em vez de refeita a cada consulta
+        if self._posicao_bb is None: self._posicao_bb = PosicaoBitboard.do_tabuleiro(self.tabuleiro)
+        return self._posicao_bb
+
+    # --- NOVO MÉTODO PARA O ROQUE ---
+    def _get_movimentos_roque(self, rei):
+        movimentos = []
+        if rei.ja_moveu or self.is_in_check(rei.cor):
+            return movimentos # Não pode fazer roque se o rei já moveu ou está em xeque
+        
+        cor_oponente = 'b' if rei.cor == 'w' else 'w'
+        # Roque pequeno (lado do Rei)
+        torre_pequeno = self.tabuleiro[rei.linha][7]
+        if torre_pequeno is not None and not torre_pequeno.ja_moveu:
+            if self.tabuleiro[rei.linha][5] is None and self.tabuleiro[rei.linha][6] is None:
+                if not self.is_square_under_attack(rei.linha, 5, cor_oponente) and \
+                   not self.is_square_under_attack(rei.linha, 6, cor_oponente):
+                    movimentos.append((rei.linha, 6))
+        # Roque grande (lado da Rainha)
+        torre_grande = self.tabuleiro[rei.linha][0]
+        if torre_grande is not None and not torre_grande.ja_moveu:
+            if self.tabuleiro[rei.linha][1] is None and self.tabuleiro[rei.linha][2] is None and self.tabuleiro[rei.linha][3] is None:
+                if not self.is_square_under_attack(rei.linha, 2, cor_oponente) and \
+                   not self.is_square_under_attack(rei.linha, 3, cor_oponente):
+                    movimentos.append((rei.linha, 2))
+        return movimentos
+
+    def _filtrar_movimentos_ilegais(self, peca, movimentos):
+        movimentos_legais = []
+        origem, cor_oponente = (peca.linha, peca.coluna), 'b' if peca.cor == 'w' else 'w'
+        for movimento in movimentos:
+            self.fazer_lance(origem, movimento)
+            pos_rei = self.pos_rei_w if peca.cor == 'w' else self.pos_rei_b
+            if not self.is_square_under_attack(pos_rei[0], pos_rei[1], cor_oponente):
+                movimentos_legais.append(movimento)
+            self.desfazer_lance()
+        return movimentos_legais
+    
+    def is_square_under_attack(self, linha, coluna, cor_atacante, tabuleiro_arg=None):
+        if tabuleiro_arg is None and self._mapas_sincronizados():
+            return self.mapas_ataque[cor_atacante][linha * 8 + coluna] > 0
+        tabuleiro = tabuleiro_arg if tabuleiro_arg is not None else self.tabuleiro
+        # Procura de trás para frente, a partir da casa alvo: quem poderia atacá-la?
+        for d_linha, d_coluna in SALTOS_CAVALO:
+            l, c = linha + d_linha, coluna + d_coluna
+            if 0 <= l < 8 and 0 <= c < 8:
+                peca = tabuleiro[l][c]
+                if peca is not None and peca.cor == cor_atacante and isinstance(peca, Cavalo): return True
+        l = linha + (1 if cor_atacante == 'w' else -1) # O peão atacante fica uma linha "atrás" do alvo
+        if 0 <= l < 8:
+            for c in (coluna - 1, coluna + 1):
+                if 0 <= c < 8:
+                    peca = tabuleiro[l][c]
+                    if peca is not None and peca.cor == cor_atacante and isinstance(peca, Peao): return True
+        for d_linha, d_coluna in VIZINHAS_REI:
+            l, c = linha + d_linha, coluna + d_coluna
+            if 0 <= l < 8 and 0 <= c < 8:
+                peca = tabuleiro[l][c]
+                if peca is not None and peca.cor == cor_atacante and isinstance(peca, Rei): return True
+        for direcoes, tipos in ((DIRECOES_RETAS, (Torre, Rainha)), (DIRECOES_DIAGONAIS, (Bispo, Rainha))):
+            for d_linha, d_coluna in direcoes:
+                l, c = linha + d_linha, coluna + d_coluna
+                while 0 <= l < 8 and 0 <= c < 8:
+                    peca = tabuleiro[l][c]
+                    if peca is not None: # O raio para na primeira peça, seja ela qual for
+                        if peca.cor == cor_atacante and isinstance(peca, tipos): return True
+                        break
+                    l, c = l + d_linha, c + d_coluna
+        return False
+
+    # --- MAPAS DE ATAQUE INCREMENTAIS ---
+    def _casas_atacadas(self, peca):
+        # Casas que a peça ataca, inclusive as ocupadas por peças da mesma cor
+        if isinstance(peca, Peao):
+            l = peca.linha + (-1 if peca.cor == 'w' else 1)
+            return [l * 8 + c for c in (peca.coluna - 1, peca.coluna + 1) if 0 <= l < 8 and 0 <= c < 8]
+        if isinstance(peca, (Cavalo, Rei)):
+            saltos = SALTOS_CAVALO if isinstance(peca, Cavalo) else VIZINHAS_REI
+            return [l * 8 + c for l, c in ((peca.linha + dl, peca.coluna + dc) for dl, dc in saltos) if 0 <= l < 8 and 0 <= c < 8]
+        direcoes = []
+        if isinstance(peca, (Torre, Rainha)): direcoes += DIRECOES_RETAS
+        if isinstance(peca, (Bispo, Rainha)): direcoes += DIRECOES_DIAGONAIS
+        casas = []
+        for d_linha, d_coluna in direcoes:
+            l, c = peca.linha + d_linha, peca.coluna + d_coluna
+            while 0 <= l < 8 and 0 <= c < 8:
+                casas.append(l * 8 + c)
+                if self.tabuleiro[l][c] is not None: break
+                l, c = l + d_linha, c + d_coluna
+        return casas
+
+    def _trocar_ataques(self, peca, casas):
+        mapa = self.mapas_ataque[peca.cor]
+        for casa in self._ataques_peca.pop(peca, ()): mapa[casa] -= 1
+        if casas:
+            for casa in casas: mapa[casa] += 1
+            self._ataques_peca[peca] = casas
+
+    def _reconstruir_mapas_ataque(self):
+        self.mapas_ataque, self._ataques_peca = {'w': [0] * 64, 'b': [0] * 64}, {}
+        for linha in self.tabuleiro:
+            for peca in linha:
+                if peca is not None: self._trocar_ataques(peca, self._casas_atacadas(peca))
+        self._topo_mapa = self.historico[-1] if self.historico else None
+
+    def _mapas_sincronizados(self):
+        # Os mapas descrevem a posição atual só se nenhum lance foi feito ou desfeito fora de _mover()
+        return self.mapas_ataque is not None and (self.historico[-1] if self.historico else None) is self._topo_mapa
+
+    def _atualizar_mapas_ataque(self):
+        # Depois de um lance só mudam os ataques das peças envolvidas e das peças de longo
+        # alcance cujo raio passava (ou agora passa) por uma das casas alteradas
+        peca_movida, l_orig, c_orig, capturada, _, torre, _ = self.historico[-1]
+        alteradas = {l_orig * 8 + c_orig, peca_movida.linha * 8 + peca_movida.coluna}
+        if torre is not None:
+            alteradas |= {torre.linha * 8 + (7 if torre.coluna == 5 else 0), torre.linha * 8 + torre.coluna}
+        for peca in (capturada, peca_movida): # Saíram do tabuleiro: a capturada e o peão promovido
+            if peca is not None and self.tabuleiro[peca.linha][peca.coluna] is not peca:
+                self._trocar_ataques(peca, ())
+        recalcular = {self.tabuleiro[casa // 8][casa % 8] for casa in alteradas} - {None}
+        recalcular.update(peca for peca, casas in self._ataques_peca.items()
+                          if isinstance(peca, (Torre, Bispo, Rainha)) and not alteradas.isdisjoint(casas))
+        for peca in recalcular: self._trocar_ataques(peca, self._casas_atacadas(peca))
+        self._topo_mapa = self.historico[-1]
+
+    def is_in_check(self, cor):
+        pos_rei = self.pos_rei_w if cor == 'w' else self.pos_rei_b
+        return self.is_square_under_attack(pos_rei[0], pos_rei[1], 'b' if cor == 'w' else 'w')
+
+    def fazer_movimento_ia(self):
+        if self.game_over or self.turno != self.cor_ia:
+            return
+        lance = self.escolher_lance_ia()
+        if lance is None:
+            self.verificar_fim_de_jogo()
+            return
+        self.aplicar_lance(lance)
+
+    def aplicar_lance(self, lance):
+        # Joga um lance (origem, destino) já escolhido, pelo mesmo caminho de um clique
+        (l_orig, c_orig), destino = lance
+        self.peca_selecionada, self.movimentos_validos = self.tabuleiro[l_orig][c_orig], [destino]
+        return self._mover(destino[0], destino[1])
+
+    def criar_motor_ia(self):
+        from motor import Motor, TEMPO_POR_NIVEL # Import local: motor.py não precisa ser carregado sem IA
+        from transposicao import TabelaTransposicao
+        if self.trabalhadores_ia > 1:
+            from paralelo import BuscaParalela
+            if self._busca_paralela is None: # O pool é criado uma vez e fica para as próximas buscas
+                self._busca_paralela = BuscaParalela(self.trabalhadores_ia, self.memoria_tt_mb)
+                self.tabela_ia = self._busca_paralela.tabela
+            self._busca_paralela.tempo_limite = TEMPO_POR_NIVEL[self.nivel_ia]
+            return self._busca_paralela
+        if self.tabela_ia is None: self.tabela_ia = TabelaTransposicao(self.memoria_tt_mb)
+        return Motor(tempo_limite=TEMPO_POR_NIVEL[self.nivel_ia], tabela=self.tabela_ia)
+
+    def escolher_lance_ia(self, motor=None):
+        # Só escolhe o lance da IA; a posição fica como estava. Passe o `motor` para poder
+        # interromper a busca de outra thread com motor.parar()
+        lance = self.lance_do_livro()
+        if lance is not None:
+            self.estatisticas_ia = {'livro': True}
+            return lance
+        lance = self.lance_das_tabelas()
+        if lance is not None:
+            self.estatisticas_ia = {'finais': True}
+            return lance
+        if self.nivel_ia is None:
+            self.estatisticas_ia = {}
+            return self._escolher_lance_aleatorio()
+        motor = motor or self.criar_motor_ia()
+        lance = motor.buscar(self, self.cor_ia)
+        self.estatisticas_ia = motor.estatisticas
+        return lance
+
+    def lance_do_livro(self):
+        # Lance do livro de aberturas para a posição atual, ou None (sem livro ou fora dele)
+        if self.livro_aberturas is None: return None
+        livro = self._abertos.get('livro')
+        if livro is None:
+            from livro import LivroAberturas # Import local: só quem usa livro carrega o módulo
+            livro = self._abertos['livro'] = LivroAberturas(self.livro_aberturas)
+        return livro.escolher(self)
+
+    def lance_das_tabelas(self):
+        # Lance perfeito das tabelas de finais (poucas peças, sem roque), ou None
+        if self.tabelas_finais is None: return None
+        finais = self._abertos.get('finais')
+        if finais is None:
+            from finais import TabelasFinais # Import local, como o livro
+            finais = self._abertos['finais'] = TabelasFinais(self.tabelas_finais)
+        return finais.melhor_lance(self)
+
+    def copiar(self):
+        # Cópia independente da posição atual, para a IA pensar sem mexer no jogo que está
+        # sendo desenhado. O histórico de lances não vem junto; as repetições e a tabela da IA, sim,
+        # e os arquivos abertos são compartilhados (_abertos é o mesmo dicionário).
+        copia = copy.copy(self)
+        copia.tabuleiro = [[copy.copy(peca) if peca is not None else None for peca in linha] for linha in self.tabuleiro]
+        copia.historico, copia.repeticoes, copia.lances_partida = [], dict(self.repeticoes), list(self.lances_partida)
+        copia.peca_selecionada, copia.movimentos_validos, copia.estatisticas_ia = None, [], {}
+        copia.mapas_ataque, copia._ataques_peca, copia._topo_mapa = None, {}, None
+        copia._posicao_bb = None # Remontada das peças copiadas na 1ª consulta
+        copia._cache_lances = OrderedDict(self._cache_lances) # As listas são só lidas; podem ser as mesmas
+        if self.mapas_ataque is not None: copia._reconstruir_mapas_ataque()
+        return copia
+
+    def _escolher_lance_aleatorio(self):
+        # IA original: primeira captura ou xeque encontrado (peças embaralhadas), senão um lance aleatório
+        import random
+        todos_movimentos_possiveis = []
+        pecas_ia = []
+
+        # Coleta todas as peças da IA
+        for r in range(LINHAS):
+            for c in range(COLUNAS):
+                peca = self.tabuleiro[r][c]
+                if peca is not None and peca.cor == self.cor_ia:
+                    pecas_ia.append(peca)
+
+        random.shuffle(pecas_ia) # Embaralha as peças para adicionar mais aleatoriedade
+
+        lances_ia = self.movimentos_por_origem(self.cor_ia)
+        for peca in pecas_ia:
+            movimentos_legais_peca = lances_ia.get((peca.linha, peca.coluna), [])
+
+            if movimentos_legais_peca:
+                # Prioriza capturas ou movimentos que resultem em xeque
+                cor_oponente = 'w' if self.cor_ia == 'b' else 'b'
+                for mov in movimentos_legais_peca:
+                    # Simula o movimento no próprio tabuleiro para ver se é uma captura ou xeque
+                    peca_capturada = self.tabuleiro[mov[0]][mov[1]]
+                    self.fazer_lance((peca.linha, peca.coluna), mov)
+                    xeque_no_oponente = self.is_in_check(cor_oponente)
+                    self.desfazer_lance()
+
+                    if peca_capturada is not None or xeque_no_oponente:
+                        return ((peca.linha, peca.coluna), mov) # Movimento prioritário encontrado
+
+                # Se nenhum movimento prioritário foi feito, adiciona todos os legais da peça
+                for mov in movimentos_legais_peca:
+                    todos_movimentos_possiveis.append(((peca.linha, peca.coluna), mov))
+
+        if not todos_movimentos_possiveis:
+            return None # Xeque-mate ou afogamento
+
+        # Escolhe um movimento aleatório entre os coletados (que não são capturas/xeques prioritários)
+        return random.choice(todos_movimentos_possiveis)
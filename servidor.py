@@ -0,0 +1,309 @@
+# servidor.py
+#
+# Servidor de partidas: um processo asyncio atende muitos jogadores e bots por TCP,
+# cada um com as suas sessões (um Jogo por sessão), sem janela. O protocolo é uma
+# linha JSON por pedido e uma por resposta; o "id" do pedido (opcional) volta na
+# resposta, então o cliente pode mandar vários pedidos sem esperar.
+#
+# Os lances do jogador são validados e jogados direto no loop de eventos (é rápido).
+# A IA roda num pool de processos (concurrent.futures), então uma busca lenta não
+# atrasa as outras sessões; cada sessão atende um pedido de cada vez, na ordem.
+#
+# Pedidos ({"comando": ..., "sessao": ..., "id": ...}):
+#   novo     {"fen"?, "ia"?: "w"|"b", "nivel"?: 1-5|null, "nos"?}  -> {"sessao", "fen", "turno"}
+#   lance    {"sessao", "lance": "e2e4"}  -> estado; com "ia" na sessão, inclui a "resposta" da IA
+#   ia       {"sessao", "nivel"?, "nos"?}  -> a IA joga pelo lado da vez (bots)
+#   estado   {"sessao"}  -> fen, turno, lances da partida, fim
+#   legais   {"sessao"}  -> lances legais do lado da vez
+#   metricas {"sessao"?}  -> latências da sessão, ou as globais
+#   fechar   {"sessao"}
+# Lances em notação longa (e2e4, e1g1, e7e8q), como no uci.py. Erros: {"ok": false, "erro": ...}.
+#
+# Métricas: histogramas de latência (microssegundos) por comando, por sessão e no total.
+# "lance" é só validar e jogar; "ia" vai do pedido ao pool até o lance voltar, e
+# "ia_busca" é a busca em si (a diferença é a espera na fila do pool).
+#
+# Uso:
+#   python servidor.py --porta 8765 --processos 4 --relatorio 10
+#   python carga.py --sessoes 1000          # teste de carga (outro terminal)
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentacao import Histograma
+from motor import MEMORIA_TT_MB, TEMPO_POR_NIVEL, Motor
+from pgn import resultado_pgn
+from regras import FEN_INICIAL, Jogo
+from transposicao import TabelaTransposicao
+from uci import lance_para_uci, uci_para_lance
+
+PORTA = 8765
+MAXIMO_SESSOES = 10000
+COMANDOS = ('novo', 'lance', 'ia', 'estado', 'legais', 'metricas', 'fechar')
+NIVEL_PADRAO = 1 # Nível da IA das sessões que não escolhem (motor.TEMPO_POR_NIVEL)
+
+_TABELA_IA = None # Tabela de transposição de cada processo do pool, compartilhada pelas sessões
+
+
+# --- IA (roda nos processos do pool) ---
+def buscar_lance(fen, repeticoes, nivel, nos=None):
+    # Lance da IA para o lado da vez: (lance, segundos de busca). A posição vai como FEN
+    # mais as repetições, para o pool não precisar do Jogo inteiro
+    global _TABELA_IA
+    inicio = time.perf_counter()
+    jogo = Jogo(modo_ia=False, nivel_ia=nivel)
+    jogo.carregar_fen(fen)
+    jogo.repeticoes = repeticoes
+    if nivel is None and not nos:
+        jogo.cor_ia = jogo.turno
+        lance = jogo.escolher_lance_ia() # IA antiga (aleatória)
+    else:
+        if _TABELA_IA is None: _TABELA_IA = TabelaTransposicao(MEMORIA_TT_MB)
+        motor = Motor(tempo_limite=None if nos else TEMPO_POR_NIVEL[nivel], nos_limite=nos, tabela=_TABELA_IA)
+        lance = motor.buscar(jogo)
+    return lance, time.perf_counter() - inicio
+
+
+# --- MÉTRICAS ---
+class Latencias:
+    # Histograma de latência (microssegundos) de cada comando
+    def __init__(self):
+        self.comandos = {}
+
+    def registrar(self, comando, segundos):
+        self.comandos.setdefault(comando, Histograma('us')).adicionar(segundos * 1e6)
+
+    def para_dict(self):
+        return {comando: histograma.para_dict() for comando, histograma in self.comandos.items()}
+
+
+class ErroPedido(ValueError):
+    pass
+
+def _nos(valor):
+    # Limite de nós da busca vindo do pedido: inteiro positivo ou None
+    if valor is None: return None
+    if not isinstance(valor, int) or isinstance(valor, bool) or valor <= 0: raise ErroPedido(f"nos inválido: {valor!r}")
+    return valor
+
+
+class Sessao:
+    def __init__(self, numero, jogo, cor_ia, nivel, nos):
+        self.numero, self.jogo = numero, jogo
+        self.cor_ia, self.nivel, self.nos = cor_ia, nivel, nos # IA que responde sozinha aos lances (cor_ia None: nenhuma)
+        self.trava = asyncio.Lock() # Um pedido de cada vez por sessão
+        self.latencias = Latencias()
+        self.criada = time.time()
+        self.lances = [] # Lances da partida em UCI, anotados ao jogar (o texto depende da posição de cada um)
+
+    def jogar(self, lance):
+        # Joga um lance legal do lado da vez; devolve o lance em UCI
+        texto = lance_para_uci(self.jogo, lance)
+        self.lances.append(texto)
+        self.jogo.aplicar_lance(lance)
+        if not self.jogo.game_over: self.jogo.trocar_turno()
+        return texto
+
+    def estado(self):
+        jogo = self.jogo
+        return {'sessao': self.numero, 'fen': jogo.gerar_fen(), 'turno': jogo.turno, 'fim': jogo.game_over,
+                'status': jogo.status_texto, 'resultado': resultado_pgn(jogo)}
+
+
+# --- SERVIDOR ---
+class Servidor:
+    def __init__(self, processos=None, maximo_sessoes=MAXIMO_SESSOES):
+        self.processos = processos or os.cpu_count() or 1
+        # forkserver: os processos do pool (criados sob demanda) não herdam os sockets abertos
+        # dos clientes, que senão continuariam abertos depois de o servidor fechar a conexão.
+        # No Windows não existe, mas lá o padrão (spawn) também não herda
+        metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+        self.pool = ProcessPoolExecutor(self.processos, mp_context=multiprocessing.get_context(metodo))
+        self.maximo_sessoes = maximo_sessoes
+        self.sessoes, self._proxima_sessao = {}, 1
+        self.latencias = Latencias()
+        self.conexoes, self.pedidos, self.sessoes_criadas, self.ia_pendentes = 0, 0, 0, 0
+        self.inicio = time.perf_counter()
+
+    async def iniciar(self, host='127.0.0.1', porta=PORTA):
+        return await asyncio.start_server(self._atender, host, porta)
+
+    def fechar(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _atender(self, leitor, escritor):
+        # Uma conexão: cada linha vira uma tarefa, para um pedido demorado (IA) não segurar os
+        # outros da mesma conexão. As sessões criadas por ela são fechadas quando ela cai
+        self.conexoes += 1
+        minhas, tarefas = set(), set()
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha: break
+                tarefa = asyncio.create_task(self._responder(linha, escritor, minhas))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for tarefa in list(tarefas): tarefa.cancel()
+            for numero in minhas: self.sessoes.pop(numero, None)
+            self.conexoes -= 1
+            escritor.close()
+
+    async def _responder(self, linha, escritor, minhas):
+        inicio = time.perf_counter()
+        self.pedidos += 1
+        pedido = {}
+        try:
+            pedido = json.loads(linha)
+            if not isinstance(pedido, dict):
+                pedido = {}
+                raise ErroPedido("o pedido deve ser um objeto JSON")
+            resposta = await self.tratar(pedido, minhas)
+        except (ErroPedido, ValueError) as erro: # json.JSONDecodeError é um ValueError
+            resposta = {'ok': False, 'erro': str(erro)}
+        except Exception as erro: # Falha do servidor (ex.: processo do pool morto): responde mesmo assim
+            resposta = {'ok': False, 'erro': f"erro interno: {erro!r}"}
+        if 'id' in pedido: resposta['id'] = pedido['id']
+        comando = pedido.get('comando')
+        self.latencias.registrar(f"pedido.{comando}" if comando in COMANDOS else 'pedido', time.perf_counter() - inicio)
+        try:
+            escritor.write(json.dumps(resposta, ensure_ascii=False).encode() + b'\n')
+            await escritor.drain()
+        except ConnectionError:
+            pass
+
+    async def tratar(self, pedido, minhas=None):
+        comando = pedido.get('comando')
+        if comando == 'novo': return self._novo(pedido, minhas)
+        if comando == 'metricas' and 'sessao' not in pedido: return {'ok': True, **self.metricas()}
+        tratadores = {'lance': self._lance, 'ia': self._ia, 'estado': self._estado, 'legais': self._legais,
+                      'metricas': self._metricas_sessao, 'fechar': self._fechar}
+        if comando not in tratadores: raise ErroPedido(f"comando desconhecido: {comando!r}")
+        sessao = self.sessoes.get(pedido.get('sessao'))
+        if sessao is None: raise ErroPedido(f"sessão inexistente: {pedido.get('sessao')!r}")
+        async with sessao.trava:
+            return await tratadores[comando](sessao, pedido)
+
+    def _novo(self, pedido, minhas):
+        if len(self.sessoes) >= self.maximo_sessoes: raise ErroPedido(f"limite de {self.maximo_sessoes} sessões")
+        cor_ia, nivel = pedido.get('ia'), pedido.get('nivel', NIVEL_PADRAO)
+        if cor_ia not in (None, 'w', 'b'): raise ErroPedido("ia deve ser 'w', 'b' ou null")
+        if nivel is not None and nivel not in TEMPO_POR_NIVEL: raise ErroPedido(f"nível inválido: {nivel!r}")
+        jogo = Jogo(modo_ia=False, nivel_ia=nivel)
+        jogo.carregar_fen(str(pedido.get('fen', FEN_INICIAL))) # ValueError se o FEN for inválido
+        sessao = Sessao(self._proxima_sessao, jogo, cor_ia, nivel, _nos(pedido.get('nos')))
+        self._proxima_sessao += 1
+        self.sessoes[sessao.numero] = sessao
+        self.sessoes_criadas += 1
+        if minhas is not None: minhas.add(sessao.numero)
+        return {'ok': True, **sessao.estado()}
+
+    async def _lance(self, sessao, pedido):
+        inicio, jogo = time.perf_counter(), sessao.jogo
+        if jogo.game_over: raise ErroPedido("a partida já terminou")
+        if sessao.cor_ia == jogo.turno: raise ErroPedido("é a vez da IA")
+        lance = uci_para_lance(jogo, str(pedido.get('lance', ''))) # ValueError se ilegal
+        sessao.jogar(lance)
+        self._registrar(sessao, 'lance', inicio)
+        resposta = {'ok': True, **sessao.estado()}
+        if sessao.cor_ia == jogo.turno and not jogo.game_over:
+            resposta['resposta'] = await self._jogar_ia(sessao, sessao.nivel, sessao.nos)
+            resposta.update(sessao.estado())
+        return resposta
+
+    async def _ia(self, sessao, pedido):
+        if sessao.jogo.game_over: raise ErroPedido("a partida já terminou")
+        nivel = pedido.get('nivel', sessao.nivel)
+        if nivel is not None and nivel not in TEMPO_POR_NIVEL: raise ErroPedido(f"nível inválido: {nivel!r}")
+        lance = await self._jogar_ia(sessao, nivel, _nos(pedido.get('nos', sessao.nos)))
+        return {'ok': True, 'lance': lance, **sessao.estado()}
+
+    async def _jogar_ia(self, sessao, nivel, nos):
+        # Busca no pool; o loop de eventos continua atendendo as outras sessões enquanto isso
+        inicio, jogo = time.perf_counter(), sessao.jogo
+        self.ia_pendentes += 1
+        try:
+            lance, tempo_busca = await asyncio.get_running_loop().run_in_executor(
+                self.pool, buscar_lance, jogo.gerar_fen(), dict(jogo.repeticoes), nivel, nos)
+        finally:
+            self.ia_pendentes -= 1
+        self._registrar(sessao, 'ia', inicio)
+        sessao.latencias.registrar('ia_busca', tempo_busca)
+        self.latencias.registrar('ia_busca', tempo_busca)
+        if lance is None: # Sem lances: verificar_fim_de_jogo marca mate ou afogamento
+            jogo.verificar_fim_de_jogo()
+            return None
+        return sessao.jogar(lance)
+
+    async def _estado(self, sessao, pedido):
+        return {'ok': True, **sessao.estado(), 'lances': list(sessao.lances)}
+
+    async def _legais(self, sessao, pedido):
+        jogo = sessao.jogo
+        lances = [] if jogo.game_over else [lance_para_uci(jogo, lance) for lance in jogo.lances_da_posicao()]
+        return {'ok': True, 'sessao': sessao.numero, 'legais': lances}
+
+    async def _metricas_sessao(self, sessao, pedido):
+        return {'ok': True, 'sessao': sessao.numero, 'lances': len(sessao.jogo.lances_partida),
+                'latencias': sessao.latencias.para_dict()}
+
+    async def _fechar(self, sessao, pedido):
+        self.sessoes.pop(sessao.numero, None)
+        return {'ok': True, 'sessao': sessao.numero}
+
+    def _registrar(self, sessao, nome, inicio):
+        tempo = time.perf_counter() - inicio
+        sessao.latencias.registrar(nome, tempo)
+        self.latencias.registrar(nome, tempo)
+
+    def metricas(self):
+        ativo = time.perf_counter() - self.inicio
+        return {'sessoes': len(self.sessoes), 'sessoes_criadas': self.sessoes_criadas, 'conexoes': self.conexoes,
+                'pedidos': self.pedidos, 'pedidos_por_s': self.pedidos / ativo if ativo else 0.0,
+                'ia_pendentes': self.ia_pendentes, 'ativo_s': ativo, 'latencias': self.latencias.para_dict()}
+
+    def relatorio(self):
+        # Resumo de uma linha por comando, para o terminal
+        dados = self.metricas()
+        linhas = [f"{dados['sessoes']} sessões, {dados['conexoes']} conexões, {dados['pedidos']} pedidos "
+                  f"({dados['pedidos_por_s']:.0f}/s), {dados['ia_pendentes']} buscas na fila"]
+        for comando, histograma in sorted(self.latencias.comandos.items()):
+            linhas.append(f"  {comando:16} {histograma.quantidade:>8}x  média {histograma.media() / 1e3:8.2f} ms  "
+                          f"p95 {histograma.percentil(0.95) / 1e3:8.2f} ms  máx {histograma.maximo / 1e3:8.2f} ms")
+        return '\n'.join(linhas)
+
+
+async def rodar_servidor(host, porta, processos, maximo_sessoes, intervalo_relatorio):
+    servidor = Servidor(processos, maximo_sessoes)
+    servidor_tcp = await servidor.iniciar(host, porta)
+    print(f"Servidor em {host}:{porta} ({servidor.processos} processos para a IA)", flush=True)
+    try:
+        async with servidor_tcp:
+            if not intervalo_relatorio:
+                await servidor_tcp.serve_forever()
+            while True:
+                await asyncio.sleep(intervalo_relatorio)
+                print(servidor.relatorio(), flush=True)
+    finally:
+        servidor.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de partidas (TCP, uma linha JSON por mensagem)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--processos', type=int, help="processos da IA (padrão: um por núcleo)")
+    parser.add_argument('--maximo-sessoes', type=int, default=MAXIMO_SESSOES)
+    parser.add_argument('--relatorio', type=float, default=0, help="segundos entre os resumos das métricas (0: nenhum)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(rodar_servidor(args.host, args.porta, args.processos, args.maximo_sessoes, args.relatorio))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,103 @@
+# transposicao.py
+#
+# Tabela de transposição de tamanho fixo para a busca da IA, indexada pela chave de
+# Zobrist da posição. A memória é alocada uma vez só (dois inteiros de 64 bits por
+# entrada) e nunca cresce: o limite é dado em megabytes.
+#
+# Política de substituição: as entradas ficam em baldes de 2. A primeira vaga guarda
+# a busca mais profunda e só é substituída por uma busca de profundidade maior ou
+# igual, ou quando a entrada é de uma busca antiga (outra "idade"). Caso contrário a
+# nova entrada vai para a segunda vaga, que é sempre sobrescrita.
+#
+# A tabela pode morar em memória compartilhada (multiprocessing.shared_memory) para os
+# processos da busca paralela (paralelo.py) usarem a mesma. Não há trava: cada vaga
+# guarda chave XOR dados, e a leitura só aceita a entrada se o XOR bater com a chave
+# procurada. Uma escrita pela metade vinda de outro processo simplesmente não bate e
+# vira uma consulta sem resultado.
+
+from multiprocessing import shared_memory
+
+EXATO, LIMITE_INFERIOR, LIMITE_SUPERIOR = 1, 2, 3
+BYTES_POR_ENTRADA = 16
+
+# Campos empacotados num inteiro de 64 bits:
+# pontuação (32 bits, deslocada) | profundidade (8) | tipo (2) | lance (13) | idade (6)
+_DESLOCAMENTO_PONTUACAO = 1 << 31
+
+
+def _empacotar(pontuacao, profundidade, tipo, lance, idade):
+    codigo_lance = 0
+    if lance is not None:
+        (l_orig, c_orig), (l_dest, c_dest) = lance
+        codigo_lance = 1 << 12 | (l_orig * 8 + c_orig) << 6 | (l_dest * 8 + c_dest)
+    return ((pontuacao + _DESLOCAMENTO_PONTUACAO) | min(profundidade, 255) << 32 | tipo << 40
+            | codigo_lance << 42 | (idade & 63) << 55)
+
+def _desempacotar_lance(dados):
+    codigo = dados >> 42 & 0x1FFF
+    if not codigo >> 12: return None
+    origem, destino = codigo >> 6 & 63, codigo & 63
+    return (divmod(origem, 8), divmod(destino, 8))
+
+
+class TabelaTransposicao:
+    def __init__(self, memoria_mb=16, compartilhada=False, nome=None):
+        # compartilhada=True cria a tabela em memória compartilhada; nome=... se liga a uma
+        # que outro processo criou (TabelaTransposicao.nome)
+        baldes = max(1, memoria_mb * 1024 * 1024 // (2 * BYTES_POR_ENTRADA))
+        baldes = 1 << (baldes.bit_length() - 1) # Potência de 2: o índice é só uma máscara
+        self._mascara = baldes - 1
+        self.entradas = 2 * baldes
+        self._memoria, self.nome = None, None
+        if compartilhada or nome is not None:
+            self._memoria = shared_memory.SharedMemory(name=nome, create=nome is None, size=BYTES_POR_ENTRADA * self.entradas)
+            self.nome, buffer = self._memoria.name, self._memoria.buf
+        else:
+            buffer = memoryview(bytearray(BYTES_POR_ENTRADA * self.entradas))
+        self._chaves = buffer[:8 * self.entradas].cast('Q')
+        self._dados = buffer[8 * self.entradas:BYTES_POR_ENTRADA * self.entradas].cast('Q')
+        self.idade = 0
+
+    def fechar(self, apagar=False):
+        # Só para tabelas compartilhadas: quem criou apaga (apagar=True) ao terminar
+        if self._memoria is None: return
+        self._chaves.release()
+        self._dados.release()
+        self._memoria.close()
+        if apagar: self._memoria.unlink()
+        self._memoria = None
+
+    def nova_busca(self):
+        # Entradas de buscas anteriores passam a ser as primeiras a sair
+        self.idade = (self.idade + 1) & 63
+
+    def limpar(self):
+        self._chaves[:] = self._dados[:] = memoryview(bytes(8 * self.entradas)).cast('Q')
+
+    def consultar(self, chave):
+        # Devolve (pontuacao, profundidade, tipo, lance) ou None
+        indice = (chave & self._mascara) * 2
+        for vaga in (indice, indice + 1):
+            dados = self._dados[vaga]
+            if dados and self._chaves[vaga] ^ dados == chave:
+                return ((dados & 0xFFFFFFFF) - _DESLOCAMENTO_PONTUACAO, dados >> 32 & 0xFF,
+                        dados >> 40 & 3, _desempacotar_lance(dados))
+        return None
+
+    def guardar(self, chave, pontuacao, profundidade, tipo, lance):
+        indice = (chave & self._mascara) * 2
+        dados_fundo = self._dados[indice]
+        # Primeira vaga: mesma posição, vazia, de outra busca, ou não mais profunda que a nova
+        if (self._chaves[indice] ^ dados_fundo == chave or not dados_fundo or (dados_fundo >> 55) != self.idade
+                or (dados_fundo >> 32 & 0xFF) <= profundidade):
+            vaga = indice
+        else:
+            vaga = indice + 1
+        dados = _empacotar(pontuacao, profundidade, tipo, lance, self.idade)
+        self._chaves[vaga] = chave ^ dados
+        self._dados[vaga] = dados
+
+    def ocupacao(self):
+        # Fração de entradas preenchidas pela busca atual (amostra de até 1000 entradas)
+        amostra = min(self.entradas, 1000)
+        return sum(1 for i in range(amostra) if self._dados[i] and (self._dados[i] >> 55) == self.idade) / amostra
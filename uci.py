@@ -0,0 +1,258 @@
+# uci.py
+#
+# Modo UCI: o motor conversa por stdin/stdout com interfaces e gerenciadores de torneio
+# (Arena, Cute Chess, python-chess, ...), sem janela. A posição é montada com o Jogo e
+# os lances passam pelo mesmo caminho de um clique (aplicar_lance -> _mover).
+#
+# A thread principal só lê comandos; a busca roda em outra thread. Assim "stop" e
+# "isready" são atendidos na hora, mesmo no meio de uma busca: "stop" chama Motor.parar()
+# e o "bestmove" sai assim que a busca volta com o melhor lance já encontrado.
+#
+# Comandos: uci, isready, ucinewgame, setoption (Hash, BookFile, TablebasePath),
+# position startpos|fen <FEN> [moves ...], go [depth N] [nodes N] [movetime ms]
+# [wtime ms btime ms winc ms binc ms movestogo N] [infinite], stop, quit.
+# Lances em notação longa: e2e4, e1g1 (roque), e7e8q. A promoção é sempre a dama; um
+# lance com outra peça de promoção é recusado, como no pgn.py.
+#
+# Uso:
+#   python uci.py      (é este o comando que a interface deve executar)
+
+import sys
+import threading
+
+from motor import MATE, MATE_MINIMO, MEMORIA_TT_MB, Motor
+from regras import FEN_INICIAL, Jogo
+from transposicao import TabelaTransposicao
+
+NOME = "Xadrez"
+AUTOR = "felipse"
+COLUNAS_UCI = 'abcdefgh'
+LANCES_ATE_O_FIM = 30 # Sem movestogo, o tempo restante é dividido como se faltassem tantos lances
+MARGEM_TEMPO = 0.1 # Segundos guardados para a resposta chegar antes de o relógio acabar
+MAXIMO_HASH_MB = 1024
+
+
+# --- LANCES ---
+def lance_para_uci(jogo, lance):
+    # Lance (origem, destino) da posição atual -> "e2e4" / "e7e8q"
+    (l_orig, c_orig), (l_dest, c_dest) = lance
+    texto = f"{COLUNAS_UCI[c_orig]}{8 - l_orig}{COLUNAS_UCI[c_dest]}{8 - l_dest}"
+    peca = jogo.tabuleiro[l_orig][c_orig]
+    return texto + 'q' if peca is not None and peca.nome == 'pawn' and l_dest in (0, 7) else texto
+
+def uci_para_lance(jogo, texto):
+    # "e2e4" -> lance (origem, destino) legal do lado a jogar; ValueError se não for
+    if len(texto) not in (4, 5) or texto[0] not in COLUNAS_UCI or texto[2] not in COLUNAS_UCI or not (texto[1] + texto[3]).isdigit():
+        raise ValueError(f"{texto}: lance inválido")
+    origem = (8 - int(texto[1]), COLUNAS_UCI.index(texto[0]))
+    destino = (8 - int(texto[3]), COLUNAS_UCI.index(texto[2]))
+    if not all(0 <= valor < 8 for valor in origem + destino): raise ValueError(f"{texto}: lance inválido")
+    if len(texto) == 5 and texto[4] != 'q': raise ValueError(f"{texto}: só existe promoção a dama neste jogo")
+    peca = jogo.tabuleiro[origem[0]][origem[1]]
+    if peca is None or peca.cor != jogo.turno or destino not in jogo.movimentos_da_casa(*origem):
+        raise ValueError(f"{texto}: lance ilegal nesta posição")
+    return origem, destino
+
+
+# --- TEMPO ---
+def tempo_do_lance(restante_ms, incremento_ms=0, lances_restantes=None):
+    # Segundos de busca para um lance, a partir do relógio do lado a jogar
+    restante, incremento = restante_ms / 1000, incremento_ms / 1000
+    tempo = restante / (lances_restantes or LANCES_ATE_O_FIM) + incremento * 0.75
+    return max(0.01, min(tempo, restante / 2 - MARGEM_TEMPO))
+
+def texto_pontuacao(pontuacao):
+    # Pontuação do motor -> "cp 35" ou "mate 3" / "mate -2" (em lances, não meios-lances)
+    if abs(pontuacao) < MATE_MINIMO: return f"cp {pontuacao}"
+    lances = (MATE - abs(pontuacao) + 1) // 2
+    return f"mate {lances if pontuacao > 0 else -lances}"
+
+
+# --- PROTOCOLO ---
+class ProtocoloUCI:
+    def __init__(self, saida=sys.stdout):
+        self.saida = saida
+        self._trava_saida = threading.Lock() # "info" vem da thread da busca; "readyok", da principal
+        self.memoria_tt_mb = MEMORIA_TT_MB
+        self.tabela = TabelaTransposicao(self.memoria_tt_mb)
+        self.livro_aberturas, self.tabelas_finais = None, None
+        self.jogo = self._novo_jogo()
+        self._motor, self._thread = None, None
+        self._parada = threading.Event() # "stop" recebido: libera o bestmove de um "go infinite"
+        self._nos_informados = 0
+
+    def _novo_jogo(self):
+        return Jogo(modo_ia=False, nivel_ia=None, livro_aberturas=self.livro_aberturas, tabelas_finais=self.tabelas_finais)
+
+    def enviar(self, texto):
+        with self._trava_saida:
+            self.saida.write(texto + '\n')
+            self.saida.flush()
+
+    def rodar(self, entrada=sys.stdin):
+        for linha in entrada:
+            if not self.executar(linha): break
+        self._parar_busca()
+
+    def executar(self, linha):
+        # Trata um comando; devolve False no "quit"
+        partes = linha.split()
+        if not partes: return True
+        comando, argumentos = partes[0], partes[1:]
+        if comando == 'quit': return False
+        if comando == 'uci':
+            self.enviar(f"id name {NOME}")
+            self.enviar(f"id author {AUTOR}")
+            self.enviar(f"option name Hash type spin default {MEMORIA_TT_MB} min 1 max {MAXIMO_HASH_MB}")
+            self.enviar("option name BookFile type string default <empty>")
+            self.enviar("option name TablebasePath type string default <empty>")
+            self.enviar("uciok")
+        elif comando == 'isready': self.enviar("readyok")
+        elif comando == 'ucinewgame':
+            self._parar_busca()
+            self.tabela.limpar()
+            self.jogo = self._novo_jogo()
+        elif comando == 'setoption': self._setoption(argumentos)
+        elif comando == 'position': self._position(argumentos)
+        elif comando == 'go': self._go(argumentos)
+        elif comando == 'stop': self._parar_busca()
+        elif comando == 'd': self.enviar(f"info string fen {self.jogo.gerar_fen()}") # Comando de depuração comum
+        elif comando not in ('debug', 'ponderhit', 'register'): self.enviar(f"info string comando desconhecido: {comando}")
+        return True
+
+    def _setoption(self, argumentos):
+        # setoption name <nome> [value <valor>]
+        texto = ' '.join(argumentos)
+        nome, _, valor = texto.partition(' value ')
+        nome, valor = nome.removeprefix('name ').strip().lower(), valor.strip()
+        self._parar_busca()
+        if nome == 'hash':
+            try:
+                self.memoria_tt_mb = max(1, min(int(valor), MAXIMO_HASH_MB))
+            except ValueError:
+                self.enviar(f"info string valor inválido para Hash: {valor}")
+                return
+            self.tabela = TabelaTransposicao(self.memoria_tt_mb)
+        elif nome in ('bookfile', 'tablebasepath'):
+            caminho = None if valor in ('', '<empty>') else valor
+            if nome == 'bookfile': self.livro_aberturas = caminho
+            else: self.tabelas_finais = caminho
+            self.jogo = self._novo_jogo() # A interface manda as opções antes do "position"
+        else:
+            self.enviar(f"info string opção desconhecida: {nome}")
+
+    def _position(self, argumentos):
+        # position startpos|fen <6 campos> [moves ...]; um lance ilegal para a leitura ali
+        self._parar_busca()
+        if 'moves' in argumentos:
+            indice = argumentos.index('moves')
+            argumentos, lances = argumentos[:indice], argumentos[indice + 1:]
+        else:
+            lances = []
+        if argumentos[:1] == ['fen']: fen = ' '.join(argumentos[1:])
+        elif argumentos[:1] == ['startpos']: fen = FEN_INICIAL
+        else:
+            self.enviar("info string position sem startpos nem fen")
+            return
+        try:
+            self.jogo.carregar_fen(fen)
+        except ValueError as erro:
+            self.enviar(f"info string FEN inválido: {erro}")
+            return
+        for texto in lances:
+            try:
+                lance = uci_para_lance(self.jogo, texto)
+            except ValueError as erro:
+                self.enviar(f"info string {erro}")
+                return
+            self.jogo.aplicar_lance(lance)
+            self.jogo.trocar_turno()
+
+    def _go(self, argumentos):
+        self._parar_busca()
+        opcoes, infinita, indice = {}, False, 0
+        while indice < len(argumentos):
+            chave = argumentos[indice]
+            if chave == 'infinite': infinita = True
+            elif chave in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo') and indice + 1 < len(argumentos):
+                try:
+                    opcoes[chave] = int(argumentos[indice + 1])
+                except ValueError:
+                    pass
+                indice += 1
+            indice += 1 # "ponder", "searchmoves" e "mate" são ignorados
+
+        relogio, incremento = ('wtime', 'winc') if self.jogo.turno == 'w' else ('btime', 'binc')
+        if infinita: tempo = None
+        elif 'movetime' in opcoes: tempo = max(opcoes['movetime'] / 1000 - MARGEM_TEMPO, 0.01)
+        elif relogio in opcoes: tempo = tempo_do_lance(opcoes[relogio], opcoes.get(incremento, 0), opcoes.get('movestogo'))
+        else: tempo = None # Só depth/nodes, ou "go" sozinho (busca até o "stop" ou a profundidade máxima)
+
+        if not infinita and 'depth' not in opcoes and 'nodes' not in opcoes:
+            # Livro e tabelas de finais respondem na hora; na análise ("infinite") não são usados
+            for origem, consultar in (("do livro", self.jogo.lance_do_livro), ("das tabelas de finais", self.jogo.lance_das_tabelas)):
+                lance = consultar()
+                if lance is not None:
+                    self.enviar(f"info string lance {origem}")
+                    self.enviar(f"bestmove {lance_para_uci(self.jogo, lance)}")
+                    return
+
+        motor = Motor(tempo_limite=tempo, nos_limite=opcoes.get('nodes'), profundidade_maxima=opcoes.get('depth', 64), tabela=self.tabela)
+        jogo = self.jogo.copiar() # A busca não mexe na posição do protocolo
+        motor.ao_iterar = lambda estatisticas: self._info(motor, jogo, estatisticas)
+        self._parada.clear()
+        self._nos_informados = 0
+        self._motor = motor
+        self._thread = threading.Thread(target=self._buscar, args=(motor, jogo, infinita), daemon=True)
+        self._thread.start()
+
+    def _buscar(self, motor, jogo, infinita):
+        # Thread da busca: sempre termina com um "bestmove", mesmo se a busca (ou o "info")
+        # falhar; aí vai o melhor lance já encontrado, ou um legal qualquer, ou "0000"
+        texto = '0000'
+        try:
+            lance = motor.buscar(jogo)
+            estatisticas = motor.estatisticas
+            if estatisticas['nos'] != self._nos_informados: # Interrompida no meio de uma iteração: totais finais
+                self.enviar(f"info nodes {estatisticas['nos']} nps {estatisticas['nps']} time {int(estatisticas['tempo'] * 1000)}")
+            if lance is not None: texto = lance_para_uci(jogo, lance)
+            if infinita: self._parada.wait() # Em "go infinite" o bestmove só pode sair depois do "stop"
+        except Exception as erro:
+            self.enviar(f"info string erro na busca: {erro!r}")
+            texto = self._lance_de_emergencia(motor)
+        finally:
+            self.enviar(f"bestmove {texto}")
+
+    def _lance_de_emergencia(self, motor):
+        # Busca que falhou: a cópia pode ter ficado no meio de um lance, então os lances são
+        # conferidos na posição do protocolo, que a busca não toca
+        try:
+            legais = self.jogo.lances_da_posicao()
+            lance = motor.melhor_lance if motor.melhor_lance in legais else (legais[0] if legais else None)
+            return lance_para_uci(self.jogo, lance) if lance is not None else '0000'
+        except Exception:
+            return '0000'
+
+    def _info(self, motor, jogo, estatisticas):
+        self._nos_informados = estatisticas['nos']
+        # Cada lance da variante é escrito na posição em que é jogado (a promoção depende da peça)
+        variante = []
+        for lance in motor.variante_principal(jogo):
+            variante.append(lance_para_uci(jogo, lance))
+            jogo.fazer_lance(*lance)
+        for _ in variante: jogo.desfazer_lance()
+        self.enviar(f"info depth {estatisticas['profundidade']} score {texto_pontuacao(estatisticas['pontuacao'])} "
+                    f"nodes {estatisticas['nos']} nps {estatisticas['nps']} time {int(estatisticas['tempo'] * 1000)} "
+                    f"hashfull {int(self.tabela.ocupacao() * 1000)} pv {' '.join(variante)}")
+
+    def _parar_busca(self):
+        # Para a busca em andamento (se houver) e espera o bestmove sair
+        if self._thread is None: return
+        self._parada.set()
+        self._motor.parar()
+        self._thread.join()
+        self._motor, self._thread = None, None
+
+
+if __name__ == "__main__":
+    ProtocoloUCI().rodar()
@@ -1,16 +1,25 @@
 # xadrez.py
+#
+# Interface gráfica (pygame). As regras ficam em regras.py; aqui só se desenha
+# e se trata o mouse. Nada é inicializado na importação: main() cuida disso.
 
 import pygame
 import os
-import copy
+import random
+import threading
+import traceback
+from collections import OrderedDict
+from functools import lru_cache
+
+from regras import LINHAS, COLUNAS, Jogo
 
 # --- CONFIGURAÇÕES INICIAIS ---
-pygame.init()
+# Tamanho da janela; a janela pode ser redimensionada (e F11 alterna a tela cheia), e
+# redimensionar() atualiza estes valores. O tabuleiro é o maior quadrado que cabe nela
 LARGURA, ALTURA = 800, 800
-LINHAS, COLUNAS = 8, 8
 TAMANHO_QUADRADO = LARGURA // COLUNAS
-TELA = pygame.display.set_mode((LARGURA, ALTURA))
-pygame.display.set_caption("Jogo de Xadrez")
+TAMANHO_MINIMO_QUADRADO = 16
+TAMANHOS_EM_CACHE = 3 # Tamanhos de casa com as peças já escaladas (o menos usado recentemente sai)
 
 # Cores e Fontes
 BRANCO_CASA = (238, 238, 210)
@@ -18,406 +27,250 @@ PRETO_CASA = (118, 150, 86)
 COR_DESTAQUE_SELECAO = (186, 202, 68)
 COR_DESTAQUE_VALIDO = (100, 100, 100, 100)
 COR_XEQUE = (255, 50, 50, 150)
-FONTE_STATUS = pygame.font.SysFont('Arial', 50, True)
+COR_MARGEM = (48, 46, 43) # Sobra da janela fora do tabuleiro
+ATRASO_MINIMO_IA_MS = 500 # A IA nunca joga antes disso, para o lance não parecer instantâneo
+TRABALHADORES_IA = 1 # Processos da busca da IA; > 1 usa a busca paralela (paralelo.py)
+LIVRO_ABERTURAS = "livro.bin" # Livro de aberturas da IA (livro.py); ignorado se o arquivo não existir
+TABELAS_FINAIS = "finais" # Diretório das tabelas de finais (finais.py); idem
+INSTRUMENTACAO = os.environ.get('XADREZ_INSTRUMENTACAO') # Arquivo (.json/.csv) das medidas de instrumentacao.py; sem ele, desligada
+INTERVALO_PAINEL_MS = 250 # O texto do painel da instrumentação é refeito no máximo a cada tanto
+
+# Preenchidos por inicializar_interface(), só quando a janela é aberta
+TELA = None
+FONTE_STATUS = None
+FONTE_AVISO = None
+FONTE_PAINEL = None
+IMAGENS = None # CacheSprites com as imagens originais das peças
+SPRITES = {} # Peças no tamanho de casa atual: SPRITES[cor][nome] -> Surface
+FUNDO = None # Tabuleiro vazio, desenhado uma vez por tamanho de casa
+TAMANHO_JANELA = (LARGURA, ALTURA) # Fora da tela cheia, para voltar a ele
+TELA_CHEIA = False
 
 
 # --- CARREGANDO IMAGENS ---
+class CacheSprites:
+    # As imagens são lidas uma vez só, no tamanho original; as versões escaladas são
+    # feitas na primeira vez que um tamanho de casa é pedido e ficam guardadas para os
+    # últimos `maximo` tamanhos usados. Redimensionar custa uma escala por tamanho novo
+    def __init__(self, originais, maximo=TAMANHOS_EM_CACHE):
+        self.originais, self.maximo = originais, maximo # originais[cor][nome] -> Surface
+        self._tamanhos = OrderedDict() # tamanho -> {cor: {nome: Surface}}, do menos ao mais usado
+
+    def sprites(self, tamanho):
+        if tamanho in self._tamanhos:
+            self._tamanhos.move_to_end(tamanho)
+            return self._tamanhos[tamanho]
+        escaladas = {cor: {nome: pygame.transform.smoothscale(imagem, (tamanho, tamanho)) for nome, imagem in imagens.items()}
+                     for cor, imagens in self.originais.items()}
+        self._tamanhos[tamanho] = escaladas
+        if len(self._tamanhos) > self.maximo: self._tamanhos.popitem(last=False)
+        return escaladas
+
 def carregar_imagens():
-    pecas_imgs = {}
-    nomes_pecas = ["w_pawn", "w_rook", "w_knight", "w_bishop", "w_queen", "w_king",
-                   "b_pawn", "b_rook", "b_knight", "b_bishop", "b_queen", "b_king"]
-    for nome_arquivo in nomes_pecas:
-        caminho = os.path.join("imagens", nome_arquivo + ".png")
-        imagem = pygame.image.load(caminho).convert_alpha()
-        pecas_imgs[nome_arquivo] = pygame.transform.scale(imagem, (TAMANHO_QUADRADO, TAMANHO_QUADRADO))
-    return pecas_imgs
-
-IMAGENS = carregar_imagens()
-
-
-# --- CLASSES DAS PEÇAS ---
-class Peca:
-    def __init__(self, linha, coluna, cor):
-        self.linha, self.coluna, self.cor = linha, coluna, cor
-        self.ja_moveu = False
-    def desenhar(self, tela): pass
-    def mover(self, linha, coluna):
-        self.linha, self.coluna, self.ja_moveu = linha, coluna, True
-    def get_movimentos_validos(self, tabuleiro): return [] # Assinatura voltou a ser simples
-
-# (As classes Peao, Torre, Cavalo, Bispo e Rainha são quase as mesmas, apenas a assinatura do método mudou)
-class Peao(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_pawn"
-        tela.blit(IMAGENS[img_key], (self.coluna * TAMANHO_QUADRADO, self.linha * TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        movimentos = []
-        direcao = -1 if self.cor == 'w' else 1
-        if 0 <= self.linha + direcao < 8 and tabuleiro[self.linha + direcao][self.coluna] is None:
-            movimentos.append((self.linha + direcao, self.coluna))
-            if not self.ja_moveu and tabuleiro[self.linha + 2 * direcao][self.coluna] is None:
-                movimentos.append((self.linha + 2 * direcao, self.coluna))
-        for d_coluna in [-1, 1]:
-            if 0 <= self.coluna + d_coluna < 8 and 0 <= self.linha + direcao < 8:
-                peca_diagonal = tabuleiro[self.linha + direcao][self.coluna + d_coluna]
-                if peca_diagonal is not None and peca_diagonal.cor != self.cor:
-                    movimentos.append((self.linha + direcao, self.coluna + d_coluna))
-        return movimentos
-
-class Torre(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_rook"; tela.blit(IMAGENS[img_key], (self.coluna * TAMANHO_QUADRADO, self.linha * TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        movimentos, direcoes = [], [(-1, 0), (1, 0), (0, -1), (0, 1)] 
-        for d_linha, d_coluna in direcoes:
-            for i in range(1, 8):
-                linha_final, coluna_final = self.linha + d_linha*i, self.coluna + d_coluna*i
-                if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
-                    peca_destino = tabuleiro[linha_final][coluna_final]
-                    if peca_destino is None: movimentos.append((linha_final, coluna_final))
-                    elif peca_destino.cor != self.cor: movimentos.append((linha_final, coluna_final)); break 
-                    else: break 
-                else: break
-        return movimentos
-
-class Cavalo(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_knight"; tela.blit(IMAGENS[img_key], (self.coluna*TAMANHO_QUADRADO, self.linha*TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        movimentos = []
-        movimentos_em_L = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
-        for d_linha, d_coluna in movimentos_em_L:
-            linha_final, coluna_final = self.linha + d_linha, self.coluna + d_coluna
-            if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
-                peca_destino = tabuleiro[linha_final][coluna_final]
-                if peca_destino is None or peca_destino.cor != self.cor:
-                    movimentos.append((linha_final, coluna_final))
-        return movimentos
-
-class Bispo(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_bishop"; tela.blit(IMAGENS[img_key], (self.coluna * TAMANHO_QUADRADO, self.linha * TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        movimentos, direcoes = [], [(-1, -1), (-1, 1), (1, -1), (1, 1)] 
-        for d_linha, d_coluna in direcoes:
-            for i in range(1, 8):
-                linha_final, coluna_final = self.linha + d_linha*i, self.coluna + d_coluna*i
-                if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
-                    peca_destino = tabuleiro[linha_final][coluna_final]
-                    if peca_destino is None: movimentos.append((linha_final, coluna_final))
-                    elif peca_destino.cor != self.cor: movimentos.append((linha_final, coluna_final)); break 
-                    else: break 
-                else: break
-        return movimentos
-
-class Rainha(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_queen"; tela.blit(IMAGENS[img_key], (self.coluna * TAMANHO_QUADRADO, self.linha * TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        # Reutiliza a lógica da Torre e do Bispo
-        movimentos = Torre.get_movimentos_validos(self, tabuleiro)
-        movimentos.extend(Bispo.get_movimentos_validos(self, tabuleiro))
-        return movimentos
-
-class Rei(Peca):
-    def desenhar(self, tela):
-        img_key = f"{self.cor[0]}_king"; tela.blit(IMAGENS[img_key], (self.coluna*TAMANHO_QUADRADO, self.linha*TAMANHO_QUADRADO))
-    def get_movimentos_validos(self, tabuleiro):
-        movimentos = []
-        direcoes = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        for d_linha, d_coluna in direcoes:
-            linha_final, coluna_final = self.linha + d_linha, self.coluna + d_coluna
-            if 0 <= linha_final < 8 and 0 <= coluna_final < 8:
-                peca_destino = tabuleiro[linha_final][coluna_final]
-                if peca_destino is None or peca_destino.cor != self.cor:
-                    movimentos.append((linha_final, coluna_final))
-        return movimentos
-
-
-# --- CLASSE PRINCIPAL DO JOGO ---
-class Jogo:
-    def __init__(self, modo_ia=True, cor_ia='b'): # Adicionado modo_ia e cor_ia
-        self.tabuleiro, self.peca_selecionada, self.turno, self.movimentos_validos = [], None, 'w', []
-        self.pos_rei_w, self.pos_rei_b = (7, 4), (0, 4)
-        self.game_over, self.status_texto = False, ""
-        self.modo_ia = modo_ia
-        self.cor_ia = cor_ia
-        self.criar_tabuleiro()
-
-    def criar_tabuleiro(self):
-        # (Não muda)
-        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
-        self.tabuleiro[0] = [Torre(0,0,'b'), Cavalo(0,1,'b'), Bispo(0,2,'b'), Rainha(0,3,'b'), Rei(0,4,'b'), Bispo(0,5,'b'), Cavalo(0,6,'b'), Torre(0,7,'b')]
-        self.tabuleiro[1] = [Peao(1, i, 'b') for i in range(8)]
-        self.tabuleiro[6] = [Peao(6, i, 'w') for i in range(8)]
-        self.tabuleiro[7] = [Torre(7,0,'w'), Cavalo(7,1,'w'), Bispo(7,2,'w'), Rainha(7,3,'w'), Rei(7,4,'w'), Bispo(7,5,'w'), Cavalo(7,6,'w'), Torre(7,7,'w')]
-
-    def desenhar_tudo(self, tela):
-        # (Não muda)
-        for r in range(LINHAS):
-            for c in range(COLUNAS):
-                cor = BRANCO_CASA if (r+c)%2==0 else PRETO_CASA
-                pygame.draw.rect(tela, cor, (c*TAMANHO_QUADRADO, r*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
-        if self.is_in_check(self.turno):
-            pos_rei = self.pos_rei_w if self.turno == 'w' else self.pos_rei_b
-            r, c = pos_rei
-            pygame.draw.rect(tela, COR_XEQUE, (c*TAMANHO_QUADRADO, r*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
-        if self.peca_selecionada:
-            r, c = self.peca_selecionada.linha, self.peca_selecionada.coluna
-            pygame.draw.rect(tela, COR_DESTAQUE_SELECAO, (c*TAMANHO_QUADRADO, r*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
-            self.desenhar_movimentos_validos(tela)
-        for r in range(LINHAS):
-            for c in range(COLUNAS):
-                peca = self.tabuleiro[r][c]
-                if peca is not None: peca.desenhar(tela)
-        if self.game_over:
-            texto_surface = FONTE_STATUS.render(self.status_texto, True, pygame.Color('black'))
-            pos_x, pos_y = LARGURA//2 - texto_surface.get_width()//2, ALTURA//2 - texto_surface.get_height()//2
-            pygame.draw.rect(TELA, pygame.Color('gray'), (pos_x-10, pos_y-10, texto_surface.get_width()+20, texto_surface.get_height()+20))
-            TELA.blit(texto_surface, (pos_x, pos_y))
-    
-    def desenhar_movimentos_validos(self, tela):
-        for movimento in self.movimentos_validos:
-            pygame.draw.circle(tela, COR_DESTAQUE_VALIDO, (movimento[1]*TAMANHO_QUADRADO+TAMANHO_QUADRADO//2, movimento[0]*TAMANHO_QUADRADO+TAMANHO_QUADRADO//2), 15)
-            
-    def selecionar(self, linha, coluna):
-        if self.peca_selecionada:
-            if self._mover(linha, coluna): self.trocar_turno()
-            self.peca_selecionada, self.movimentos_validos = None, []
-        else:
-            peca = self.tabuleiro[linha][coluna]
-            if peca is not None and peca.cor == self.turno:
-                self.peca_selecionada = peca
-                movimentos = peca.get_movimentos_validos(self.tabuleiro)
-                # LÓGICA ATUALIZADA: Roque é adicionado aqui
-                if isinstance(peca, Rei):
-                    movimentos.extend(self._get_movimentos_roque(peca))
-                self.movimentos_validos = self._filtrar_movimentos_ilegais(peca, movimentos)
-                return True
-        return False
-        
-    def _mover(self, linha, coluna):
-        if self.peca_selecionada and (linha, coluna) in self.movimentos_validos:
-            peca_movida, pos_orig_c = self.peca_selecionada, self.peca_selecionada.coluna
-            # LÓGICA DO ROQUE ATUALIZADA
-            if isinstance(peca_movida, Rei) and abs(coluna - pos_orig_c) == 2:
-                torre_col_orig = 7 if coluna > pos_orig_c else 0
-                torre_col_final = 5 if coluna > pos_orig_c else 3
-                torre = self.tabuleiro[linha][torre_col_orig]
-                self.tabuleiro[linha][torre_col_final] = torre
-                self.tabuleiro[linha][torre_col_orig] = None
-                torre.mover(linha, torre_col_final)
-            # (Resto do _mover não muda)
-            pos_orig_l = peca_movida.linha
-            if isinstance(peca_movida, Rei):
-                if peca_movida.cor == 'w': self.pos_rei_w = (linha, coluna)
-                else: self.pos_rei_b = (linha, coluna)
-            self.tabuleiro[linha][coluna], self.tabuleiro[pos_orig_l][pos_orig_c] = peca_movida, None
-            peca_movida.mover(linha, coluna)
-            if isinstance(peca_movida, Peao):
-                if (peca_movida.cor == 'w' and linha == 0) or (peca_movida.cor == 'b' and linha == 7):
-                    self.tabuleiro[linha][coluna] = Rainha(linha, coluna, peca_movida.cor)
-            return True
-        return False
-
-    def trocar_turno(self):
-        self.turno = 'b' if self.turno == 'w' else 'w'; self.verificar_fim_de_jogo()
-
-    def verificar_fim_de_jogo(self):
-        # (Não muda)
-        if len(self._get_todos_movimentos_legais(self.turno)) == 0:
-            self.game_over = True
-            if self.is_in_check(self.turno):
-                vencedor = "Brancas" if self.turno == 'b' else "Pretas"
-                self.status_texto = f"Xeque-mate! {vencedor} vencem."
-            else: self.status_texto = "Empate por Afogamento!"
-
-    def _get_todos_movimentos_legais(self, cor):
-        todos_os_movimentos = []
-        for r in range(LINHAS):
-            for c in range(COLUNAS):
-                peca = self.tabuleiro[r][c]
-                if peca is not None and peca.cor == cor:
-                    movimentos = peca.get_movimentos_validos(self.tabuleiro)
-                    if isinstance(peca, Rei):
-                        movimentos.extend(self._get_movimentos_roque(peca))
-                    movimentos_legais = self._filtrar_movimentos_ilegais(peca, movimentos)
-                    todos_os_movimentos.extend(movimentos_legais)
-        return todos_os_movimentos
-    
-    # --- NOVO MÉTODO PARA O ROQUE ---
-    def _get_movimentos_roque(self, rei):
-        movimentos = []
-        if rei.ja_moveu or self.is_in_check(rei.cor):
-            return movimentos # Não pode fazer roque se o rei já moveu ou está em xeque
-        
-        cor_oponente = 'b' if rei.cor == 'w' else 'w'
-        # Roque pequeno (lado do Rei)
-        torre_pequeno = self.tabuleiro[rei.linha][7]
-        if torre_pequeno is not None and not torre_pequeno.ja_moveu:
-            if self.tabuleiro[rei.linha][5] is None and self.tabuleiro[rei.linha][6] is None:
-                if not self.is_square_under_attack(rei.linha, 5, cor_oponente) and \
-                   not self.is_square_under_attack(rei.linha, 6, cor_oponente):
-                    movimentos.append((rei.linha, 6))
-        # Roque grande (lado da Rainha)
-        torre_grande = self.tabuleiro[rei.linha][0]
-        if torre_grande is not None and not torre_grande.ja_moveu:
-            if self.tabuleiro[rei.linha][1] is None and self.tabuleiro[rei.linha][2] is None and self.tabuleiro[rei.linha][3] is None:
-                if not self.is_square_under_attack(rei.linha, 2, cor_oponente) and \
-                   not self.is_square_under_attack(rei.linha, 3, cor_oponente):
-                    movimentos.append((rei.linha, 2))
-        return movimentos
-
-    def _filtrar_movimentos_ilegais(self, peca, movimentos):
-        movimentos_legais = []
-        for movimento in movimentos:
-            tabuleiro_temp = copy.deepcopy(self.tabuleiro)
-            peca_temp_movida = tabuleiro_temp[peca.linha][peca.coluna]
-            l_final, c_final = movimento
-            # Lógica especial para o roque na cópia
-            if isinstance(peca_temp_movida, Rei) and abs(c_final - peca.coluna) == 2:
-                torre_col = 7 if c_final > peca.coluna else 0
-                torre_col_f = 5 if c_final > peca.coluna else 3
-                torre = tabuleiro_temp[peca.linha][torre_col]
-                tabuleiro_temp[peca.linha][torre_col_f] = torre
-                tabuleiro_temp[peca.linha][torre_col] = None
-
-            tabuleiro_temp[l_final][c_final] = peca_temp_movida
-            tabuleiro_temp[peca.linha][peca.coluna] = None
-            pos_rei_temp = self.pos_rei_w if peca.cor == 'w' else self.pos_rei_b
-            if isinstance(peca, Rei): pos_rei_temp = (l_final, c_final)
-            cor_oponente = 'b' if peca.cor == 'w' else 'w'
-            if not self.is_square_under_attack(pos_rei_temp[0], pos_rei_temp[1], cor_oponente, tabuleiro_temp):
-                movimentos_legais.append(movimento)
-        return movimentos_legais
-    
-    def is_square_under_attack(self, linha, coluna, cor_atacante, tabuleiro_arg=None):
-        tabuleiro_a_verificar = tabuleiro_arg if tabuleiro_arg is not None else self.tabuleiro
-        for r in range(LINHAS):
-            for c in range(COLUNAS):
-                peca = tabuleiro_a_verificar[r][c]
-                if peca is not None and peca.cor == cor_atacante:
-                    movimentos = peca.get_movimentos_validos(tabuleiro_a_verificar)
-                    # No caso do peão, o ataque é diferente do movimento
-                    if isinstance(peca, Peao):
-                        direcao = -1 if peca.cor == 'w' else 1
-                        if (linha, coluna) in [(peca.linha+direcao, c-1), (peca.linha+direcao, c+1)]:
-                            return True
-                    elif (linha, coluna) in movimentos:
-                        return True
-        return False
-
-    def is_in_check(self, cor):
-        pos_rei = self.pos_rei_w if cor == 'w' else self.pos_rei_b
-        return self.is_square_under_attack(pos_rei[0], pos_rei[1], 'b' if cor == 'w' else 'w')
-
-    def fazer_movimento_ia(self):
-        if self.game_over or self.turno != self.cor_ia:
-            return
-
-        import random
-        todos_movimentos_possiveis = []
-        pecas_ia = []
-
-        # Coleta todas as peças da IA
+    pecas_imgs = {'w': {}, 'b': {}}
+    for cor in pecas_imgs:
+        for nome in ('pawn', 'rook', 'knight', 'bishop', 'queen', 'king'):
+            caminho = os.path.join("imagens", f"{cor}_{nome}.png")
+            pecas_imgs[cor][nome] = pygame.image.load(caminho).convert_alpha()
+    return CacheSprites(pecas_imgs)
+
+def inicializar_interface():
+    global TELA, FONTE_STATUS, FONTE_AVISO, FONTE_PAINEL, IMAGENS
+    pygame.init()
+    TELA = pygame.display.set_mode((LARGURA, ALTURA), pygame.RESIZABLE)
+    pygame.display.set_caption("Jogo de Xadrez")
+    FONTE_STATUS = pygame.font.SysFont('Arial', 50, True)
+    FONTE_AVISO = pygame.font.SysFont('Arial', 24, True)
+    FONTE_PAINEL = pygame.font.SysFont('Arial', 14)
+    IMAGENS = carregar_imagens() # convert_alpha() exige a janela já criada
+    redimensionar(LARGURA, ALTURA)
+
+def redimensionar(largura, altura, tela_cheia=False):
+    # Nova janela (ou tela cheia): recalcula o tamanho das casas, pega as peças desse
+    # tamanho no cache e refaz o fundo. Quem chama deve invalidar o desenho do jogo
+    global TELA, LARGURA, ALTURA, TAMANHO_QUADRADO, SPRITES, TAMANHO_JANELA, TELA_CHEIA
+    TELA_CHEIA = tela_cheia
+    if tela_cheia: TELA = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        TELA = pygame.display.set_mode((largura, altura), pygame.RESIZABLE)
+        TAMANHO_JANELA = (largura, altura)
+    LARGURA, ALTURA = TELA.get_size()
+    TAMANHO_QUADRADO = max(min(LARGURA // COLUNAS, ALTURA // LINHAS), TAMANHO_MINIMO_QUADRADO)
+    SPRITES = IMAGENS.sprites(TAMANHO_QUADRADO)
+    caixa_texto.cache_clear() # As caixas centralizadas dependem do tamanho da janela
+    criar_fundo()
+    TELA.fill(COR_MARGEM)
+
+def tratar_eventos_janela(eventos):
+    # Redimensionamento (só o último de uma rajada, ao arrastar a borda) e F11 (tela cheia).
+    # Devolve True se a janela mudou: aí o jogo precisa redesenhar tudo
+    novo_tamanho, alternar = None, False
+    for evento in eventos:
+        if evento.type == pygame.VIDEORESIZE and not TELA_CHEIA: novo_tamanho = (evento.w, evento.h)
+        if evento.type == pygame.KEYDOWN and evento.key == pygame.K_F11: alternar = not alternar
+    if alternar:
+        redimensionar(*TAMANHO_JANELA, tela_cheia=not TELA_CHEIA)
+        pygame.event.clear(pygame.VIDEORESIZE) # Os que a própria troca de modo gerou, com o tamanho antigo
+    elif novo_tamanho is not None and novo_tamanho != (LARGURA, ALTURA): redimensionar(*novo_tamanho)
+    else: return False
+    return True
+
+def criar_fundo():
+    global FUNDO
+    FUNDO = pygame.Surface((TAMANHO_QUADRADO * COLUNAS, TAMANHO_QUADRADO * LINHAS)).convert()
+    for r in range(LINHAS):
+        for c in range(COLUNAS):
+            cor = BRANCO_CASA if (r+c)%2==0 else PRETO_CASA
+            FUNDO.fill(cor, (c*TAMANHO_QUADRADO, r*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
+
+
+# --- DESENHO ---
+# O desenho é incremental: JogoGrafico lembra o que está na tela em cada casa e só
+# redesenha as casas que mudaram, devolvendo os retângulos para pygame.display.update.
+def desenhar_peca(tela, peca):
+    tela.blit(SPRITES[peca.cor][peca.nome], (peca.coluna * TAMANHO_QUADRADO, peca.linha * TAMANHO_QUADRADO))
+
+@lru_cache(maxsize=32)
+def caixa_texto(fonte, texto, cor_texto, cor_fundo, margem_x, margem_y, posicao=None):
+    # Texto com fundo, já renderizado: (superfície, retângulo). Sem `posicao`, fica no centro do tabuleiro.
+    # O cache faz o mesmo texto devolver o mesmo objeto, e é assim que se sabe que ele não mudou
+    texto_surface = fonte.render(texto, True, pygame.Color(cor_texto))
+    caixa = pygame.Surface((texto_surface.get_width() + 2*margem_x, texto_surface.get_height() + 2*margem_y))
+    caixa.fill(pygame.Color(cor_fundo))
+    caixa.blit(texto_surface, (margem_x, margem_y))
+    centro = (COLUNAS * TAMANHO_QUADRADO // 2, LINHAS * TAMANHO_QUADRADO // 2)
+    retangulo = caixa.get_rect(topleft=posicao) if posicao else caixa.get_rect(center=centro)
+    return caixa, retangulo
+
+class JogoGrafico(Jogo):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._xeque = (None, False) # ((chave, turno), em xeque?): calculado uma vez por posição
+        self.invalidar_desenho()
+
+    def invalidar_desenho(self):
+        # Força o próximo desenhar_tudo a redesenhar a tela inteira (ex.: janela descoberta)
+        self._casas_desenhadas = [None] * (LINHAS * COLUNAS) # O que está na tela em cada casa
+        self._avisos_desenhados = []
+
+    def copiar(self):
+        # A cópia é só para a IA pensar: não leva o estado do desenho (superfícies do pygame)
+        copia = super().copiar()
+        copia.invalidar_desenho()
+        return copia
+
+    def rei_em_xeque(self):
+        posicao = (self.chave_zobrist, self.turno)
+        if self._xeque[0] != posicao: self._xeque = (posicao, self.is_in_check(self.turno))
+        return self._xeque[1]
+
+    def desenhar_tudo(self, tela, avisos=()):
+        # Devolve a lista de retângulos alterados (vazia se nada mudou). `avisos` são
+        # caixas de caixa_texto desenhadas por cima do tabuleiro
+        avisos, sujos = list(avisos), []
+        if self.game_over: avisos.append(caixa_texto(FONTE_STATUS, self.status_texto, 'black', 'gray', 10, 10))
+        for aviso in self._avisos_desenhados: # Aviso que sumiu ou mudou: redesenha as casas embaixo dele
+            if aviso not in avisos:
+                if not FUNDO.get_rect().contains(aviso[1]): # Passava do tabuleiro: limpa a margem também
+                    tela.fill(COR_MARGEM, aviso[1])
+                    sujos.append(aviso[1])
+                self._invalidar_casas(aviso[1])
+
+        rei = (self.pos_rei_w if self.turno == 'w' else self.pos_rei_b) if self.rei_em_xeque() else None
+        selecionada = (self.peca_selecionada.linha, self.peca_selecionada.coluna) if self.peca_selecionada else None
+        destinos = set(self.movimentos_validos) if selecionada else ()
         for r in range(LINHAS):
             for c in range(COLUNAS):
                 peca = self.tabuleiro[r][c]
-                if peca is not None and peca.cor == self.cor_ia:
-                    pecas_ia.append(peca)
-
-        random.shuffle(pecas_ia) # Embaralha as peças para adicionar mais aleatoriedade
-
-        for peca in pecas_ia:
-            movimentos_brutos = peca.get_movimentos_validos(self.tabuleiro)
-            # Adiciona movimentos de roque se a peça for um Rei
-            if isinstance(peca, Rei):
-                movimentos_brutos.extend(self._get_movimentos_roque(peca))
-
-            movimentos_legais_peca = self._filtrar_movimentos_ilegais(peca, movimentos_brutos)
-
-            if movimentos_legais_peca:
-                # Prioriza capturas ou movimentos que resultem em xeque
-                for mov in movimentos_legais_peca:
-                    # Simula o movimento para verificar se é uma captura ou xeque
-                    tabuleiro_temp = copy.deepcopy(self.tabuleiro)
-                    peca_original_temp = tabuleiro_temp[peca.linha][peca.coluna]
-
-                    # Lógica de captura
-                    peca_capturada = tabuleiro_temp[mov[0]][mov[1]]
-
-                    # Simula o movimento no tabuleiro temporário
-                    tabuleiro_temp[mov[0]][mov[1]] = peca_original_temp
-                    tabuleiro_temp[peca.linha][peca.coluna] = None
-
-                    # Verifica se o movimento resulta em xeque no oponente
-                    cor_oponente = 'w' if self.cor_ia == 'b' else 'b'
-                    pos_rei_oponente_original = self.pos_rei_w if cor_oponente == 'w' else self.pos_rei_b
-
-                    # Atualiza a posição do rei se ele for movido pela IA (não deveria acontecer aqui, mas por segurança)
-                    pos_rei_ia_temp = self.pos_rei_b if self.cor_ia == 'b' else self.pos_rei_w
-                    if isinstance(peca_original_temp, Rei):
-                        pos_rei_ia_temp = (mov[0], mov[1])
-
-                    # Verifica xeque no oponente
-                    xeque_no_oponente = self.is_square_under_attack(pos_rei_oponente_original[0], pos_rei_oponente_original[1], self.cor_ia, tabuleiro_temp)
-
-                    if peca_capturada is not None or xeque_no_oponente:
-                        # Movimento prioritário encontrado
-                        self.peca_selecionada = peca
-                        self.movimentos_validos = [mov] # Apenas este movimento é considerado
-                        if self._mover(mov[0], mov[1]):
-                            return # Movimento feito
-                        # Se _mover falhar por alguma razão (não deveria), continua procurando
-
-                # Se nenhum movimento prioritário foi feito, adiciona todos os legais da peça
-                for mov in movimentos_legais_peca:
-                    todos_movimentos_possiveis.append({'peca': peca, 'movimento': mov})
-
-        if not todos_movimentos_possiveis:
-            # Se não houver movimentos legais (xeque-mate ou afogamento pela IA, improvável com lógica simples)
-            self.verificar_fim_de_jogo() # Apenas para garantir que o estado do jogo seja atualizado
-            return
-
-        # Escolhe um movimento aleatório entre os coletados (que não são capturas/xeques prioritários)
-        escolha = random.choice(todos_movimentos_possiveis)
-        self.peca_selecionada = escolha['peca']
-        self.movimentos_validos = [escolha['movimento']] # Define como o único movimento válido para _mover
-
-        if self._mover(escolha['movimento'][0], escolha['movimento'][1]):
-            pass # Movimento realizado com sucesso
-        else:
-            # Isso não deveria acontecer se a lógica de movimentos legais estiver correta
-            print(f"IA tentou um movimento ilegal: {escolha['peca'].__class__.__name__} de ({escolha['peca'].linha},{escolha['peca'].coluna}) para {escolha['movimento']}")
-            # Como fallback, tenta um movimento completamente aleatório se o anterior falhar
-            # (Esta parte pode ser removida se a confiança na geração de movimentos for alta)
-            if self._get_todos_movimentos_legais(self.cor_ia): # Verifica se ainda há algum movimento
-                movimento_aleatorio_fallback = random.choice(self._get_todos_movimentos_legais(self.cor_ia))
-
-                # Encontrar a peça correspondente ao movimento aleatório
-                peca_para_fallback = None
-                for r_idx, r_val in enumerate(self.tabuleiro):
-                    for c_idx, p_val in enumerate(r_val):
-                        if p_val and p_val.cor == self.cor_ia:
-                            # Verifica se algum dos movimentos legais desta peça é o movimento_aleatorio_fallback
-                            movs_peca_fallback = self._filtrar_movimentos_ilegais(p_val, p_val.get_movimentos_validos(self.tabuleiro))
-                            if isinstance(p_val, Rei): # Adiciona roque para o rei
-                                movs_peca_fallback.extend(self._filtrar_movimentos_ilegais(p_val, self._get_movimentos_roque(p_val)))
-
-                            if movimento_aleatorio_fallback in movs_peca_fallback:
-                                peca_para_fallback = p_val
-                                break
-                    if peca_para_fallback:
-                        break
-
-                if peca_para_fallback:
-                    self.peca_selecionada = peca_para_fallback
-                    self.movimentos_validos = [movimento_aleatorio_fallback]
-                    self._mover(movimento_aleatorio_fallback[0], movimento_aleatorio_fallback[1])
+                # Só valores simples no estado; a imagem é buscada em SPRITES ao desenhar a casa
+                estado = (peca and (peca.cor, peca.nome), (r, c) == rei, (r, c) == selecionada, (r, c) in destinos)
+                if self._casas_desenhadas[r*COLUNAS + c] != estado:
+                    self._casas_desenhadas[r*COLUNAS + c] = estado
+                    sujos.append(self._desenhar_casa(tela, r, c, peca, estado))
+
+        for aviso in avisos:
+            superficie, retangulo = aviso
+            if aviso not in self._avisos_desenhados or retangulo.collidelist(sujos) != -1:
+                tela.blit(superficie, retangulo)
+                sujos.append(retangulo)
+        self._avisos_desenhados = avisos
+        return sujos
+
+    def _invalidar_casas(self, retangulo):
+        for r in range(max(retangulo.top // TAMANHO_QUADRADO, 0), min((retangulo.bottom - 1) // TAMANHO_QUADRADO, LINHAS - 1) + 1):
+            for c in range(max(retangulo.left // TAMANHO_QUADRADO, 0), min((retangulo.right - 1) // TAMANHO_QUADRADO, COLUNAS - 1) + 1):
+                self._casas_desenhadas[r*COLUNAS + c] = None
+
+    def _desenhar_casa(self, tela, r, c, peca, estado):
+        _, xeque, selecionada, destino = estado
+        casa = pygame.Rect(c*TAMANHO_QUADRADO, r*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO)
+        tela.blit(FUNDO, casa, casa)
+        if xeque: pygame.draw.rect(tela, COR_XEQUE, casa)
+        if selecionada: pygame.draw.rect(tela, COR_DESTAQUE_SELECAO, casa)
+        if destino: pygame.draw.circle(tela, COR_DESTAQUE_VALIDO, casa.center, max(TAMANHO_QUADRADO * 15 // 100, 3))
+        if peca is not None: desenhar_peca(tela, peca)
+        return casa
+
+
+def aviso_pensando():
+    pontos = "." * (pygame.time.get_ticks() // 400 % 3 + 1)
+    return caixa_texto(FONTE_AVISO, f"IA pensando{pontos}", 'white', 'black', 5, 3, (5, 5))
+
+
+def avisos_painel(linhas):
+    # Painel da instrumentação: uma caixa por linha, empilhadas até o canto de baixo
+    altura = FONTE_PAINEL.get_height() + 2
+    topo = ALTURA - altura * len(linhas)
+    return [caixa_texto(FONTE_PAINEL, linha, 'white', 'black', 4, 1, (0, topo + i * altura)) for i, linha in enumerate(linhas)]
+
+
+# --- IA EM SEGUNDO PLANO ---
+class PensamentoIA:
+    # Roda a busca da IA numa thread, sobre uma cópia da posição, enquanto o loop
+    # principal continua tratando eventos e desenhando. O lance só é aplicado ao
+    # jogo (no loop principal) depois que a busca termina.
+    def __init__(self, jogo):
+        self.jogo, self.copia = jogo, jogo.copiar()
+        # O motor vem do jogo original, para a tabela da IA (e o pool de processos) durarem entre lances
+        self.motor = jogo.criar_motor_ia() if jogo.nivel_ia is not None else None
+        self.inicio, self.lance, self.erro = pygame.time.get_ticks(), None, None
+        self._terminou = threading.Event()
+        self._thread = threading.Thread(target=self._pensar, daemon=True)
+        self._thread.start()
+
+    def _pensar(self):
+        # Termina sempre, mesmo se a busca falhar (livro, tabelas de finais, processos...):
+        # o erro fica em self.erro e a IA joga um lance legal qualquer, para a partida seguir
+        try:
+            self.lance = self.copia.escolher_lance_ia(self.motor)
+        except Exception as erro:
+            traceback.print_exc()
+            self.erro = erro
+            while self.copia.historico: self.copia.desfazer_lance() # A cópia começa sem histórico
+            self.copia.estatisticas_ia = {}
+            lances = self.copia.lances_da_posicao(self.copia.cor_ia)
+            self.lance = random.choice(lances) if lances else None
+        finally:
+            self._terminou.set()
+
+    def pronto(self):
+        return self._terminou.is_set() and pygame.time.get_ticks() - self.inicio >= ATRASO_MINIMO_IA_MS
+
+    def aplicar(self):
+        self.jogo.estatisticas_ia = self.copia.estatisticas_ia
+        if self.lance is None: # Sem lances: mate ou afogamento
+            self.jogo.verificar_fim_de_jogo()
+        elif self.jogo.aplicar_lance(self.lance) and not self.jogo.game_over:
+            self.jogo.trocar_turno()
+
+    def cancelar(self):
+        # Janela fechada ou jogo novo: interrompe a busca e descarta o resultado
+        if self.motor is not None: self.motor.parar()
+        self._thread.join(timeout=1.0)
 
 
 # --- TELA INICIAL ---
-def tela_inicial(tela):
+def tela_inicial():
     fonte_titulo = pygame.font.SysFont('Arial', 60, True)
     fonte_botao = pygame.font.SysFont('Arial', 40)
 
@@ -431,16 +284,19 @@ def tela_inicial(tela):
     largura_botao_jvia = jvia_texto.get_width() + 2 * padding_botao
     altura_botao_jvia = jvia_texto.get_height() + 2 * padding_botao
 
-    botao_jvj_rect = pygame.Rect(LARGURA//2 - largura_botao_jvj//2, ALTURA//2 - altura_botao_jvj - 10, largura_botao_jvj, altura_botao_jvj)
-    botao_jvia_rect = pygame.Rect(LARGURA//2 - largura_botao_jvia//2, ALTURA//2 + 10, largura_botao_jvia, altura_botao_jvia)
-
     cor_botao_normal = pygame.Color('lightgray')
     cor_botao_hover = pygame.Color('darkgray')
 
     rodando_tela_inicial = True
     while rodando_tela_inicial:
         mouse_pos = pygame.mouse.get_pos()
-        for evento in pygame.event.get():
+        eventos = pygame.event.get()
+        tratar_eventos_janela(eventos)
+        # Recalculados a cada quadro: a janela pode ter mudado de tamanho
+        tela = TELA
+        botao_jvj_rect = pygame.Rect(LARGURA//2 - largura_botao_jvj//2, ALTURA//2 - altura_botao_jvj - 10, largura_botao_jvj, altura_botao_jvj)
+        botao_jvia_rect = pygame.Rect(LARGURA//2 - largura_botao_jvia//2, ALTURA//2 + 10, largura_botao_jvia, altura_botao_jvia)
+        for evento in eventos:
             if evento.type == pygame.QUIT:
                 pygame.quit()
                 exit()
@@ -470,39 +326,84 @@ def tela_inicial(tela):
 
 # --- LOOP PRINCIPAL ---
 def main():
-    pygame.display.set_caption("Jogo de Xadrez") # Movido para cá para que a tela inicial também tenha
-
-    modo_ia_selecionado = tela_inicial(TELA)
-
-    rodando, clock, jogo = True, pygame.time.Clock(), Jogo(modo_ia=modo_ia_selecionado, cor_ia='b')
+    inicializar_interface()
+
+    modo_ia_selecionado = tela_inicial()
+    TELA.fill(COR_MARGEM)
+    tela_inteira = True # Próximo quadro atualiza a janela toda (margem incluída), não só as casas
+    opcoes_ia = {'trabalhadores_ia': TRABALHADORES_IA,
+                 'livro_aberturas': LIVRO_ABERTURAS if os.path.exists(LIVRO_ABERTURAS) else None,
+                 'tabelas_finais': TABELAS_FINAIS if os.path.isdir(TABELAS_FINAIS) else None}
+
+    instrumentacao, painel, linhas_painel = None, False, ((0, -1), [])
+    if INSTRUMENTACAO:
+        from instrumentacao import ativar # Import local: desligada, nenhuma função é trocada
+        instrumentacao = ativar(INSTRUMENTACAO)
+        instrumentacao.medir(JogoGrafico, 'desenhar_tudo', ao_terminar=instrumentacao.fim_do_quadro)
+        painel = True
+
+    rodando, clock, jogo = True, pygame.time.Clock(), JogoGrafico(modo_ia=modo_ia_selecionado, cor_ia='b', **opcoes_ia)
+    pensamento = None # Busca da IA em andamento (PensamentoIA)
+    ocioso = False # Nada vai mudar sozinho na tela: dorme até o próximo evento
 
     while rodando:
-        clock.tick(60)
+        if ocioso:
+            eventos = [pygame.event.wait()] + pygame.event.get()
+        else:
+            clock.tick(60)
+            eventos = pygame.event.get()
+        if tratar_eventos_janela(eventos): # Novo tamanho: sprites da cache, fundo e margem refeitos
+            jogo.invalidar_desenho()
+            tela_inteira = True
 
         turno_jogador_humano = True # Por padrão, é turno humano
         if jogo.modo_ia and jogo.turno == jogo.cor_ia:
             turno_jogador_humano = False
 
-        for evento in pygame.event.get():
+        for evento in eventos:
             if evento.type == pygame.QUIT:
                 rodando = False
+            if evento.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED): # Janela descoberta: redesenha tudo
+                jogo.invalidar_desenho()
+                tela_inteira = True
+            if evento.type == pygame.KEYDOWN and evento.key == pygame.K_n: # N: novo jogo, mesmo modo
+                if pensamento is not None: pensamento.cancelar()
+                pensamento, jogo = None, JogoGrafico(modo_ia=jogo.modo_ia, cor_ia=jogo.cor_ia, **opcoes_ia)
+                TELA.fill(COR_MARGEM) # Avisos do jogo anterior que passavam do tabuleiro
+                tela_inteira = True
+                continue
+            if evento.type == pygame.KEYDOWN and evento.key == pygame.K_F3 and instrumentacao is not None: # F3: painel
+                painel = not painel
             if not jogo.game_over and turno_jogador_humano:
                 if evento.type == pygame.MOUSEBUTTONDOWN:
                     # Certifica-se que o clique é do jogador humano e não da IA "clicando"
                     if not (jogo.modo_ia and jogo.turno == jogo.cor_ia) :
-                        pos_x, pos_y = pygame.mouse.get_pos()
+                        pos_x, pos_y = evento.pos
                         linha, coluna = pos_y // TAMANHO_QUADRADO, pos_x // TAMANHO_QUADRADO
-                        if jogo.selecionar(linha, coluna):
-                            pass
+                        if linha < LINHAS and coluna < COLUNAS: # Clique na margem: nada
+                            jogo.selecionar(linha, coluna)
 
         if not jogo.game_over and jogo.modo_ia and jogo.turno == jogo.cor_ia:
-            pygame.time.wait(500) # Pequeno delay para a IA não jogar instantaneamente
-            jogo.fazer_movimento_ia()
-            if not jogo.game_over:
-                 jogo.trocar_turno()
-
-        jogo.desenhar_tudo(TELA)
-        pygame.display.flip()
+            if pensamento is None:
+                pensamento = PensamentoIA(jogo)
+            elif pensamento.pronto():
+                pensamento.aplicar()
+                pensamento = None
+
+        avisos = [aviso_pensando()] if pensamento is not None else []
+        if painel:
+            # Refeito a cada lance e no máximo a cada INTERVALO_PAINEL_MS, para o texto não mudar a todo quadro
+            (ticks, lances), _ = linhas_painel
+            if instrumentacao.lances.duracao.quantidade != lances or pygame.time.get_ticks() - ticks >= INTERVALO_PAINEL_MS:
+                linhas_painel = ((pygame.time.get_ticks(), instrumentacao.lances.duracao.quantidade), instrumentacao.linhas_painel())
+            avisos += avisos_painel(linhas_painel[1])
+        sujos = jogo.desenhar_tudo(TELA, avisos)
+        if tela_inteira:
+            pygame.display.flip()
+            tela_inteira = False
+        elif sujos: pygame.display.update(sujos)
+        ocioso = pensamento is None and (jogo.game_over or not (jogo.modo_ia and jogo.turno == jogo.cor_ia))
+    if pensamento is not None: pensamento.cancelar()
     pygame.quit()
 
 if __name__ == "__main__":
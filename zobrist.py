@@ -0,0 +1,48 @@
+# zobrist.py
+#
+# Chaves de Zobrist: cada (cor, peça, casa) recebe um número aleatório de 64 bits e a
+# chave da posição é o XOR dos números das peças presentes, do lado a jogar e dos
+# direitos de roque. Jogo.fazer_lance atualiza a chave de forma incremental.
+#
+# Os números são gerados com semente fixa, então a mesma posição tem a mesma chave
+# em qualquer execução (necessário para livros de abertura e tabelas salvas em disco).
+
+import random
+
+_gerador = random.Random(0x5EED_C4E55)
+
+NOMES_PECAS = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+CHAVES_PECAS = {cor: {nome: [_gerador.getrandbits(64) for _ in range(64)] for nome in NOMES_PECAS} for cor in ('w', 'b')}
+CHAVE_PRETAS_JOGAM = _gerador.getrandbits(64)
+_CHAVES_DIREITOS = [_gerador.getrandbits(64) for _ in range(4)] # K, Q, k, q
+
+# Uma chave por combinação de direitos (máscara de 4 bits), para trocar tudo com um XOR
+CHAVES_ROQUE = []
+for _mascara in range(16):
+    _chave = 0
+    for _bit in range(4):
+        if _mascara >> _bit & 1: _chave ^= _CHAVES_DIREITOS[_bit]
+    CHAVES_ROQUE.append(_chave)
+
+# (bit, linha, coluna da torre): o rei fica sempre na coluna 4 da mesma linha
+CANTOS_ROQUE = ((1, 7, 7), (2, 7, 0), (4, 0, 7), (8, 0, 0))
+
+
+def direitos_roque(tabuleiro):
+    # Deduzidos dos flags ja_moveu, do mesmo jeito que Jogo._get_movimentos_roque decide
+    direitos = 0
+    for bit, linha, coluna in CANTOS_ROQUE:
+        rei, torre = tabuleiro[linha][4], tabuleiro[linha][coluna]
+        if rei is not None and rei.nome == 'king' and not rei.ja_moveu and torre is not None and not torre.ja_moveu:
+            direitos |= bit
+    return direitos
+
+def calcular_chave(tabuleiro, turno):
+    # Chave completa, do zero; durante o jogo ela é mantida de forma incremental
+    chave = CHAVES_ROQUE[direitos_roque(tabuleiro)]
+    if turno == 'b': chave ^= CHAVE_PRETAS_JOGAM
+    for linha in range(8):
+        for coluna in range(8):
+            peca = tabuleiro[linha][coluna]
+            if peca is not None: chave ^= CHAVES_PECAS[peca.cor][peca.nome][linha * 8 + coluna]
+    return chave